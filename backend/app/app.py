@@ -1,16 +1,26 @@
-from flask import Flask, request, jsonify
+import copy
+import atexit
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 from datetime import datetime
+from functools import wraps
 from pymongo import MongoClient
 from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
 
 from .config import Config
 from .services.risk_assessment import RiskAssessmentService
 from .services.search_service import SearchService
+from .services.assessment_writer import AssessmentWriter
+from .services.assessment_queries import ensure_indexes, find_history, DEFAULT_PAGE_SIZE
+from .services.response_cache import ResponseCache
+from .services.assessment_document import build_assessment_document
+from .services.bulk_assessment import REQUIRED_FIELDS, validate_profiles, build_bulk_assessments, group_summary
+from .services.heap_profiler import HeapProfiler, admin_enabled, verify_admin_token, object_memory
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app, origins=Config.CORS_ORIGINS)
+CORS(app, origins=Config.CORS_ORIGINS, expose_headers=['X-Next-Cursor'])
 
 # Validate configuration
 Config.validate_config()
@@ -30,6 +40,33 @@ except Exception as e:
 # Initialize database collections
 db = mongo_client[Config.MONGO_DB_NAME]
 assessments_collection = db[Config.ASSESSMENTS_COLLECTION]
+ensure_indexes(assessments_collection)
+
+# Assessments are persisted in batches off the request path; flushed at exit
+assessment_writer = AssessmentWriter(
+    assessments_collection,
+    batch_size=Config.ASSESSMENT_WRITE_BATCH_SIZE,
+    flush_interval=Config.ASSESSMENT_FLUSH_INTERVAL,
+    queue_size=Config.ASSESSMENT_QUEUE_SIZE
+)
+atexit.register(assessment_writer.stop)
+
+
+@app.before_request
+def start_assessment_writer():
+    # Started by each worker's first request rather than at import, so a
+    # master that imports the app and then forks (gunicorn --preload)
+    # doesn't hand its children a writer without a thread
+    assessment_writer.start()
+
+# Normalized /api/assessment/<id> bodies, filled on write and on first read
+assessment_cache = ResponseCache(Config.ASSESSMENT_CACHE_MAX_MB * 1024 * 1024)
+
+def utc_now_ms():
+    """Current UTC time at the millisecond precision MongoDB stores, so cached
+    and re-read copies of an assessment serialize identically."""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_insurance():
@@ -39,9 +76,7 @@ def analyze_insurance():
             return jsonify({'error': 'No data provided'}), 400
         
         # Validate required fields
-        required_fields = ['age', 'gender', 'bmi', 'blood_pressure', 'cholesterol', 
-                         'smoker', 'exercise_frequency', 'family_history']
-        missing_fields = [field for field in required_fields if field not in user_data]
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in user_data]
         if missing_fields:
             return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
         
@@ -52,62 +87,26 @@ def analyze_insurance():
         # Get relevant insurance information using search service
         search_data = search_service.search_insurance_info(user_data)
         
-        # Process providers data
-        providers = []
-        for provider in search_data.get('providers', []):
-            provider_data = {
-                'name': provider.get('name', ''),
-                'description': provider.get('description', ''),
-                'rating': 4.5,  # Default rating
-                'premium_range': {
-                    'min': provider.get('monthly_premium_range', [5000, 8000])[0],
-                    'max': provider.get('monthly_premium_range', [5000, 8000])[1]
-                },
-                'features': provider.get('features', []),
-                'plan_types': [
-                    {
-                        'type': opt.get('title', ''),
-                        'description': opt.get('description', '')
-                    } for opt in provider.get('coverage_options', [])
-                ],
-                'links': {
-                    'quote': provider.get('website', ''),
-                    'details': provider.get('plan_link', '')
-                }
-            }
-            providers.append(provider_data)
-        
-        # Store assessment
-        assessment_data = {
-            'user_data': user_data,
-            'risk_score': risk_score,
-            'search_results': search_data.get('search_results', []),
-            'providers': providers,
-            'risk_assessment': {
-                'risk_level': risk_level,
-                'risk_factors': search_data.get('health_factors', []),
-                'positive_factors': search_data.get('positive_factors', []),
-                'recommendations': {
-                    'coverage_level': search_data.get('risk_assessment', {}).get('recommendations', {}).get('coverage_level', 'Standard'),
-                    'premium_range': {
-                        'min': 5000,
-                        'max': 50000
-                    },
-                    'coverage_types': search_data.get('risk_assessment', {}).get('recommendations', {}).get('coverage_types', []),
-                    'justification': search_data.get('risk_assessment', {}).get('recommendations', {}).get('justification', [])
-                }
-            },
-            'ai_analysis': search_data.get('ai_analysis'),
-            'timestamp': datetime.utcnow()
-        }
+        # Store assessment (built the same way as each bulk member's)
+        assessment_data = build_assessment_document(user_data, risk_score, risk_level, search_data)
+        assessment_data['timestamp'] = utc_now_ms()
+        providers = assessment_data['providers']
+        if user_data.get('user_id'):
+            assessment_data['user_id'] = str(user_data['user_id'])
         
         try:
-            result = assessments_collection.insert_one(assessment_data)
-            assessment_id = str(result.inserted_id)
+            assessment_id = str(assessment_writer.submit(assessment_data))
         except Exception as e:
             print(f"Error storing in MongoDB: {str(e)}")
             assessment_id = None
         
+        if assessment_id:
+            # Warm the lookup cache; the history view opens new assessments right away
+            try:
+                cache_assessment(assessment_id, copy.deepcopy(assessment_data))
+            except Exception as e:
+                print(f"Error caching assessment: {str(e)}")
+        
         response_data = {
             'risk_score': risk_score,
             'providers': providers,
@@ -128,77 +127,245 @@ def analyze_insurance():
             'details': str(e)
         }), 500
 
+@app.route('/api/analyze/bulk', methods=['POST'])
+def analyze_insurance_bulk():
+    """
+    Assess a whole group (e.g. an employer's staff) in one request.
+    
+    Expects ``{"profiles": [...], "group_name": optional}`` with the same
+    fields as ``/api/analyze``. Profiles are validated and scored as columns,
+    all assessments are stored with one ``insert_many``, and the response has
+    a result (or errors) per member plus a group summary.
+    """
+    try:
+        # Malformed or non-JSON bodies come back as None instead of raising
+        payload = request.get_json(silent=True)
+        if payload is None:
+            return jsonify({'error': 'Request body must be JSON: {"profiles": [...]}'}), 400
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Expected a JSON object with a "profiles" list'}), 400
+        profiles = payload.get('profiles')
+        if not isinstance(profiles, list) or not profiles:
+            return jsonify({'error': 'Expected a non-empty "profiles" list'}), 400
+        if len(profiles) > Config.BULK_MAX_PROFILES:
+            return jsonify({'error': f'At most {Config.BULK_MAX_PROFILES} profiles per request'}), 400
+        
+        columns, valid, errors = validate_profiles(profiles)
+        risk_scores = risk_service.analyze_health_risk_batch(columns)
+        risk_levels = risk_service.get_risk_levels(risk_scores)
+        matches = search_service.match_plans_batch(columns)
+        valid_profiles = [profiles[i] for i in valid]
+        documents, results = build_bulk_assessments(
+            valid_profiles, columns, risk_scores, risk_levels, matches, search_service
+        )
+        
+        group_id = ObjectId()
+        timestamp = utc_now_ms()
+        for document, profile in zip(documents, valid_profiles):
+            document.update({'_id': ObjectId(), 'group_id': str(group_id), 'timestamp': timestamp})
+            if profile.get('user_id'):
+                document['user_id'] = str(profile['user_id'])
+        
+        failed = set()
+        if documents:
+            try:
+                assessments_collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                failed = {error['index'] for error in e.details.get('writeErrors', [])}
+                print(f"Error storing {len(failed)} bulk assessments in MongoDB: {str(e)}")
+            except Exception as e:
+                failed = set(range(len(documents)))
+                print(f"Error storing bulk assessments in MongoDB: {str(e)}")
+        
+        members = [{'index': i, 'errors': messages} for i, messages in errors.items()]
+        for row, (i, result) in enumerate(zip(valid, results)):
+            member = {'index': int(i), **result}
+            if row not in failed:
+                member['assessment_id'] = str(documents[row]['_id'])
+            members.append(member)
+        members.sort(key=lambda member: member['index'])
+        
+        summary = group_summary(len(profiles), columns, risk_scores, risk_levels, matches)
+        summary['stored'] = len(documents) - len(failed)
+        return jsonify({
+            'group_id': str(group_id),
+            'group_name': payload.get('group_name'),
+            'summary': summary,
+            'members': members
+        })
+        
+    except Exception as e:
+        print(f"Error in analyze_insurance_bulk: {str(e)}")
+        return jsonify({
+            'error': 'An error occurred while processing your request. Please try again.',
+            'details': str(e)
+        }), 500
+
 @app.route('/api/assessments', methods=['GET'])
 def get_assessments():
+    """
+    Newest assessments first, one page at a time. Pass ``cursor`` from the
+    previous response's ``X-Next-Cursor`` header for the next page and
+    ``user_id`` to list one user's history.
+    """
     try:
-        assessments = list(assessments_collection.find(
-            {}, 
-            {
-                'user_data': 1, 
-                'risk_score': 1, 
-                'timestamp': 1,
-                'risk_assessment.risk_level': 1
-            }
-        ).sort('timestamp', -1).limit(10))
+        try:
+            assessments, next_cursor = find_history(
+                assessments_collection,
+                user_id=request.args.get('user_id'),
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         for assessment in assessments:
             assessment['_id'] = str(assessment['_id'])
             assessment['timestamp'] = assessment['timestamp'].isoformat()
-            
-        return jsonify(assessments)
+        
+        response = jsonify(assessments)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
         
     except Exception as e:
         print(f"Error in get_assessments: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def normalize_assessment(assessment):
+    """Fill in defaults for fields older assessments may lack (mutates in place)."""
+    assessment['_id'] = str(assessment['_id'])
+    assessment['timestamp'] = assessment['timestamp'].isoformat()
+    
+    # Ensure consistent data structure
+    if 'risk_assessment' not in assessment:
+        assessment['risk_assessment'] = {
+            'risk_level': 'unknown',
+            'risk_factors': [],
+            'positive_factors': [],
+            'recommendations': {
+                'coverage_level': 'Standard',
+                'premium_range': {'min': 5000, 'max': 50000},
+                'coverage_types': [],
+                'justification': []
+            }
+        }
+    
+    if 'providers' in assessment:
+        for provider in assessment['providers']:
+            if 'rating' not in provider:
+                provider['rating'] = 4.5
+            if 'premium_range' not in provider:
+                provider['premium_range'] = {'min': 5000, 'max': 8000}
+            if 'plan_types' not in provider:
+                provider['plan_types'] = [
+                    {
+                        'type': opt.get('title', ''),
+                        'description': opt.get('description', '')
+                    } for opt in provider.get('coverage_options', [])
+                ]
+            if 'links' not in provider:
+                provider['links'] = {
+                    'quote': provider.get('website', ''),
+                    'details': provider.get('plan_link', '')
+                }
+    return assessment
+
+def cache_assessment(assessment_id, assessment):
+    """Normalize, serialize and cache one assessment; returns ``(body, etag)``."""
+    body = (app.json.dumps(normalize_assessment(assessment)) + '\n').encode()
+    return body, assessment_cache.put(assessment_id, body)
+
 @app.route('/api/assessment/<assessment_id>', methods=['GET'])
 def get_assessment(assessment_id):
     try:
-        assessment = assessments_collection.find_one({'_id': ObjectId(assessment_id)})
-        if assessment:
-            assessment['_id'] = str(assessment['_id'])
-            assessment['timestamp'] = assessment['timestamp'].isoformat()
-            
-            # Ensure consistent data structure
-            if 'risk_assessment' not in assessment:
-                assessment['risk_assessment'] = {
-                    'risk_level': 'unknown',
-                    'risk_factors': [],
-                    'positive_factors': [],
-                    'recommendations': {
-                        'coverage_level': 'Standard',
-                        'premium_range': {'min': 5000, 'max': 50000},
-                        'coverage_types': [],
-                        'justification': []
-                    }
-                }
-            
-            if 'providers' in assessment:
-                for provider in assessment['providers']:
-                    if 'rating' not in provider:
-                        provider['rating'] = 4.5
-                    if 'premium_range' not in provider:
-                        provider['premium_range'] = {'min': 5000, 'max': 8000}
-                    if 'plan_types' not in provider:
-                        provider['plan_types'] = [
-                            {
-                                'type': opt.get('title', ''),
-                                'description': opt.get('description', '')
-                            } for opt in provider.get('coverage_options', [])
-                        ]
-                    if 'links' not in provider:
-                        provider['links'] = {
-                            'quote': provider.get('website', ''),
-                            'details': provider.get('plan_link', '')
-                        }
-            
-            return jsonify(assessment)
-        else:
-            return jsonify({'error': 'Assessment not found'}), 404
+        cached = assessment_cache.get(assessment_id)
+        if cached is None:
+            object_id = ObjectId(assessment_id)
+            # Recently submitted assessments may still be waiting in the write queue
+            assessment = assessment_writer.get(object_id) or assessments_collection.find_one({'_id': object_id})
+            if not assessment:
+                return jsonify({'error': 'Assessment not found'}), 404
+            cached = cache_assessment(assessment_id, assessment)
+        
+        body, etag = cached
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Assessments never change, but clients should still revalidate
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
             
     except Exception as e:
         print(f"Error in get_assessment: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Heap profiling; only registered when ADMIN_TOKEN is configured
+heap_profiler = HeapProfiler()
+
+def admin_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not verify_admin_token(request.headers.get('X-Admin-Token')):
+            return jsonify({'error': 'Admin token required'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+def heap_status():
+    return jsonify(heap_profiler.status())
+
+def heap_start():
+    return jsonify(heap_profiler.start(request.args.get('nframes', 1, type=int)))
+
+def heap_stop():
+    return jsonify(heap_profiler.stop())
+
+def heap_snapshot():
+    try:
+        heap_profiler.snapshot()
+        return jsonify({
+            'status': heap_profiler.status(),
+            'top': heap_profiler.top(request.args.get('limit', 20, type=int))
+        })
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+def heap_top():
+    try:
+        return jsonify({'top': heap_profiler.top(request.args.get('limit', 20, type=int))})
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+def heap_diff():
+    try:
+        return jsonify({'diff': heap_profiler.diff(request.args.get('limit', 20, type=int))})
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+def assessment_writes():
+    return jsonify(assessment_writer.metrics())
+
+def assessment_cache_stats():
+    return jsonify(assessment_cache.stats())
+
+def heap_models():
+    return jsonify({'models': object_memory({
+        'risk_service': risk_service,
+        'search_service': search_service
+    })})
+
+if admin_enabled():
+    for rule, view, methods in [
+        ('/api/admin/heap', heap_status, ['GET']),
+        ('/api/admin/heap/start', heap_start, ['POST']),
+        ('/api/admin/heap/stop', heap_stop, ['POST']),
+        ('/api/admin/heap/snapshot', heap_snapshot, ['POST']),
+        ('/api/admin/heap/top', heap_top, ['GET']),
+        ('/api/admin/heap/diff', heap_diff, ['GET']),
+        ('/api/admin/heap/models', heap_models, ['GET']),
+        ('/api/admin/assessment-writes', assessment_writes, ['GET']),
+        ('/api/admin/assessment-cache', assessment_cache_stats, ['GET']),
+    ]:
+        app.add_url_rule(rule, view.__name__, admin_required(view), methods=methods)
+
 if __name__ == '__main__':
     app.run(debug=True)
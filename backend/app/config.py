@@ -8,6 +8,7 @@ class Config:
     # API Keys and Credentials
     TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
     MONGO_URI = os.getenv("MONGO_URI")
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # Enables /admin endpoints when set
     
     # Risk Assessment Weights
     RISK_WEIGHTS: Dict[str, float] = {
@@ -24,9 +25,33 @@ class Config:
     USERS_COLLECTION = "users"
     ASSESSMENTS_COLLECTION = "assessments"
     
+    # Write-behind persistence of assessments
+    ASSESSMENT_WRITE_BATCH_SIZE = int(os.getenv("ASSESSMENT_WRITE_BATCH_SIZE", "100"))
+    ASSESSMENT_FLUSH_INTERVAL = float(os.getenv("ASSESSMENT_FLUSH_INTERVAL", "1.0"))  # seconds
+    ASSESSMENT_QUEUE_SIZE = int(os.getenv("ASSESSMENT_QUEUE_SIZE", "10000"))
+    ASSESSMENT_CACHE_MAX_MB = int(os.getenv("ASSESSMENT_CACHE_MAX_MB", "32"))  # Cached /api/assessment/<id> bodies
+    BULK_MAX_PROFILES = int(os.getenv("BULK_MAX_PROFILES", "10000"))  # Per /api/analyze/bulk request
+    
     # API Configuration
     CORS_ORIGINS = ["http://localhost:3000", "http://localhost:5173"]  # Add your frontend URLs
     
+    # Crop model registry
+    MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "1024"))
+    PRELOAD_MODELS = [key for key in os.getenv("PRELOAD_MODELS", "").split(",") if key]  # Loaded and warmed at startup, before /health/ready reports ready
+    SHADOW_MODEL = os.getenv("SHADOW_MODEL")  # e.g. "default@v0003"; scored alongside live traffic
+    SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+    SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+    
+    # Farmer feedback store
+    DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+    FEEDBACK_DIR = os.getenv("FEEDBACK_DIR", os.path.join(DATA_DIR, "feedback"))
+    FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "100"))
+    FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "30"))  # Seconds a partial batch may wait
+    
+    # Preprocessed training data reused across train_models.py runs
+    DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", os.path.join(DATA_DIR, "dataset_cache"))
+    TRAINING_MEMORY_BUDGET_MB = int(os.getenv("TRAINING_MEMORY_BUDGET_MB", "512"))  # Out-of-core training
+    
     # Server Configuration
     HOST = "0.0.0.0"
     PORT = 5000
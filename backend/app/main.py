@@ -1,10 +1,12 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, APIRouter, Depends, Header
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
+from fastapi.responses import JSONResponse
+from typing import Optional, Literal, List
 import numpy as np
 import os
 import sys
+import time
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier  # Change to use sklearn's implementation
 
@@ -15,6 +17,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODELS_DIR = os.path.join(BASE_DIR, 'app', 'models')
 
+from app.config import Config
+from app.services.model_registry import ModelRegistry, parse_model_ref
+from app.services.artifact_store import ArtifactStore
+from app.services.shadow import ShadowScorer
+from app.services.feedback_store import FeedbackStore
+from app.services.warmup import WarmupState, start_warmup
+from app.services.heap_profiler import HeapProfiler, admin_enabled, verify_admin_token, object_memory
+
 app = FastAPI()
 
 # Add CORS middleware
@@ -26,34 +36,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize variables
-model = None
-scaler = None
-crop_labels = None
+# Readiness covers the models warmed at startup: the default model, PRELOAD_MODELS
+# and the shadow candidate. Any other key loads on its first request, which
+# on_load warms before the model serves it.
+warmup_state = WarmupState()
+
+def warm_model(entry):
+    seconds = entry.warm_up()
+    warmup_state.record(f"model:{entry.key}", load_seconds=entry.load_seconds, warmup_seconds=seconds)
+    print(f"Warmed up model '{entry.key}' in {seconds:.3f}s")
+
+# Models are loaded per key (region, or key@version from the artifact store) on first use
+artifact_store = ArtifactStore(MODELS_DIR)
+registry = ModelRegistry(MODELS_DIR, Config.MODEL_MEMORY_BUDGET_MB * 1024 * 1024, on_load=warm_model,
+                         artifact_store=artifact_store)
+
+# Optionally score a candidate version on sampled traffic, off the response path
+shadow = None
+if Config.SHADOW_MODEL:
+    shadow = ShadowScorer(registry, Config.SHADOW_MODEL, Config.SHADOW_SAMPLE_RATE,
+                          Config.SHADOW_QUEUE_SIZE)
 
-# Load the trained model and scaler
+# Feedback is appended in batches and picked up by train_models.py --retrain
+feedback_store = FeedbackStore(Config.FEEDBACK_DIR, Config.FEEDBACK_BATCH_SIZE,
+                               Config.FEEDBACK_FLUSH_INTERVAL)
+
+def models_available():
+    """Whether the default model artifact exists (loading it is left to warm-up)."""
+    return os.path.exists(registry.resolve_path(registry.default_key))
+
+# Load the default model; runs in the warm-up thread so importing the app stays cheap
 def load_models():
-    global model, scaler, crop_labels
     try:
         print("Current working directory:", os.getcwd())
         print("Models directory:", MODELS_DIR)
         
-        model_path = os.path.join(MODELS_DIR, 'crop_model.joblib')
+        model_path = registry.resolve_path(registry.default_key)
         print(f"Checking if file exists: {os.path.exists(model_path)}")
         
-        # Load all components from single file
-        components = joblib.load(model_path)
-        model = components['model']
-        scaler = components['scaler']
-        crop_labels = components['labels']
-        return True
+        registry.get(registry.default_key)
     except Exception as e:
         print(f"Error loading model: {e}")
         print("Please ensure you've run train_models.py first")
-        return False
-
-# Load models when starting the application
-models_loaded = load_models()
+        raise
 
 class CropInput(BaseModel):
     N: float
@@ -64,33 +89,122 @@ class CropInput(BaseModel):
     ph: float
     rainfall: float
 
+class FeedbackInput(CropInput):
+    crop: str
+    outcome: Literal['success', 'partial', 'failure']
+    model: Optional[str] = None
+
+def warm_up_models(state):
+    load_models()
+    for key in Config.PRELOAD_MODELS:
+        registry.get(key)
+    if shadow is not None:
+        registry.get(shadow.candidate)
+
+@app.on_event("startup")
+def begin_warmup():
+    start_warmup(warmup_state, warm_up_models)
+    feedback_store.start()
+    if shadow is not None:
+        shadow.start()
+
+@app.on_event("shutdown")
+def flush_feedback():
+    feedback_store.stop()
+    if shadow is not None:
+        shadow.stop()
+
 @app.get("/")
 def read_root():
-    if not models_loaded:
+    if not models_available():
         return {"message": "Warning: Models not loaded. Please train the models first."}
     return {"message": "Crop Recommendation API is running"}
 
-@app.post("/predict")
-async def predict_crop(data: CropInput):
-    if not models_loaded:
+@app.get("/health/live")
+def liveness():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness():
+    report = warmup_state.report()
+    if not report['ready']:
+        return JSONResponse(status_code=503, content={"status": "warming_up", **report})
+    return {"status": "ready", **report}
+
+@app.get("/models")
+def list_models():
+    return {
+        "available": registry.available(),
+        "loaded": [
+            {
+                "key": entry.key,
+                "version": entry.version,
+                "bytes": entry.nbytes,
+                "load_seconds": entry.load_seconds,
+                "warmup_seconds": entry.warmup_seconds
+            }
+            for entry in registry.loaded()
+        ],
+        "memory_budget_bytes": registry.memory_budget_bytes,
+        "pinned": registry.pinned(),
+        "stats": registry.stats
+    }
+
+@app.get("/models/{key}/versions")
+def list_model_versions(key: str):
+    """Stored versions of a model with their checksums, metrics and parameters."""
+    try:
+        key, _ = parse_model_ref(key)
+        return {
+            "key": key,
+            "current": artifact_store.current(key),
+            "versions": [artifact_store.manifest(key, version) for version in artifact_store.versions(key)]
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/shadow")
+def shadow_report():
+    if shadow is None:
+        return {"enabled": False}
+    return {"enabled": True, **shadow.report()}
+
+def get_model_entry(model_key):
+    """Fetch a model from the registry, mapping lookup failures to HTTP errors."""
+    if model_key == registry.default_key and not models_available():
         raise HTTPException(
             status_code=500, 
             detail="Models not loaded. Please train the models first by running train_models.py"
         )
     
+    try:
+        return registry.get(model_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model '{model_key}' not found")
+
+def to_feature_rows(items):
+    return np.array([[
+        data.N,
+        data.P,
+        data.K,
+        data.temperature,
+        data.humidity,
+        data.ph,
+        data.rainfall
+    ] for data in items])
+
+@app.post("/predict")
+def predict_crop(data: CropInput, model: Optional[str] = None, explain: bool = False):
+    entry = get_model_entry(model or registry.default_key)
+    scaler = entry.scaler
+    
     try:
         # Add print statements for debugging
         print("Received input data:", data)
         
-        input_data = np.array([[
-            data.N,
-            data.P,
-            data.K,
-            data.temperature,
-            data.humidity,
-            data.ph,
-            data.rainfall
-        ]])
+        input_data = to_feature_rows([data])
         
         if not isinstance(scaler, StandardScaler):
             raise HTTPException(
@@ -98,20 +212,11 @@ async def predict_crop(data: CropInput):
                 detail="Scaler not properly initialized"
             )
             
-        # Scale the input data
+        # Scale and predict; timed alone so shadow latencies compare like with like
         try:
-            input_scaled = scaler.transform(input_data)
-            print("Scaled input:", input_scaled)
-        except Exception as e:
-            print("Error in scaling:", str(e))
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error scaling input data: {str(e)}"
-            )
-        
-        # Make prediction
-        try:
-            prediction = model.predict(input_scaled)
+            start = time.perf_counter()
+            prediction = entry.predict(input_data)
+            predict_seconds = time.perf_counter() - start
             print("Prediction:", prediction)
         except Exception as e:
             print("Error in prediction:", str(e))
@@ -120,12 +225,109 @@ async def predict_crop(data: CropInput):
                 detail=f"Error making prediction: {str(e)}"
             )
         
-        return {
-            "recommended_crop": prediction[0]
+        if shadow is not None:
+            shadow.submit(entry, input_data, prediction[0], predict_seconds)
+        
+        result = {
+            "recommended_crop": prediction[0],
+            "model": entry.key,
+            "version": entry.version
         }
+        if explain:
+            try:
+                result["explanation"] = entry.explain(input_data)[0]
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         print("Error in prediction endpoint:", str(e))
         raise HTTPException(
             status_code=500, 
             detail=str(e)
-        ) 
\ No newline at end of file
+        )
+
+@app.post("/explain")
+def explain_crops(items: List[CropInput], model: Optional[str] = None):
+    """Batch per-feature attributions for the predicted crop of each input."""
+    entry = get_model_entry(model or registry.default_key)
+    if not items:
+        return {"model": entry.key, "explanations": []}
+    try:
+        return {"model": entry.key, "explanations": entry.explain(to_feature_rows(items))}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print("Error in explain endpoint:", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/feedback")
+def submit_feedback(data: FeedbackInput):
+    """Record the crop a farmer actually grew and how it turned out."""
+    try:
+        feedback_store.add({
+            'N': data.N,
+            'P': data.P,
+            'K': data.K,
+            'temperature': data.temperature,
+            'humidity': data.humidity,
+            'ph': data.ph,
+            'rainfall': data.rainfall,
+            'label': data.crop.strip().lower(),
+            'outcome': data.outcome,
+            'model': data.model or registry.default_key
+        })
+        return {"status": "recorded", "pending": feedback_store.pending()}
+    except Exception as e:
+        print("Error recording feedback:", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Heap profiling; only mounted when ADMIN_TOKEN is configured
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not verify_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+heap_profiler = HeapProfiler()
+admin = APIRouter(prefix="/admin/heap", dependencies=[Depends(require_admin)])
+
+@admin.get("")
+def heap_status():
+    return heap_profiler.status()
+
+@admin.post("/start")
+def heap_start(nframes: int = 1):
+    return heap_profiler.start(nframes)
+
+@admin.post("/stop")
+def heap_stop():
+    return heap_profiler.stop()
+
+@admin.post("/snapshot")
+def heap_snapshot(limit: int = 20):
+    try:
+        heap_profiler.snapshot()
+        return {"status": heap_profiler.status(), "top": heap_profiler.top(limit)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@admin.get("/top")
+def heap_top(limit: int = 20):
+    try:
+        return {"top": heap_profiler.top(limit)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@admin.get("/diff")
+def heap_diff(limit: int = 20):
+    try:
+        return {"diff": heap_profiler.diff(limit)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@admin.get("/models")
+def heap_models():
+    return {"models": object_memory({entry.key: entry for entry in registry.loaded()})}
+
+if admin_enabled():
+    app.include_router(admin)
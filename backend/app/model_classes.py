@@ -1,141 +1,1091 @@
+import os
+import time
+import tempfile
+import warnings
 import numpy as np
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+class FeatureBinner:
+    """Quantize each feature into at most 256 bins so it fits in a uint8 matrix."""
+
+    def __init__(self, max_bins=256):
+        if not 2 <= max_bins <= 256:
+            raise ValueError("max_bins must be between 2 and 256")
+        self.max_bins = max_bins
+        self.bin_edges_ = None
+
+    def fit(self, X):
+        """
+        Compute per-feature bin edges. Features with few distinct values get
+        one bin per value; the rest use quantiles. Bin ``b`` holds values in
+        ``(edges[b - 1], edges[b]]``, so ``bin <= b`` means ``x <= edges[b]``.
+        """
+        self.bin_edges_ = []
+        for feature_idx in range(X.shape[1]):
+            unique_values = np.unique(X[:, feature_idx])
+            if len(unique_values) <= self.max_bins:
+                edges = unique_values[:-1]
+            else:
+                quantiles = np.linspace(0, 1, self.max_bins + 1)[1:-1]
+                edges = np.unique(np.quantile(X[:, feature_idx], quantiles, method='lower'))
+            self.bin_edges_.append(edges)
+        return self
+
+    def transform(self, X):
+        X_binned = np.empty(X.shape, dtype=np.uint8)
+        for feature_idx, edges in enumerate(self.bin_edges_):
+            X_binned[:, feature_idx] = np.searchsorted(edges, X[:, feature_idx], side='left')
+        return X_binned
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+class TreeArrays:
+    """
+    Flat node storage for a fitted tree. Node ``i`` sends rows with
+    ``x[feature[i]] <= threshold[i]`` to ``left[i]``, others to ``right[i]``;
+    leaves have ``feature == -1`` and predict class index ``value[i]``.
+    """
+    __slots__ = ('feature', 'threshold', 'left', 'right', 'value')
+
+    def __init__(self, feature, threshold, left, right, value):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.intp)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Return the leaf reached by each row, moving all rows down one level per step."""
+        node = np.zeros(len(X), dtype=np.intp)
+        active = np.flatnonzero(self.feature[node] >= 0)
+        while active.size:
+            current = node[active]
+            go_left = X[active, self.feature[current]] <= self.threshold[current]
+            node[active] = np.where(go_left, self.left[current], self.right[current])
+            active = active[self.feature[node[active]] >= 0]
+        return node
+
+class _NodeBuffer:
+    """Growable node lists used while a tree is being built."""
+
+    def __init__(self):
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.value = []
+
+    def add_leaf(self, value):
+        return self._add(-1, 0.0, value)
+
+    def add_split(self, feature, threshold):
+        return self._add(feature, threshold, -1)
+
+    def set_children(self, node, left, right):
+        self.left[node] = left
+        self.right[node] = right
+
+    def _add(self, feature, threshold, value):
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.value.append(value)
+        return len(self.feature) - 1
+
+    def to_arrays(self):
+        return TreeArrays(self.feature, self.threshold, self.left, self.right, self.value)
+
+class TrainingProfile:
+    """
+    Timings and split-search counters for one tree, bucketed by depth. Only
+    created when profiling is requested; builders skip every hook otherwise.
+    """
+
+    def __init__(self):
+        self.depths = {}
+        self._start = time.perf_counter()
+
+    def record(self, depth, seconds=0.0, nodes=0, splits=0, thresholds=0, largest_node=0):
+        level = self.depths.get(depth)
+        if level is None:
+            level = self.depths[depth] = {
+                'seconds': 0.0, 'nodes': 0, 'splits': 0, 'thresholds': 0, 'largest_node': 0
+            }
+        level['seconds'] += seconds
+        level['nodes'] += nodes
+        level['splits'] += splits
+        level['thresholds'] += thresholds
+        level['largest_node'] = max(level['largest_node'], int(largest_node))
+
+    def finish(self):
+        """Return the profile as a plain dict."""
+        levels = [{'depth': depth, **self.depths[depth]} for depth in sorted(self.depths)]
+        return {
+            'seconds': time.perf_counter() - self._start,
+            'nodes': sum(level['nodes'] for level in levels),
+            'splits': sum(level['splits'] for level in levels),
+            'thresholds': sum(level['thresholds'] for level in levels),
+            'largest_node': max((level['largest_node'] for level in levels), default=0),
+            'levels': levels
+        }
+
+def merge_profiles(profiles):
+    """Sum per-tree profiles into forest totals per depth."""
+    depths = {}
+    for profile in profiles:
+        for level in profile['levels']:
+            total = depths.setdefault(level['depth'], {
+                'depth': level['depth'], 'seconds': 0.0, 'nodes': 0, 'splits': 0,
+                'thresholds': 0, 'largest_node': 0
+            })
+            for name in ('seconds', 'nodes', 'splits', 'thresholds'):
+                total[name] += level[name]
+            total['largest_node'] = max(total['largest_node'], level['largest_node'])
+    return [depths[depth] for depth in sorted(depths)]
+
+def format_training_profile(profile):
+    """Render a forest's ``profile_`` as a text report."""
+    trees = profile['trees']
+    lines = [
+        f"Fitted {len(trees)} trees in {profile['seconds']:.3f}s "
+        f"(tree time {sum(t['seconds'] for t in trees):.3f}s)",
+        "",
+        f"{'depth':>5} {'seconds':>9} {'nodes':>8} {'splits':>8} {'thresholds':>12} {'largest':>9}"
+    ]
+    for level in profile['levels']:
+        lines.append(f"{level['depth']:>5} {level['seconds']:>9.3f} {level['nodes']:>8} "
+                     f"{level['splits']:>8} {level['thresholds']:>12} {level['largest_node']:>9}")
+    lines += ["", f"{'tree':>5} {'seconds':>9} {'nodes':>8} {'depth':>6} {'thresholds':>12}"]
+    for i, tree in enumerate(trees):
+        lines.append(f"{i:>5} {tree['seconds']:>9.3f} {tree['nodes']:>8} "
+                     f"{len(tree['levels']) - 1:>6} {tree['thresholds']:>12}")
+    return "\n".join(lines)
 
 class DecisionTree:
-    def __init__(self, max_depth=None, min_samples_split=2):
+    # Set only while a profiled fit is running
+    _profile = None
+
+    def __init__(self, max_depth=None, min_samples_split=2, max_features=None, random_state=None,
+                 profile=False):
         self.max_depth = max_depth
         self.min_samples_split = min_samples_split
-        self.tree = None
+        # Features searched per split: None (all), an int, a fraction, 'sqrt' or 'log2'
+        self.max_features = max_features
+        self.random_state = random_state
+        # Record per-depth timings and counters in profile_ while fitting
+        self.profile = profile
+        self.nodes_ = None
+        self.classes_ = None
+        self.profile_ = None
 
-    def _entropy(self, y):
-        """Calculate entropy of the target variable."""
-        classes, counts = np.unique(y, return_counts=True)
-        probabilities = counts / len(y)
-        return -np.sum(probabilities * np.log2(probabilities))
+    @property
+    def tree(self):
+        """The fitted tree in the original nested-dict format."""
+        return None if self.nodes_ is None else self._to_dict()
 
-    def _best_split(self, X, y):
-        """Find the best split for a node."""
-        best_gain = -1
-        best_feature = None
-        best_threshold = None
+    @tree.setter
+    def tree(self, tree):
+        if tree is None:
+            self.nodes_ = None
+        else:
+            self._load_dict(tree)
+
+    def __setstate__(self, state):
+        # Models pickled before the array format carry a nested-dict 'tree'
+        tree = state.pop('tree', None)
+        self.__dict__.update(state)
+        for name in ('nodes_', 'classes_', 'max_features', 'random_state', 'profile', 'profile_'):
+            self.__dict__.setdefault(name, None)
+        if tree is not None:
+            self._load_dict(tree)
+
+    def _load_dict(self, tree):
+        """Convert a nested-dict tree into ``TreeArrays`` (iteratively, in pre-order)."""
+        nodes = _NodeBuffer()
+        labels = []
+        stack = [(tree, None, None)]
+        while stack:
+            subtree, parent, side = stack.pop()
+            if subtree['type'] == 'leaf':
+                node = nodes.add_leaf(len(labels))
+                labels.append(subtree['prediction'])
+            else:
+                node = nodes.add_split(subtree['feature_idx'], subtree['threshold'])
+                stack.append((subtree['right'], node, 'right'))
+                stack.append((subtree['left'], node, 'left'))
+            if parent is not None:
+                getattr(nodes, side)[parent] = node
         
+        if self.classes_ is None:
+            self.classes_ = np.unique(labels)
+        leaf_values = np.searchsorted(self.classes_, labels)
+        for node, value in enumerate(nodes.value):
+            if value >= 0:
+                nodes.value[node] = leaf_values[value]
+        self.nodes_ = nodes.to_arrays()
+
+    def _to_dict(self):
+        nodes = self.nodes_
+        dicts = []
+        for i in range(nodes.node_count):
+            if nodes.feature[i] < 0:
+                dicts.append({'type': 'leaf', 'prediction': self.classes_[nodes.value[i]]})
+            else:
+                dicts.append({
+                    'type': 'node',
+                    'feature_idx': int(nodes.feature[i]),
+                    'threshold': nodes.threshold[i]
+                })
+        for i, node in enumerate(dicts):
+            if node['type'] == 'node':
+                node['left'] = dicts[nodes.left[i]]
+                node['right'] = dicts[nodes.right[i]]
+        return dicts[0]
+
+    def _entropy_from_counts(self, counts, totals):
+        """
+        Entropy of each row of a class-count matrix.
+
+        Rows are summed in the same order as the per-node ``np.unique``
+        entropy this replaced (present classes only, grouped by how many are
+        present), so gains match it bit for bit.
+        """
+        present = counts > 0
+        terms = np.zeros(counts.shape)
+        probabilities = counts[present] / np.repeat(totals, present.sum(axis=1))
+        terms[present] = probabilities * np.log2(probabilities)
+
+        entropy = np.zeros(len(counts))
+        n_present = present.sum(axis=1)
+        for k in np.unique(n_present):
+            if k == 0:
+                continue
+            rows = np.flatnonzero(n_present == k)
+            compact = terms[rows][present[rows]].reshape(len(rows), k)
+            entropy[rows] = -np.sum(compact, axis=1)
+        return entropy
+
+    def _n_split_features(self, n_features):
+        """Resolve ``max_features`` to a feature count for this dataset."""
+        max_features = self.max_features
+        if max_features is None:
+            return n_features
+        if max_features == 'sqrt':
+            count = int(np.sqrt(n_features))
+        elif max_features == 'log2':
+            count = int(np.log2(n_features))
+        elif isinstance(max_features, (int, np.integer)):
+            count = int(max_features)
+        elif isinstance(max_features, float) and 0 < max_features <= 1:
+            count = int(max_features * n_features)
+        else:
+            raise ValueError(f"Invalid max_features: {max_features!r}")
+        return min(max(count, 1), n_features)
+
+    def _prepare_feature_sampling(self, n_features):
+        self._features_per_split = self._n_split_features(n_features)
+        self._rng = np.random.default_rng(self.random_state)
+
+    def _start_profile(self):
+        if self.profile:
+            self._profile = TrainingProfile()
+
+    def _finish_profile(self):
+        profile = self.__dict__.pop('_profile', None)
+        if profile is not None:
+            self.profile_ = profile.finish()
+
+    def _split_features(self, n_features):
+        """Features to search at the current node: all, or a fresh random subset."""
+        if self._features_per_split >= n_features:
+            return np.arange(n_features)
+        # Sorted so ties still go to the lowest feature index
+        return np.sort(self._rng.choice(n_features, size=self._features_per_split, replace=False))
+
+    def _best_splits(self, X, y, order, segments, depth=None):
+        """
+        Best split for every node in ``segments`` (``(start, stop)`` ranges of
+        ``order``) in one vectorized pass per feature.
+
+        Rows are sorted by (node, value); one bincount gives the class counts
+        of each run of equal values, and a running sum over each node's runs
+        gives the class counts left of every candidate threshold of every
+        node at once, without a rows x classes temporary. Ties resolve as they
+        did node by node: lowest feature, then lowest threshold.
+        """
+        n_nodes = len(segments)
         n_features = X.shape[1]
+        n_classes = len(self.classes_)
+        sizes = np.array([stop - start for start, stop in segments])
+        rows = np.concatenate([order[start:stop] for start, stop in segments])
+        node_of_row = np.repeat(np.arange(n_nodes), sizes)
+        y_rows = y[rows]
+        totals = np.bincount(node_of_row * n_classes + y_rows,
+                             minlength=n_nodes * n_classes).reshape(n_nodes, n_classes).astype(np.float64)
+        parent_entropy = self._entropy_from_counts(totals, sizes)
         
+        # Feature subsets are drawn per node, in level order
+        allowed = np.zeros((n_nodes, n_features), dtype=bool)
+        for node in range(n_nodes):
+            allowed[node, self._split_features(n_features)] = True
+        
+        best_gain = np.full(n_nodes, -1.0)
+        best_feature = np.full(n_nodes, -1)
+        best_threshold = np.zeros(n_nodes)
         for feature_idx in range(n_features):
-            thresholds = np.unique(X[:, feature_idx])
-            for threshold in thresholds:
-                gain = self._information_gain(X, y, feature_idx, threshold)
-                if gain > best_gain:
-                    best_gain = gain
-                    best_feature = feature_idx
-                    best_threshold = threshold
-                    
+            selected = allowed[node_of_row, feature_idx]
+            if not selected.any():
+                continue
+            values = X[rows[selected], feature_idx]
+            nodes = node_of_row[selected]
+            labels = y_rows[selected]
+            sort = np.lexsort((values, nodes))
+            values, nodes, labels = values[sort], nodes[sort], labels[sort]
+            
+            new_node = np.ones(len(nodes), dtype=bool)
+            new_node[1:] = nodes[1:] != nodes[:-1]
+            node_first = np.flatnonzero(new_node)
+            group = np.cumsum(new_node) - 1
+            
+            # Candidate thresholds: the last row of each run of equal values in a node
+            run_end = np.ones(len(values), dtype=bool)
+            run_end[:-1] = (values[1:] != values[:-1]) | new_node[1:]
+            positions = np.flatnonzero(run_end)
+            candidate_node = nodes[positions]
+            candidate_first = np.flatnonzero(np.r_[True, candidate_node[1:] != candidate_node[:-1]])
+            
+            # Class counts per run, then running totals restarted at each node's first run
+            run_of_row = np.cumsum(run_end) - run_end
+            left_counts = np.bincount(run_of_row * n_classes + labels,
+                                      minlength=len(positions) * n_classes).reshape(len(positions), n_classes)
+            np.cumsum(left_counts, axis=0, out=left_counts)
+            node_offset = np.zeros((len(candidate_first), n_classes), dtype=left_counts.dtype)
+            node_offset[1:] = left_counts[candidate_first[1:] - 1]
+            left_counts -= np.repeat(node_offset, np.diff(np.r_[candidate_first, len(positions)]), axis=0)
+            n_left = positions - node_first[group[positions]] + 1
+            n_samples = sizes[candidate_node]
+            n_right = n_samples - n_left
+            
+            # The largest threshold leaves the right side empty and is never taken
+            gains = np.full(len(positions), -np.inf)
+            valid = n_right > 0
+            if self._profile is not None:
+                self._profile.record(depth, thresholds=int(valid.sum()))
+            if valid.any():
+                left_entropy = self._entropy_from_counts(left_counts[valid], n_left[valid])
+                right_entropy = self._entropy_from_counts(
+                    totals[candidate_node[valid]] - left_counts[valid], n_right[valid]
+                )
+                weighted_child_entropy = (n_left[valid] / n_samples[valid] * left_entropy +
+                                          n_right[valid] / n_samples[valid] * right_entropy)
+                gains[valid] = parent_entropy[candidate_node[valid]] - weighted_child_entropy
+            
+            # First maximum per node (candidates are grouped by node, in value order)
+            node_ids = candidate_node[candidate_first]
+            node_max = np.maximum.reduceat(gains, candidate_first)
+            is_max = gains == np.repeat(node_max, np.diff(np.r_[candidate_first, len(gains)]))
+            _, first_max = np.unique(candidate_node[is_max], return_index=True)
+            first_max = np.flatnonzero(is_max)[first_max]
+            
+            improved = node_max > best_gain[node_ids]
+            improved_nodes = node_ids[improved]
+            best_gain[improved_nodes] = node_max[improved]
+            best_feature[improved_nodes] = feature_idx
+            best_threshold[improved_nodes] = values[positions[first_max[improved]]]
+        
         return best_feature, best_threshold
 
-    def _information_gain(self, X, y, feature_idx, threshold):
-        """Calculate information gain for a split."""
-        parent_entropy = self._entropy(y)
-        
-        # Split the data
-        left_mask = X[:, feature_idx] <= threshold
-        right_mask = ~left_mask
-        
-        if np.sum(left_mask) == 0 or np.sum(right_mask) == 0:
-            return 0
-        
-        # Calculate weighted entropy of children
-        left_entropy = self._entropy(y[left_mask])
-        right_entropy = self._entropy(y[right_mask])
-        
-        left_weight = np.sum(left_mask) / len(y)
-        right_weight = np.sum(right_mask) / len(y)
-        
-        weighted_child_entropy = (left_weight * left_entropy + 
-                                right_weight * right_entropy)
-        
-        return parent_entropy - weighted_child_entropy
+    def _build_levelwise(self, X, y):
+        """
+        Grow the tree breadth-first without recursion or per-node copies.
 
-    def _build_tree(self, X, y, depth=0):
+        ``order`` is a single permutation of the row indices; every frontier
+        node owns a contiguous range of it. After each level's splits are
+        found, one stable sort partitions every split node's range into its
+        left then right rows, preserving the original row order within each.
+        """
         n_samples = len(y)
-        n_classes = len(np.unique(y))
-        
-        # Check stopping criteria
-        if (self.max_depth is not None and depth >= self.max_depth) or \
-           n_samples < self.min_samples_split or \
-           n_classes == 1:
-            return {'type': 'leaf', 'prediction': Counter(y).most_common(1)[0][0]}
-        
-        # Find best split
-        feature_idx, threshold = self._best_split(X, y)
-        
-        if feature_idx is None:
-            return {'type': 'leaf', 'prediction': Counter(y).most_common(1)[0][0]}
+        order = np.arange(n_samples)
+        frontier = [(self._nodes.add_leaf(-1), 0, n_samples)]
+        depth = 0
+        profile = self._profile
+        while frontier:
+            if profile is None:
+                frontier = self._grow_level(X, y, order, frontier, depth)
+            else:
+                start = time.perf_counter()
+                n_nodes = len(frontier)
+                largest_node = max(stop - begin for _, begin, stop in frontier)
+                frontier = self._grow_level(X, y, order, frontier, depth)
+                profile.record(depth, time.perf_counter() - start, nodes=n_nodes,
+                               splits=len(frontier) // 2, largest_node=largest_node)
+            depth += 1
+
+    def _grow_level(self, X, y, order, frontier, depth):
+        """Split every node of one level; return the next level's frontier."""
+        nodes = self._nodes
+        splittable = []
+        for node, start, stop in frontier:
+            y_node = y[order[start:stop]]
+            if (self.max_depth is not None and depth >= self.max_depth) or \
+               stop - start < self.min_samples_split or \
+               np.all(y_node == y_node[0]):
+                nodes.value[node] = self._majority(y_node)
+            else:
+                splittable.append((node, start, stop))
+        if not splittable:
+            return []
         
-        # Split the data
-        left_mask = X[:, feature_idx] <= threshold
-        right_mask = ~left_mask
+        features, thresholds = self._best_splits(X, y, order, [(s, e) for _, s, e in splittable],
+                                                 depth)
+        split = []
+        for (node, start, stop), feature_idx, threshold in zip(splittable, features, thresholds):
+            if feature_idx < 0:
+                nodes.value[node] = self._majority(y[order[start:stop]])
+            else:
+                split.append((node, start, stop, feature_idx, threshold))
+        if not split:
+            return []
         
-        # Build child trees
-        left_tree = self._build_tree(X[left_mask], y[left_mask], depth + 1)
-        right_tree = self._build_tree(X[right_mask], y[right_mask], depth + 1)
+        # Partition every split node's range in one stable sort: (node, goes right)
+        positions = np.concatenate([np.arange(start, stop) for _, start, stop, _, _ in split])
+        sizes = np.array([stop - start for _, start, stop, _, _ in split])
+        node_rank = np.repeat(np.arange(len(split)), sizes)
+        rows = order[positions]
+        split_feature = np.array([s[3] for s in split])[node_rank]
+        split_threshold = np.array([s[4] for s in split])[node_rank]
+        goes_right = X[rows, split_feature] > split_threshold
+        order[positions] = rows[np.argsort(node_rank * 2 + goes_right, kind='stable')]
+        n_left = np.bincount(node_rank[~goes_right], minlength=len(split))
         
-        return {
-            'type': 'node',
-            'feature_idx': feature_idx,
-            'threshold': threshold,
-            'left': left_tree,
-            'right': right_tree
-        }
+        next_frontier = []
+        for (node, start, stop, feature_idx, threshold), left_size in zip(split, n_left):
+            nodes.feature[node] = int(feature_idx)
+            nodes.threshold[node] = threshold
+            nodes.value[node] = -1
+            left = nodes.add_leaf(-1)
+            right = nodes.add_leaf(-1)
+            nodes.set_children(node, left, right)
+            next_frontier.append((left, start, start + left_size))
+            next_frontier.append((right, start + left_size, stop))
+        return next_frontier
+
+    def _majority(self, y):
+        """Most common class code, ties going to the first seen (as Counter.most_common)."""
+        counts = np.bincount(y, minlength=len(self.classes_))
+        tied = np.flatnonzero(counts == counts.max())
+        if len(tied) == 1:
+            return tied[0]
+        return y[np.isin(y, tied)][0]
 
     def fit(self, X, y):
         """Build the decision tree."""
-        self.tree = self._build_tree(X, y)
+        # Work on integer class codes; leaves store indices into classes_
+        classes, y_encoded = np.unique(y, return_inverse=True)
+        return self.fit_encoded(X, y_encoded, classes)
+
+    def fit_encoded(self, X, y_encoded, classes):
+        """Build the tree from integer codes into ``classes`` (shared across a forest)."""
+        self.classes_ = classes
+        self._prepare_feature_sampling(X.shape[1])
+        self._start_profile()
+        self._nodes = _NodeBuffer()
+        self._build_levelwise(np.asarray(X), np.asarray(y_encoded))
+        self.nodes_ = self._nodes.to_arrays()
+        self._finish_profile()
+        del self._nodes, self._rng
         return self
 
-    def _predict_single(self, x, tree):
-        """Make prediction for a single sample."""
-        if tree['type'] == 'leaf':
-            return tree['prediction']
-        
-        if x[tree['feature_idx']] <= tree['threshold']:
-            return self._predict_single(x, tree['left'])
-        return self._predict_single(x, tree['right'])
+    def _histogram(self, X_binned, y, indices):
+        """Per-feature, per-bin class counts for the rows in ``indices``; shape (F, B, C)."""
+        n_features = X_binned.shape[1]
+        n_classes = len(self.classes_)
+        codes = X_binned[indices].astype(np.intp) * n_classes
+        codes += y[indices][:, None]
+        codes += np.arange(n_features) * (self._n_bins * n_classes)
+        counts = np.bincount(codes.ravel(), minlength=n_features * self._n_bins * n_classes)
+        return counts.reshape(n_features, self._n_bins, n_classes)
+
+    def _best_histogram_split(self, hist, depth=None):
+        """Best (feature, bin) split from a node histogram, or (None, None)."""
+        features = self._split_features(hist.shape[0])
+        left_counts = np.cumsum(hist[features], axis=1)
+        total_counts = left_counts[0, -1]
+        n_samples = total_counts.sum()
+        n_left = left_counts.sum(axis=2)
+        n_right = n_samples - n_left
+        valid = (n_left > 0) & (n_right > 0)
+        if self._profile is not None:
+            self._profile.record(depth, thresholds=int(valid.sum()))
+        if not valid.any():
+            return None, None
+
+        parent_entropy = self._entropy_from_counts(total_counts[None, :], np.array([n_samples]))[0]
+        left_entropy = self._entropy_from_counts(left_counts[valid], n_left[valid])
+        right_entropy = self._entropy_from_counts(total_counts - left_counts[valid], n_right[valid])
+        gains = np.full(n_left.shape, -np.inf)
+        weighted_child_entropy = (n_left[valid] / n_samples * left_entropy +
+                                  n_right[valid] / n_samples * right_entropy)
+        gains[valid] = parent_entropy - weighted_child_entropy
+
+        # argmax over the flattened (feature, bin) grid keeps first-feature, lowest-bin ties
+        feature_pos, bin_idx = np.unravel_index(np.argmax(gains), gains.shape)
+        return int(features[feature_pos]), int(bin_idx)
+
+    def _build_histogram_levelwise(self, X_binned, y, indices, root_hist):
+        """
+        Grow the tree breadth-first from node histograms, one level at a time
+        like ``_build_levelwise``, so depth is not bounded by the stack.
+
+        A split histograms its smaller child and derives the sibling by
+        subtraction. Only children with at least as many rows as a feature has
+        (bin, class) cells keep that histogram for the next level; smaller
+        ones rebuild theirs from their rows at about the same cost, which
+        keeps the frontier's histograms within the size of the data.
+        """
+        nodes = self._nodes
+        min_rows_kept = self._n_bins * len(self.classes_)
+        frontier = [(nodes.add_leaf(-1), indices, root_hist)]
+        depth = 0
+        profile = self._profile
+        while frontier:
+            if profile is not None:
+                start = time.perf_counter()
+                n_nodes = len(frontier)
+                largest_node = max(len(node_indices) for _, node_indices, _ in frontier)
+            next_frontier = []
+            for node, node_indices, hist in frontier:
+                y_node = y[node_indices]
+                if (self.max_depth is not None and depth >= self.max_depth) or \
+                   len(node_indices) < self.min_samples_split or \
+                   np.all(y_node == y_node[0]):
+                    nodes.value[node] = self._majority(y_node)
+                    continue
+                
+                if hist is None:
+                    hist = self._histogram(X_binned, y, node_indices)
+                feature_idx, bin_idx = self._best_histogram_split(hist, depth)
+                if feature_idx is None:
+                    nodes.value[node] = self._majority(y_node)
+                    continue
+                
+                left_mask = X_binned[node_indices, feature_idx] <= bin_idx
+                left_indices = node_indices[left_mask]
+                right_indices = node_indices[~left_mask]
+                
+                # Subtraction trick: histogram the smaller child, derive its sibling
+                left_hist = right_hist = None
+                if max(len(left_indices), len(right_indices)) >= min_rows_kept:
+                    if len(left_indices) <= len(right_indices):
+                        left_hist = self._histogram(X_binned, y, left_indices)
+                        right_hist = hist - left_hist
+                    else:
+                        right_hist = self._histogram(X_binned, y, right_indices)
+                        left_hist = hist - right_hist
+                    if len(left_indices) < min_rows_kept:
+                        left_hist = None
+                    if len(right_indices) < min_rows_kept:
+                        right_hist = None
+                
+                nodes.feature[node] = int(feature_idx)
+                nodes.threshold[node] = self._bin_edges[feature_idx][bin_idx]
+                nodes.value[node] = -1
+                left = nodes.add_leaf(-1)
+                right = nodes.add_leaf(-1)
+                nodes.set_children(node, left, right)
+                next_frontier.append((left, left_indices, left_hist))
+                next_frontier.append((right, right_indices, right_hist))
+            
+            if profile is not None:
+                profile.record(depth, time.perf_counter() - start, nodes=n_nodes,
+                               splits=len(next_frontier) // 2, largest_node=largest_node)
+            frontier = next_frontier
+            depth += 1
+
+    def fit_binned(self, X_binned, y_encoded, bin_edges, classes, indices=None):
+        """
+        Build the tree from a pre-binned uint8 matrix (see ``FeatureBinner``).
+
+        ``y_encoded`` holds integer codes into ``classes`` and ``indices``
+        selects the training rows (e.g. a bootstrap sample) without copying
+        ``X_binned``. Thresholds are stored as raw feature values, so
+        ``predict`` takes unbinned input.
+        """
+        self.classes_ = classes
+        self._bin_edges = bin_edges
+        self._n_bins = max(len(edges) for edges in bin_edges) + 1
+        if indices is None:
+            indices = np.arange(len(y_encoded))
+        self._start_profile()
+        root_hist = self._histogram(X_binned, y_encoded, indices)
+        self._prepare_feature_sampling(X_binned.shape[1])
+        self._nodes = _NodeBuffer()
+        self._build_histogram_levelwise(X_binned, y_encoded, indices, root_hist)
+        self.nodes_ = self._nodes.to_arrays()
+        self._finish_profile()
+        del self._bin_edges, self._n_bins, self._nodes, self._rng
+        return self
+
+    def apply(self, X):
+        """Return the index of the leaf each sample lands in."""
+        return self.nodes_.apply(np.asarray(X))
 
     def predict(self, X):
         """Make predictions for multiple samples."""
-        return np.array([self._predict_single(x, self.tree) for x in X])
+        return self.classes_[self.nodes_.value[self.apply(X)]]
+
+def _fit_tree(X, y_encoded, classes, bin_edges, params, seed, sample_size):
+    """
+    Fit one forest member on a bootstrap drawn from its own seed.
+
+    Returns the tree and its out-of-bag row indices.
+    """
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, len(y_encoded), size=sample_size)
+    # The same generator then drives the tree's per-split feature sampling
+    tree = DecisionTree(**params, random_state=rng)
+    if bin_edges is not None:
+        tree.fit_binned(X, y_encoded, bin_edges, classes, indices)
+    else:
+        tree.fit_encoded(X[indices], y_encoded[indices], classes)
+    
+    in_bag = np.zeros(len(y_encoded), dtype=bool)
+    in_bag[indices] = True
+    oob_indices = np.flatnonzero(~in_bag)
+    if len(y_encoded) < np.iinfo(np.int32).max:
+        oob_indices = oob_indices.astype(np.int32)
+    return tree, oob_indices
+
+# Histogram-sized temporaries alive at once while a streamed node is split
+SPLIT_SCRATCH_HISTOGRAMS = 6
+
+# Training data memory-mapped once per worker process
+_worker_data = {}
+
+def _attach_training_data(X_path, y_path):
+    _worker_data['X'] = np.load(X_path, mmap_mode='r')
+    _worker_data['y'] = np.load(y_path, mmap_mode='r')
+
+def _fit_tree_in_worker(classes, bin_edges, params, seed, sample_size):
+    return _fit_tree(_worker_data['X'], _worker_data['y'], classes, bin_edges,
+                     params, seed, sample_size)
 
 class RandomForest:
-    def __init__(self, n_trees=10, max_depth=None, min_samples_split=2, sample_ratio=0.8):
+    def __init__(self, n_trees=10, max_depth=None, min_samples_split=2, sample_ratio=0.8,
+                 histogram=False, max_bins=256, n_jobs=1, random_state=None, oob_score=False,
+                 max_features=None, warm_start=False, profile=False):
         self.n_trees = n_trees
         self.max_depth = max_depth
         self.min_samples_split = min_samples_split
         self.sample_ratio = sample_ratio
+        self.max_features = max_features
+        # Histogram mode bins features once and finds splits per bin, not per value
+        self.histogram = histogram
+        self.max_bins = max_bins
+        # Trees are fitted in n_jobs processes; each gets its own seed from
+        # random_state, so results don't depend on the number of workers
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        # Opt-in: out-of-bag votes are accumulated as each tree finishes
+        self.oob_score = oob_score
+        # With warm_start, fit keeps the fitted trees and only grows the missing ones
+        self.warm_start = warm_start
+        # Per-tree, per-depth timings and counters; see format_training_profile
+        self.profile = profile
+        self.profile_ = None
         self.trees = []
+        self.classes_ = None
+        self.oob_indices_ = None
+        self.oob_score_ = None
+        self.oob_decision_function_ = None
+        self._oob_votes = None
+        # Set by fit_out_of_core: data passes taken and the chunking used
+        self.out_of_core_passes_ = None
+
+    def __setstate__(self, state):
+        # Fill in parameters added after older forests were pickled
+        defaults = RandomForest().__dict__
+        defaults.update(state)
+        self.__dict__.update(defaults)
+        # Forests pickled before class encoding only know their trees' labels
+        if self.__dict__.get('classes_') is None and self.trees:
+            self.classes_ = np.unique(np.concatenate([tree.classes_ for tree in self.trees]))
 
-    def _bootstrap_sample(self, X, y):
-        """Create a bootstrap sample of the data."""
-        n_samples = int(len(X) * self.sample_ratio)
-        indices = np.random.choice(len(X), size=n_samples, replace=True)
-        return X[indices], y[indices]
+    def _tree_seeds(self, start, stop):
+        """Independent, reproducible seeds for trees ``start`` to ``stop - 1``."""
+        # spawn() is deterministic, so tree k gets the same seed however the forest grew
+        return np.random.SeedSequence(self.random_state).spawn(stop)[start:]
+
+    def _n_workers(self, n_new_trees):
+        n_jobs = os.cpu_count() if self.n_jobs in (None, -1) else self.n_jobs
+        return max(1, min(n_jobs, n_new_trees))
+
+    def _iter_fitted_trees(self, X, y_encoded, bin_edges, seeds):
+        """Yield ``(position, tree, oob_indices)`` as each tree finishes."""
+        params = {
+            'max_depth': self.max_depth,
+            'min_samples_split': self.min_samples_split,
+            'max_features': self.max_features,
+            'profile': self.profile
+        }
+        sample_size = int(len(X) * self.sample_ratio)
+        
+        n_workers = self._n_workers(len(seeds))
+        if n_workers == 1:
+            for position, seed in enumerate(seeds):
+                yield (position, *_fit_tree(X, y_encoded, self.classes_, bin_edges,
+                                            params, seed, sample_size))
+            return
+        
+        # Workers memory-map the training matrix instead of unpickling a copy each
+        with tempfile.TemporaryDirectory(prefix='forest-') as tmp_dir:
+            X_path = os.path.join(tmp_dir, 'X.npy')
+            y_path = os.path.join(tmp_dir, 'y.npy')
+            np.save(X_path, np.ascontiguousarray(X))
+            np.save(y_path, y_encoded)
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_attach_training_data,
+                                     initargs=(X_path, y_path)) as executor:
+                futures = {
+                    executor.submit(_fit_tree_in_worker, self.classes_, bin_edges,
+                                    params, seed, sample_size): position
+                    for position, seed in enumerate(seeds)
+                }
+                for future in as_completed(futures):
+                    yield (futures[future], *future.result())
+
+    def _set_oob_results(self, oob_votes, y_encoded):
+        n_votes = oob_votes.sum(axis=1)
+        has_votes = n_votes > 0
+        if not has_votes.all():
+            warnings.warn(f"{np.sum(~has_votes)} samples were never out-of-bag; "
+                          "they are excluded from the OOB score", RuntimeWarning)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.oob_decision_function_ = oob_votes / n_votes[:, None]
+        predicted = np.argmax(oob_votes[has_votes], axis=1)
+        self.oob_score_ = float(np.mean(predicted == y_encoded[has_votes]))
 
     def fit(self, X, y):
-        """Build the random forest."""
+        """
+        Build the random forest. With ``warm_start`` the trees already fitted
+        are kept and only the ones needed to reach ``n_trees`` are trained.
+        """
+        n_fitted = len(self.trees) if self.warm_start else 0
+        if n_fitted > self.n_trees:
+            raise ValueError(f"n_trees={self.n_trees} is smaller than the {n_fitted} "
+                             "trees already fitted")
+        if not n_fitted:
+            self.trees = []
+            self.oob_indices_ = []
+            self.classes_ = None
+            self._oob_votes = None
+        elif n_fitted == self.n_trees:
+            warnings.warn("warm_start is set but n_trees was not increased; nothing to fit",
+                          UserWarning)
+            return self
+        
+        return self._grow(X, y, self.n_trees - n_fitted, same_data=bool(n_fitted))
+
+    def partial_fit(self, X, y, n_new_trees=None):
+        """
+        Add ``n_new_trees`` trees (default: a tenth of the forest) trained on a
+        new batch, leaving the existing trees untouched. The OOB score then
+        describes this batch and the trees trained on it.
+        """
+        if n_new_trees is None:
+            n_new_trees = max(1, len(self.trees) // 10) if self.trees else self.n_trees
+        self._oob_votes = None
+        self._grow(X, y, n_new_trees, same_data=False)
+        self.n_trees = len(self.trees)
+        return self
+
+    def _grow(self, X, y, n_new_trees, same_data):
+        """Train ``n_new_trees`` more trees on ``X`` and append them to the forest."""
+        X = np.asarray(X)
+        previous_classes = self.classes_
+        classes = np.unique(y)
+        if previous_classes is not None:
+            classes = np.union1d(previous_classes, classes)
+        self.classes_ = classes
+        y_encoded = np.searchsorted(classes, y)
+        X_train = X
+        bin_edges = None
+        if self.histogram:
+            # Bin once; every new tree shares the same uint8 matrix
+            binner = FeatureBinner(self.max_bins).fit(X)
+            X_train = binner.transform(X)
+            bin_edges = binner.bin_edges_
+        
+        oob_votes = np.zeros((len(X), len(classes)))
+        if same_data and self._oob_votes is not None and len(self._oob_votes) == len(X):
+            # Keep the existing trees' OOB votes; columns move if new labels appeared
+            oob_votes[:, np.searchsorted(classes, previous_classes)] = self._oob_votes
+        
+        started = time.perf_counter()
+        start = len(self.trees)
+        if self.oob_indices_ is None:
+            self.oob_indices_ = [None] * start
+        self.trees.extend([None] * n_new_trees)
+        self.oob_indices_.extend([None] * n_new_trees)
+        for position, tree, oob_indices in self._iter_fitted_trees(
+                X_train, y_encoded, bin_edges, self._tree_seeds(start, start + n_new_trees)):
+            self.trees[start + position] = tree
+            self.oob_indices_[start + position] = oob_indices
+            if self.oob_score and len(oob_indices):
+                # OOB rows are unique per tree, so fancy-index += counts each vote once
+                oob_votes[oob_indices, tree.nodes_.value[tree.apply(X[oob_indices])]] += 1
+        
+        if self.oob_score:
+            self._oob_votes = oob_votes
+            self._set_oob_results(oob_votes, y_encoded)
+        if self.profile:
+            self._set_profile(self.trees[start:], time.perf_counter() - started)
+        return self
+
+    def _set_profile(self, trees, seconds):
+        """Collect the profiles of the trees fitted by the last call."""
+        profiles = [tree.profile_ for tree in trees]
+        self.profile_ = {
+            'seconds': seconds,
+            'levels': merge_profiles(profiles),
+            'trees': profiles
+        }
+
+    def fit_out_of_core(self, X_binned, y_encoded, bin_edges, classes,
+                        memory_budget_bytes=256 * 1024 * 1024, work_dir=None):
+        """
+        Grow the forest from a pre-binned matrix that may live on disk (e.g. a
+        ``np.memmap`` built by ``FeatureBinner``), reading it in chunks.
+
+        All trees grow together, one level at a time: each level is a pass
+        over the chunks that accumulates class histograms for every open
+        node, and split counts then tell which children need one. When the
+        open nodes' histograms don't fit in ``memory_budget_bytes`` alongside
+        a chunk, the level takes several passes. Bootstraps use Poisson
+        weights stored as a uint8 file in ``work_dir``; the OOB score is
+        computed in a final pass, without keeping per-row OOB votes.
+        """
+        started = time.perf_counter()
+        n_samples, n_features = X_binned.shape
+        n_classes = len(classes)
+        n_bins = max(len(edges) for edges in bin_edges) + 1
+        self.classes_ = classes
         self.trees = []
-        for _ in range(self.n_trees):
-            # Create bootstrap sample
-            X_sample, y_sample = self._bootstrap_sample(X, y)
-            
-            # Train decision tree
-            tree = DecisionTree(
-                max_depth=self.max_depth,
-                min_samples_split=self.min_samples_split
+        self.oob_indices_ = None
+        self.oob_score_ = None
+        self.oob_decision_function_ = None
+        self._oob_votes = None
+        
+        # Per-row working set: binned row, weights, int64 histogram codes, routing
+        row_bytes = n_features * 17 + self.n_trees + 64
+        chunk_rows = max(1, int(memory_budget_bytes // 4 // row_bytes))
+        # Per open node: its float64 histogram, plus the same again for the
+        # bincount temporary a pass adds into it (one tree may own every slot).
+        # Splitting a node afterwards needs a few histogram-sized temporaries
+        # (cumulative counts, entropy terms), kept back as fixed headroom.
+        node_bytes = n_features * n_bins * n_classes * 8
+        slot_bytes = node_bytes * 2
+        split_bytes = node_bytes * SPLIT_SCRATCH_HISTOGRAMS
+        max_slots = max(1, int((memory_budget_bytes - chunk_rows * row_bytes - split_bytes) // slot_bytes))
+        chunks = [(start, min(start + chunk_rows, n_samples))
+                  for start in range(0, n_samples, chunk_rows)]
+        
+        params = {
+            'max_depth': self.max_depth,
+            'min_samples_split': self.min_samples_split,
+            'max_features': self.max_features,
+            'profile': self.profile
+        }
+        trees, builders, bootstrap_rngs = [], [], []
+        for seed in self._tree_seeds(0, self.n_trees):
+            bootstrap_seed, split_seed = seed.spawn(2)
+            tree = DecisionTree(**params, random_state=np.random.default_rng(split_seed))
+            tree.classes_ = classes
+            tree._prepare_feature_sampling(n_features)
+            tree._start_profile()
+            # Thresholds are bin indices until the tree is finished
+            nodes = _NodeBuffer()
+            nodes.add_leaf(0)
+            trees.append(tree)
+            builders.append((nodes, [0]))
+            bootstrap_rngs.append(np.random.default_rng(bootstrap_seed))
+        
+        with tempfile.TemporaryDirectory(prefix='forest-', dir=work_dir) as tmp_dir:
+            weights = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, 'weights.npy'), mode='w+',
+                dtype=np.uint8, shape=(n_samples, self.n_trees)
             )
-            tree.fit(X_sample, y_sample)
-            self.trees.append(tree)
+            for start, stop in chunks:
+                block = np.empty((stop - start, self.n_trees), dtype=np.uint8)
+                for t, rng in enumerate(bootstrap_rngs):
+                    block[:, t] = np.minimum(rng.poisson(self.sample_ratio, stop - start), 255)
+                weights[start:stop] = block
+            
+            open_nodes = [(t, 0) for t in range(self.n_trees)]
+            n_passes = 0
+            while open_nodes:
+                next_open = []
+                for group_start in range(0, len(open_nodes), max_slots):
+                    group = open_nodes[group_start:group_start + max_slots]
+                    pass_start = time.perf_counter()
+                    hist = self._stream_histograms(X_binned, y_encoded, weights, chunks,
+                                                   builders, group, n_bins, n_classes)
+                    n_passes += 1
+                    if self.profile:
+                        # Passes are shared by all trees; split the time evenly
+                        pass_seconds = (time.perf_counter() - pass_start) / len(group)
+                    for slot, (t, node) in enumerate(group):
+                        if self.profile:
+                            trees[t]._profile.record(builders[t][1][node], pass_seconds)
+                        next_open.extend(
+                            (t, child) for child in
+                            self._split_streamed_node(trees[t], builders[t], node, hist[slot])
+                        )
+                open_nodes = next_open
+            
+            routing = [nodes.to_arrays() for nodes, _ in builders]
+            if self.oob_score:
+                self._stream_oob_score(X_binned, y_encoded, weights, chunks, routing, n_classes)
+        
+        for tree, arrays in zip(trees, routing):
+            split = arrays.feature >= 0
+            arrays.threshold[split] = [
+                bin_edges[feature][int(bin_idx)]
+                for feature, bin_idx in zip(arrays.feature[split], arrays.threshold[split])
+            ]
+            tree.nodes_ = arrays
+            tree._finish_profile()
+            if tree.profile_ is not None:
+                # Trees grow interleaved, so their time is their share of the passes
+                tree.profile_['seconds'] = sum(level['seconds'] for level in tree.profile_['levels'])
+            del tree._rng
+        self.trees = trees
+        if self.profile:
+            self._set_profile(trees, time.perf_counter() - started)
+        self.out_of_core_passes_ = {'passes': n_passes, 'chunks': len(chunks), 'chunk_rows': chunk_rows}
         return self
 
+    @staticmethod
+    def _stream_histograms(X_binned, y_encoded, weights, chunks, builders, group,
+                           n_bins, n_classes):
+        """Weighted (feature, bin, class) histograms for each open node in ``group``."""
+        n_features = X_binned.shape[1]
+        node_size = n_features * n_bins * n_classes
+        hist = np.zeros((len(group), n_features, n_bins, n_classes))
+        
+        # group is ordered by tree, so each tree's slots are one contiguous range
+        routing = {}
+        for slot, (t, node) in enumerate(group):
+            if t not in routing:
+                arrays = builders[t][0].to_arrays()
+                routing[t] = [arrays, np.full(arrays.node_count, -1, dtype=np.intp), slot, 0]
+            routing[t][1][node] = slot - routing[t][2]
+            routing[t][3] += 1
+        
+        feature_offsets = np.arange(n_features) * (n_bins * n_classes)
+        for start, stop in chunks:
+            X_chunk = np.asarray(X_binned[start:stop])
+            y_chunk = np.asarray(y_encoded[start:stop])
+            w_chunk = np.asarray(weights[start:stop])
+            for t, (arrays, local_slot, first_slot, n_slots) in routing.items():
+                slots = local_slot[arrays.apply(X_chunk)]
+                rows = np.flatnonzero((slots >= 0) & (w_chunk[:, t] > 0))
+                if not rows.size:
+                    continue
+                codes = X_chunk[rows].astype(np.intp) * n_classes
+                codes += y_chunk[rows, None]
+                codes += feature_offsets
+                codes += slots[rows, None] * node_size
+                counts = np.bincount(
+                    codes.ravel(),
+                    weights=np.repeat(w_chunk[rows, t].astype(np.float64), n_features),
+                    minlength=n_slots * node_size
+                )
+                hist[first_slot:first_slot + n_slots] += counts.reshape(
+                    n_slots, n_features, n_bins, n_classes
+                )
+        return hist
+
+    def _split_streamed_node(self, tree, builder, node, hist):
+        """Split ``node`` using its histogram; return the children that need one too."""
+        nodes, depths = builder
+        counts = hist[0].sum(axis=0)
+        nodes.value[node] = int(np.argmax(counts))
+        if tree._profile is not None:
+            tree._profile.record(depths[node], nodes=1, largest_node=counts.sum())
+        if not self._can_split(counts, depths[node]):
+            return []
+        feature_idx, bin_idx = tree._best_histogram_split(hist, depths[node])
+        if feature_idx is None:
+            return []
+        if tree._profile is not None:
+            tree._profile.record(depths[node], splits=1)
+        
+        nodes.feature[node] = feature_idx
+        nodes.threshold[node] = bin_idx
+        nodes.value[node] = -1
+        left_counts = hist[feature_idx, :bin_idx + 1].sum(axis=0)
+        open_children = []
+        children = []
+        for child_counts in (left_counts, counts - left_counts):
+            child = nodes.add_leaf(int(np.argmax(child_counts)))
+            depths.append(depths[node] + 1)
+            children.append(child)
+            # Children that will stay leaves need no histogram pass
+            if self._can_split(child_counts, depths[child]):
+                open_children.append(child)
+        nodes.set_children(node, *children)
+        return open_children
+
+    def _can_split(self, counts, depth):
+        return not ((self.max_depth is not None and depth >= self.max_depth) or
+                    counts.sum() < self.min_samples_split or
+                    np.count_nonzero(counts) <= 1)
+
+    def _stream_oob_score(self, X_binned, y_encoded, weights, chunks, routing, n_classes):
+        """OOB accuracy accumulated chunk by chunk from rows with zero bootstrap weight."""
+        correct = 0
+        scored = 0
+        for start, stop in chunks:
+            X_chunk = np.asarray(X_binned[start:stop])
+            y_chunk = np.asarray(y_encoded[start:stop])
+            w_chunk = np.asarray(weights[start:stop])
+            votes = np.zeros((stop - start, n_classes))
+            for t, arrays in enumerate(routing):
+                rows = np.flatnonzero(w_chunk[:, t] == 0)
+                votes[rows, arrays.value[arrays.apply(X_chunk[rows])]] += 1
+            has_votes = votes.sum(axis=1) > 0
+            correct += int(np.sum(np.argmax(votes[has_votes], axis=1) == y_chunk[has_votes]))
+            scored += int(has_votes.sum())
+        if scored < len(y_encoded):
+            warnings.warn(f"{len(y_encoded) - scored} samples were never out-of-bag; "
+                          "they are excluded from the OOB score", RuntimeWarning)
+        self.oob_score_ = correct / scored if scored else None
+
+    def _tree_votes(self, X):
+        """Class code predicted by every tree for every sample; shape (n_trees, n_samples)."""
+        votes = np.empty((len(self.trees), len(X)), dtype=np.intp)
+        for i, tree in enumerate(self.trees):
+            # Map the tree's own class codes onto the forest's
+            lookup = np.searchsorted(self.classes_, tree.classes_)
+            votes[i] = lookup[tree.nodes_.value[tree.apply(X)]]
+        return votes
+
+    def predict_proba(self, X):
+        """Fraction of trees voting for each class; columns follow ``classes_``."""
+        X = np.asarray(X)
+        n_samples, n_classes = len(X), len(self.classes_)
+        votes = self._tree_votes(X)
+        # One bincount over (sample, class) cells accumulates every tree's vote
+        cells = votes + (np.arange(n_samples) * n_classes)[None, :]
+        counts = np.bincount(cells.ravel(), minlength=n_samples * n_classes)
+        return counts.reshape(n_samples, n_classes) / len(self.trees)
+
     def predict(self, X):
         """Make predictions using majority voting."""
-        predictions = np.array([tree.predict(X) for tree in self.trees])
-        return np.array([Counter(pred).most_common(1)[0][0] for pred in predictions.T]) 
\ No newline at end of file
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -1,8 +1,14 @@
 from flask import Blueprint, request, jsonify
 from .services.service_manager import ServiceManager
+from .services.warmup import WarmupState, start_warmup
 
 api = Blueprint('api', __name__)
 service_manager = ServiceManager()
+warmup_state = WarmupState()
+
+@api.record_once
+def begin_warmup(setup_state):
+    start_warmup(warmup_state, service_manager.warm_up)
 
 @api.route('/analyze', methods=['POST'])
 def analyze_health():
@@ -32,4 +38,15 @@ def analyze_health():
 
 @api.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy'}) 
\ No newline at end of file
+    return jsonify({'status': 'healthy'})
+
+@api.route('/health/live', methods=['GET'])
+def liveness():
+    return jsonify({'status': 'alive'})
+
+@api.route('/health/ready', methods=['GET'])
+def readiness():
+    report = warmup_state.report()
+    if not report['ready']:
+        return jsonify({'status': 'warming_up', **report}), 503
+    return jsonify({'status': 'ready', **report})
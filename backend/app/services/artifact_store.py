@@ -0,0 +1,152 @@
+import os
+import json
+import errno
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime
+
+import joblib
+
+from .model_registry import DEFAULT_MODEL_KEY, model_filename, validate_model_key
+
+VERSIONS_DIR = 'versions'
+ARTIFACT_FILENAME = 'model.joblib'
+MANIFEST_FILENAME = 'manifest.json'
+PUBLISHED_FILENAME = 'published.json'
+# Version numbers tried before giving up when concurrent saves keep winning
+MAX_VERSION_CLAIMS = 100
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """
+    Immutable, numbered model versions under ``<models_dir>/versions/<key>/``.
+
+    Each version directory holds the joblib artifact and a manifest with its
+    checksum, metrics and training parameters. Publishing copies a verified
+    version to the live file the registry serves (``crop_model[_<key>].joblib``)
+    and appends it to ``published.json``, so rolling back is publishing the
+    previous entry again.
+    """
+
+    def __init__(self, models_dir, default_key=DEFAULT_MODEL_KEY):
+        self.models_dir = models_dir
+        self.default_key = default_key
+
+    def _key_dir(self, key):
+        validate_model_key(key)
+        return os.path.join(self.models_dir, VERSIONS_DIR, key)
+
+    def version_dir(self, key, version):
+        validate_model_key(version)
+        return os.path.join(self._key_dir(key), version)
+
+    def artifact_path(self, key, version):
+        return os.path.join(self.version_dir(key, version), ARTIFACT_FILENAME)
+
+    def live_path(self, key):
+        return os.path.join(self.models_dir, model_filename(key, self.default_key))
+
+    def versions(self, key):
+        """Version names for ``key``, oldest first."""
+        key_dir = self._key_dir(key)
+        if not os.path.isdir(key_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(key_dir)
+            if name.startswith('v') and os.path.exists(os.path.join(key_dir, name, MANIFEST_FILENAME))
+        )
+
+    def manifest(self, key, version):
+        with open(os.path.join(self.version_dir(key, version), MANIFEST_FILENAME)) as f:
+            return json.load(f)
+
+    def save(self, key, components, metrics=None, params=None, **extra):
+        """Write ``components`` as the next version of ``key`` (not yet published)."""
+        key_dir = self._key_dir(key)
+        os.makedirs(key_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.saving-', dir=key_dir)
+        try:
+            artifact = os.path.join(tmp_dir, ARTIFACT_FILENAME)
+            joblib.dump(components, artifact)
+            manifest = {
+                'key': key,
+                'created': datetime.utcnow().isoformat(),
+                'sha256': file_sha256(artifact),
+                'bytes': os.path.getsize(artifact),
+                'metrics': metrics or {},
+                'params': params or {},
+                **extra
+            }
+            # Claim the next version number; a concurrent save takes the one after
+            for attempt in range(MAX_VERSION_CLAIMS):
+                existing = self.versions(key)
+                number = int(existing[-1][1:]) + 1 if existing else 1
+                manifest['version'] = f"v{number:04d}"
+                with open(os.path.join(tmp_dir, MANIFEST_FILENAME), 'w') as f:
+                    json.dump(manifest, f, indent=2, default=str)
+                try:
+                    os.rename(tmp_dir, os.path.join(key_dir, manifest['version']))
+                    break
+                except OSError as e:
+                    # Renaming onto an existing version directory is the only
+                    # retryable failure; permissions, full disks etc. are not
+                    if e.errno not in (errno.EEXIST, errno.ENOTEMPTY) or \
+                       attempt == MAX_VERSION_CLAIMS - 1:
+                        raise
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        print(f"Saved model '{key}' version {manifest['version']}")
+        return manifest
+
+    def verify(self, key, version):
+        """True if the artifact still matches the checksum in its manifest."""
+        return file_sha256(self.artifact_path(key, version)) == self.manifest(key, version)['sha256']
+
+    def _published(self, key):
+        path = os.path.join(self._key_dir(key), PUBLISHED_FILENAME)
+        if not os.path.exists(path):
+            return {'current': None, 'history': []}
+        with open(path) as f:
+            return json.load(f)
+
+    def current(self, key):
+        """The version currently served as ``key``, if it was published from the store."""
+        return self._published(key)['current']
+
+    def publish(self, key, version):
+        """Make ``version`` the live artifact for ``key``."""
+        if not self.verify(key, version):
+            raise ValueError(f"Checksum mismatch for model '{key}' version {version}")
+        live_path = self.live_path(key)
+        tmp_path = live_path + '.tmp'
+        shutil.copyfile(self.artifact_path(key, version), tmp_path)
+        os.replace(tmp_path, live_path)
+
+        published = self._published(key)
+        published['current'] = version
+        published['history'].append({'version': version, 'published': datetime.utcnow().isoformat()})
+        path = os.path.join(self._key_dir(key), PUBLISHED_FILENAME)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(published, f, indent=2)
+        os.replace(path + '.tmp', path)
+        print(f"Published model '{key}' version {version} to {live_path}")
+        return version
+
+    def rollback(self, key):
+        """Re-publish the version that was live before the current one."""
+        published = self._published(key)
+        current = published['current']
+        for entry in reversed(published['history']):
+            if entry['version'] != current:
+                return self.publish(key, entry['version'])
+        raise ValueError(f"No earlier published version of model '{key}' to roll back to")
@@ -0,0 +1,61 @@
+DEFAULT_PROVIDER_PREMIUM_RANGE = [5000, 8000]
+DEFAULT_RECOMMENDED_PREMIUM_RANGE = [5000, 50000]
+
+
+def _premium_range(value, default):
+    low, high = value if value is not None else default
+    return {'min': int(low), 'max': int(high)}
+
+
+def build_assessment_document(user_data, risk_score, risk_level, search_data):
+    """
+    The assessment document stored for one profile.
+
+    ``search_data`` has the shape ``SearchService.search_insurance_info``
+    returns; ``/api/analyze`` passes that directly and the bulk endpoint
+    builds the same structure from its batch results, so a member assessed
+    either way is stored identically.
+    """
+    providers = []
+    for provider in search_data.get('providers', []):
+        providers.append({
+            'name': provider.get('name', ''),
+            'description': provider.get('description', ''),
+            'rating': 4.5,  # Default rating
+            'match_score': provider.get('match_score'),
+            'premium_range': _premium_range(provider.get('monthly_premium_range'),
+                                            DEFAULT_PROVIDER_PREMIUM_RANGE),
+            'features': provider.get('features', []),
+            'plan_types': [
+                {
+                    'type': opt.get('title', ''),
+                    'description': opt.get('description', '')
+                } for opt in provider.get('coverage_options', [])
+            ],
+            'links': {
+                'quote': provider.get('website', ''),
+                'details': provider.get('plan_link', '')
+            }
+        })
+
+    search_assessment = search_data.get('risk_assessment', {})
+    recommendations = search_assessment.get('recommendations', {})
+    return {
+        'user_data': user_data,
+        'risk_score': risk_score,
+        'search_results': search_data.get('search_results', []),
+        'providers': providers,
+        'risk_assessment': {
+            'risk_level': risk_level,
+            'risk_factors': search_data.get('health_factors', []),
+            'positive_factors': search_assessment.get('positive_factors', []),
+            'recommendations': {
+                'coverage_level': recommendations.get('coverage_level', 'Standard'),
+                'premium_range': _premium_range(recommendations.get('premium_range'),
+                                                DEFAULT_RECOMMENDED_PREMIUM_RANGE),
+                'coverage_types': recommendations.get('coverage_types', []),
+                'justification': recommendations.get('justification', [])
+            }
+        },
+        'ai_analysis': search_data.get('ai_analysis')
+    }
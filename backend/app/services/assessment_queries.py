@@ -0,0 +1,85 @@
+import base64
+import binascii
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+# Fields the history list returns; every one is in both history indexes, so
+# with ``_id`` also indexed the listing is answered from the index alone
+HISTORY_FIELDS = [
+    ('risk_score', 1),
+    ('risk_assessment.risk_level', 1),
+    ('user_data.age', 1),
+    ('user_data.bmi', 1),
+    ('user_data.blood_pressure', 1)
+]
+
+HISTORY_INDEX = 'history_timestamp'
+USER_HISTORY_INDEX = 'history_user_timestamp'
+
+ASSESSMENT_INDEXES = {
+    HISTORY_INDEX: [('timestamp', -1), ('_id', -1)] + HISTORY_FIELDS,
+    USER_HISTORY_INDEX: [('user_id', 1), ('timestamp', -1), ('_id', -1)] + HISTORY_FIELDS
+}
+
+HISTORY_PROJECTION = {'_id': 1, 'timestamp': 1, **{field: 1 for field, _ in HISTORY_FIELDS}}
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+def ensure_indexes(collection):
+    """Create the history indexes if missing; failures are logged, not fatal."""
+    for name, keys in ASSESSMENT_INDEXES.items():
+        try:
+            collection.create_index(keys, name=name)
+        except Exception as e:
+            print(f"Error creating index {name} on {collection.name}: {str(e)}")
+
+
+def encode_cursor(document):
+    """Opaque page token for the ``(timestamp, _id)`` of the last row returned."""
+    raw = f"{document['timestamp'].isoformat()}|{document['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, object_id = raw.split('|')
+        return datetime.fromisoformat(timestamp), ObjectId(object_id)
+    except (ValueError, binascii.Error, InvalidId, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def history_query(user_id=None, cursor=None):
+    """Filter for one page of history, newest first, after ``cursor`` if given."""
+    query = {}
+    if user_id is not None:
+        query['user_id'] = user_id
+    if cursor:
+        timestamp, object_id = decode_cursor(cursor)
+        # Keyset: strictly older, or the same timestamp with a smaller _id
+        query['$or'] = [
+            {'timestamp': {'$lt': timestamp}},
+            {'timestamp': timestamp, '_id': {'$lt': object_id}}
+        ]
+    return query
+
+
+def find_history(collection, user_id=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return ``(assessments, next_cursor)`` for one page of history.
+
+    One extra row is fetched to tell whether another page exists, so the
+    last page comes back with ``next_cursor`` None.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    rows = list(
+        collection.find(history_query(user_id, cursor), HISTORY_PROJECTION)
+        .sort([('timestamp', -1), ('_id', -1)])
+        .limit(limit + 1)
+    )
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
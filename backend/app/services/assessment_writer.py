@@ -0,0 +1,216 @@
+import os
+import copy
+import time
+import queue
+import threading
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY = 11000
+
+
+class AssessmentWriter:
+    """
+    Write-behind persistence for assessment documents.
+
+    ``submit`` assigns the ``_id`` up front and queues the document, so the
+    request returns without waiting on Mongo. A background thread drains the
+    queue with ``insert_many``, flushing when ``batch_size`` documents are
+    waiting or ``flush_interval`` seconds have passed since the first one.
+
+    The queue is bounded: when it is full ``submit`` waits up to
+    ``put_timeout`` seconds and then writes the document synchronously, so a
+    slow database pushes back on callers instead of growing memory. Queued
+    documents stay readable through ``get`` until they are written.
+
+    ``start`` is cheap to call repeatedly and is meant to run in each
+    serving process: a writer inherited across ``fork`` (e.g. gunicorn
+    ``--preload``) has no thread in the child, so it starts afresh there.
+    """
+
+    def __init__(self, collection, batch_size=100, flush_interval=1.0, queue_size=10000,
+                 put_timeout=0.5, max_retries=3):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.queue_size = queue_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pid = os.getpid()
+        self._counters = {
+            'submitted': 0, 'written': 0, 'batches': 0, 'sync_writes': 0,
+            'retries': 0, 'failed': 0
+        }
+        self._last_flush = {'documents': 0, 'seconds': 0.0}
+        self._thread = None
+
+    def start(self):
+        """Start the writer thread in this process if it is not running."""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='assessment-writer', daemon=True)
+                self._thread.start()
+
+    def _reset_after_fork(self):
+        # The parent's thread, lock and queued documents don't exist here
+        self._pid = os.getpid()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._pending = {}
+        self._counters = dict.fromkeys(self._counters, 0)
+        self._last_flush = {'documents': 0, 'seconds': 0.0}
+
+    def stop(self, timeout=10):
+        """Flush everything still queued and stop the writer thread."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        try:
+            # Wake a thread waiting on an empty queue; a full one has work to do anyway
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        if thread.is_alive():
+            print(f"Assessment writer did not finish within {timeout}s; "
+                  f"{self._queue.qsize()} assessments still queued")
+        self._thread = None
+        print(f"Assessment writer stopped: {self.metrics()}")
+
+    def submit(self, document):
+        """Queue ``document`` for insertion and return its pre-generated ObjectId."""
+        document.setdefault('_id', ObjectId())
+        with self._lock:
+            self._pending[document['_id']] = document
+            self._counters['submitted'] += 1
+        if self._thread is not None and not self._stopping.is_set():
+            try:
+                self._queue.put(document, timeout=self.put_timeout)
+            except queue.Full:
+                pass
+            else:
+                if self._stopping.is_set():
+                    # stop() may have drained the queue before this put landed
+                    self._drain_after_stop()
+                return document['_id']
+        # Queue saturated (or writer not running): pay for the write in the request
+        with self._lock:
+            self._counters['sync_writes'] += 1
+        self._write([document])
+        return document['_id']
+
+    def _drain_after_stop(self):
+        """Write whatever is queued from the caller once the writer is stopping."""
+        # Items are taken off the queue once, so this and the thread's own
+        # shutdown drain never write the same document twice
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                batch.append(item)
+        if not batch:
+            return
+        with self._lock:
+            self._counters['sync_writes'] += len(batch)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
+
+    def get(self, document_id):
+        """A copy of a submitted document that has not been written yet, or None."""
+        with self._lock:
+            document = self._pending.get(document_id)
+            return copy.deepcopy(document) if document is not None else None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is None:
+                continue
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is not None:
+                    batch.append(item)
+            self._write(batch)
+
+        # Shutdown: drain whatever is still queued
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        remaining = batch
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.collection.insert_many(remaining, ordered=False)
+                remaining = []
+            except BulkWriteError as e:
+                # Ids are fixed up front, so a duplicate key means an earlier attempt landed
+                failed = {error['index'] for error in e.details.get('writeErrors', [])
+                          if error.get('code') != DUPLICATE_KEY}
+                remaining = [doc for i, doc in enumerate(remaining) if i in failed]
+                if remaining:
+                    print(f"Error writing {len(remaining)} assessments: {str(e)}")
+            except Exception as e:
+                print(f"Error writing {len(remaining)} assessments (attempt {attempt + 1}): {str(e)}")
+            if not remaining or attempt == self.max_retries:
+                break
+            with self._lock:
+                self._counters['retries'] += 1
+            time.sleep(min(0.1 * 2 ** attempt, 2.0))
+
+        if remaining:
+            print(f"Dropping {len(remaining)} assessments after {self.max_retries + 1} attempts: "
+                  f"{', '.join(str(doc['_id']) for doc in remaining)}")
+        with self._lock:
+            for doc in batch:
+                self._pending.pop(doc['_id'], None)
+            self._counters['written'] += len(batch) - len(remaining)
+            self._counters['failed'] += len(remaining)
+            self._counters['batches'] += 1
+            self._last_flush = {'documents': len(batch), 'seconds': time.perf_counter() - start}
+
+    def metrics(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'queued': self._queue.qsize(),
+                'pending': len(self._pending),
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval,
+                'last_flush': dict(self._last_flush)
+            }
@@ -0,0 +1,204 @@
+from collections import Counter
+
+import numpy as np
+
+from .search_service import SearchService
+from .assessment_document import build_assessment_document
+
+REQUIRED_FIELDS = ['age', 'gender', 'bmi', 'blood_pressure', 'cholesterol',
+                   'smoker', 'exercise_frequency', 'family_history']
+NUMERIC_FIELDS = ['age', 'bmi', 'blood_pressure', 'cholesterol']
+# Compared case-insensitively by the scoring rules
+LOWERCASE_FIELDS = ['smoker', 'exercise_frequency']
+OPTIONAL_FIELDS = {'previous_conditions': 'none'}
+
+
+def _to_float(values):
+    """Parse a column to float64; returns ``(array, bad_mask)`` with NaN where parsing failed."""
+    column = np.array(values, dtype=object)
+    try:
+        parsed = column.astype(np.float64)
+        return parsed, np.isnan(parsed)
+    except (ValueError, TypeError):
+        pass
+    # Slow path only when the column has bad entries, to find which
+    parsed = np.full(len(column), np.nan)
+    for i, value in enumerate(column):
+        try:
+            parsed[i] = float(value)
+        except (ValueError, TypeError):
+            pass
+    return parsed, np.isnan(parsed)
+
+
+def validate_profiles(profiles):
+    """
+    Validate a list of profile dicts column by column.
+
+    Returns ``(columns, valid, errors)``: ``columns`` maps each field to an
+    array over the valid profiles only, ``valid`` is the index of each
+    valid profile in the input, and ``errors`` maps input index to messages.
+    """
+    errors = {}
+    not_object = np.array([not isinstance(profile, dict) for profile in profiles], dtype=bool)
+    for i in np.flatnonzero(not_object):
+        errors[int(i)] = ['Profile must be an object']
+    bad = not_object.copy()
+
+    raw = {
+        field: [profile.get(field) if isinstance(profile, dict) else None for profile in profiles]
+        for field in REQUIRED_FIELDS + list(OPTIONAL_FIELDS)
+    }
+    for field in REQUIRED_FIELDS:
+        missing = np.array([value is None for value in raw[field]], dtype=bool) & ~not_object
+        for i in np.flatnonzero(missing):
+            errors.setdefault(int(i), []).append(f'Missing required field: {field}')
+        bad |= missing
+
+    columns = {}
+    for field in NUMERIC_FIELDS:
+        parsed, invalid = _to_float(raw[field])
+        invalid &= ~bad
+        for i in np.flatnonzero(invalid):
+            errors.setdefault(int(i), []).append(f'Invalid number for {field}: {raw[field][i]!r}')
+        columns[field] = parsed
+    for field in NUMERIC_FIELDS:
+        bad |= np.isnan(columns[field])
+
+    for field in LOWERCASE_FIELDS:
+        columns[field] = np.char.lower(np.array([str(value) for value in raw[field]]))
+    columns['family_history'] = np.array([str(value) for value in raw['family_history']])
+    for field, default in OPTIONAL_FIELDS.items():
+        columns[field] = np.array([default if value is None else str(value) for value in raw[field]])
+
+    valid = np.flatnonzero(~bad)
+    return {field: column[valid] for field, column in columns.items()}, valid, errors
+
+
+def _format_factor(factor):
+    return factor.replace('_', ' ').title()
+
+
+def build_bulk_assessments(profiles, columns, risk_scores, risk_levels, matches, search_service, top_providers=4):
+    """
+    Turn batch scores into per-member assessment documents and API results.
+    Documents go through ``build_assessment_document`` like ``/api/analyze``'s,
+    from the same data ``search_insurance_info`` would return for the member.
+    ``profiles`` are the valid input profiles in column order.
+    """
+    plans = search_service.insurance_plans
+    plan_keys = matches['plan_keys']
+    documents, results = [], []
+    for row, profile in enumerate(profiles):
+        factors = [
+            columns['previous_conditions'][row] if name == 'previous_conditions' else name
+            for name, flagged in zip(SearchService.HEALTH_FACTORS, matches['health_factors'][row]) if flagged
+        ]
+        risk_factors = [_format_factor(factor) for factor in factors]
+        positive_factors = [name for name, flagged
+                            in zip(SearchService.POSITIVE_FACTORS, matches['positive_factors'][row]) if flagged]
+
+        providers = []
+        for p in matches['plan_ranking'][row][:top_providers]:
+            plan = plans[plan_keys[p]]
+            premium_min, premium_max = int(matches['premium_min'][row, p]), int(matches['premium_max'][row, p])
+            providers.append({
+                'name': plan['provider'],
+                'website': plan['website'],
+                'plan_link': plan['plan_link'],
+                'features': plan['features'],
+                'match_score': int(matches['match_scores'][row, p]),
+                'monthly_premium_range': (premium_min, premium_max),
+                'coverage_options': [{
+                    'title': f"{plan['name']} Coverage",
+                    'description': f"Monthly premium range: ₹{premium_min:,} - ₹{premium_max:,}"
+                }]
+            })
+
+        r = matches['recommended_plan'][row]
+        recommended = plans[plan_keys[r]]
+        premium_range = (int(matches['premium_min'][row, r]), int(matches['premium_max'][row, r]))
+        match_score = int(matches['match_scores'][row, r])
+        search_level = str(matches['risk_level'][row])
+        numbers = {field: columns[field][row] for field in NUMERIC_FIELDS}
+        search_data = {
+            'providers': providers,
+            'health_factors': risk_factors,
+            'search_results': [],
+            'ai_analysis': search_service.generate_health_analysis(numbers, factors, positive_factors,
+                                                                   search_level),
+            'risk_assessment': {
+                'positive_factors': positive_factors,
+                'recommendations': {
+                    'coverage_level': recommended['name'],
+                    'premium_range': premium_range,
+                    'coverage_types': recommended['features'],
+                    'justification': [
+                        f"Risk level assessment: {search_level.capitalize()}",
+                        f"Based on identified health factors: {', '.join(risk_factors) if risk_factors else 'No significant health risks'}",
+                        f"Positive health indicators: {', '.join(positive_factors) if positive_factors else 'None identified'}",
+                        f"Best suited for: {', '.join(recommended['best_for'])}",
+                        f"Plan match score: {match_score}%"
+                    ]
+                }
+            }
+        }
+        documents.append(build_assessment_document(profile, float(risk_scores[row]),
+                                                   str(risk_levels[row]), search_data))
+        results.append({
+            'risk_score': float(risk_scores[row]),
+            'risk_level': str(risk_levels[row]),
+            'recommended_plan': {
+                'key': str(plan_keys[r]),
+                'name': recommended['name'],
+                'provider': recommended['provider'],
+                'premium_range': {'min': premium_range[0], 'max': premium_range[1]},
+                'match_score': match_score
+            },
+            'risk_factors': risk_factors,
+            'positive_factors': positive_factors
+        })
+    return documents, results
+
+
+def group_summary(n_submitted, columns, risk_scores, risk_levels, matches):
+    """Aggregate statistics for one bulk submission (valid members only)."""
+    n_valid = len(risk_scores)
+    summary = {
+        'members': n_submitted,
+        'assessed': n_valid,
+        'rejected': n_submitted - n_valid
+    }
+    if not n_valid:
+        return summary
+
+    rows = np.arange(n_valid)
+    recommended = matches['recommended_plan']
+    levels, level_counts = np.unique(risk_levels, return_counts=True)
+    plan_names, plan_counts = np.unique(matches['plan_keys'][recommended], return_counts=True)
+
+    factor_counts = Counter({
+        _format_factor(name): int(count)
+        for name, count in zip(SearchService.HEALTH_FACTORS, matches['health_factors'].sum(axis=0))
+        if count and name != 'previous_conditions'
+    })
+    flagged = matches['health_factors'][:, SearchService.HEALTH_FACTORS.index('previous_conditions')]
+    factor_counts.update(_format_factor(value) for value in columns['previous_conditions'][flagged])
+
+    summary.update({
+        'risk_levels': {str(level): int(count) for level, count in zip(levels, level_counts)},
+        'risk_score': {
+            'mean': float(risk_scores.mean()),
+            'median': float(np.median(risk_scores)),
+            'p90': float(np.percentile(risk_scores, 90)),
+            'max': float(risk_scores.max())
+        },
+        'recommended_plans': {str(key): int(count) for key, count in zip(plan_names, plan_counts)},
+        'monthly_premium_total': {
+            'min': int(matches['premium_min'][rows, recommended].sum()),
+            'max': int(matches['premium_max'][rows, recommended].sum())
+        },
+        'top_risk_factors': dict(factor_counts.most_common(10))
+    })
+    return summary
+
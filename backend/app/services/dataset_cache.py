@@ -0,0 +1,101 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+# Bump when the cached layout changes so old entries are never reused
+CACHE_FORMAT_VERSION = 1
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """
+    Preprocessed datasets stored as plain ``.npy`` files, one directory per
+    entry, so repeat runs memory-map them instead of re-parsing the CSV.
+
+    An entry is keyed by the source file's content hash plus the parameters
+    used to build it, so editing the CSV (or changing the split) simply
+    produces a different key; entries built from an older version of the
+    same file are removed when a new one is written.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def key(self, source_sha256, **params):
+        payload = json.dumps({
+            'version': CACHE_FORMAT_VERSION,
+            'source_sha256': source_sha256,
+            'params': params
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root_dir, key)
+
+    def load(self, key):
+        """Return ``(arrays, meta)`` for a cached entry, or None on a miss."""
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(entry_dir, f'{name}.npy'), mmap_mode='r')
+            for name in meta['arrays']
+        }
+        return arrays, meta
+
+    def save(self, key, arrays, source_path=None, source_sha256=None, **meta):
+        """Write an entry atomically; readers never see a partial directory."""
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{key}-', dir=self.root_dir)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+            meta.update({
+                'arrays': sorted(arrays),
+                'source': os.path.abspath(source_path) if source_path else None,
+                'source_sha256': source_sha256,
+                'created': datetime.utcnow().isoformat()
+            })
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent=2)
+            try:
+                os.rename(tmp_dir, self._entry_dir(key))
+            except OSError:
+                # Another run cached the same key first; theirs is identical
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        if source_path:
+            self._remove_stale(meta['source'], source_sha256)
+
+    def _remove_stale(self, source, source_sha256):
+        """Drop entries built from an older version of the same source file."""
+        for name in os.listdir(self.root_dir):
+            if name.startswith('.'):
+                continue
+            meta_path = os.path.join(self.root_dir, name, 'meta.json')
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                if meta.get('source') != source or meta.get('source_sha256') == source_sha256:
+                    continue
+            except (OSError, ValueError):
+                continue
+            shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
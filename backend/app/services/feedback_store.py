@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+
+FEATURE_COLUMNS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+LABEL_COLUMNS = ['label', 'outcome', 'model']
+SEGMENT_PREFIX = 'segment-'
+
+
+def _default_file_mode():
+    """The mode ``open()`` would give a new file under the current umask."""
+    # The umask can only be read by setting it; do it once, at construction
+    mask = os.umask(0)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+class FeedbackStore:
+    """
+    Append-only columnar store for farmer feedback.
+
+    Records are buffered in memory and written in batches as immutable
+    segments (``segment-<seq>.npz``), one array per column, so a reader can
+    load exactly the segments it has not seen before.
+
+    A batch is written once ``batch_size`` records are waiting or the oldest
+    has waited ``flush_interval`` seconds; ``start`` runs a timer thread so
+    a quiet period doesn't leave records sitting in memory.
+    """
+
+    def __init__(self, root_dir, batch_size=100, flush_interval=30.0):
+        self.root_dir = root_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._next_seq = self._last_seq() + 1
+        # mkstemp creates 0600 files; segments get the mode a plain open() would
+        self._file_mode = _default_file_mode()
+
+    def _last_seq(self):
+        seqs = [int(name[len(SEGMENT_PREFIX):-len('.npz')]) for name in self.segments()]
+        return max(seqs) if seqs else 0
+
+    def segments(self):
+        """Return the names of all flushed segments in write order."""
+        names = [name for name in os.listdir(self.root_dir)
+                 if name.startswith(SEGMENT_PREFIX) and name.endswith('.npz')]
+        return sorted(names)
+
+    def start(self):
+        """Start the thread that flushes batches older than ``flush_interval``."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='feedback-flush', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the timer thread and flush whatever is still buffered."""
+        thread = self._thread
+        if thread is not None:
+            self._stopping.set()
+            thread.join(timeout)
+            self._thread = None
+        return self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval / 2):
+            try:
+                with self._lock:
+                    if self._due():
+                        self._flush_locked()
+            except Exception as e:
+                print(f"Error flushing feedback: {str(e)}")
+
+    def _due(self):
+        return self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval
+
+    def add(self, record):
+        """Buffer one feedback record, flushing when a batch is full or old enough."""
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size or self._due():
+                self._flush_locked()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Write any buffered records as a new segment."""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return None
+        records, self._buffer = self._buffer, []
+        self._oldest = None
+
+        columns = {
+            col: np.array([float(r[col]) for r in records], dtype=np.float64)
+            for col in FEATURE_COLUMNS
+        }
+        for col in LABEL_COLUMNS:
+            columns[col] = np.array([str(r.get(col) or '') for r in records])
+        columns['timestamp'] = np.array(
+            [r.get('timestamp') or datetime.utcnow().isoformat() for r in records]
+        )
+
+        fd, tmp_path = tempfile.mkstemp(prefix='.segment-', suffix='.tmp', dir=self.root_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **columns)
+            os.chmod(tmp_path, self._file_mode)
+            # Other workers write to the same directory: link() claims the name
+            # atomically and fails if it is taken, so no segment is overwritten.
+            # Readers only ever see complete segments.
+            while True:
+                name = f"{SEGMENT_PREFIX}{self._next_seq:08d}.npz"
+                try:
+                    os.link(tmp_path, os.path.join(self.root_dir, name))
+                    break
+                except FileExistsError:
+                    self._next_seq = max(self._next_seq, self._last_seq()) + 1
+            self._next_seq += 1
+        finally:
+            os.unlink(tmp_path)
+        print(f"Flushed {len(records)} feedback records to {name}")
+        return name
+
+    def read_segment(self, name):
+        """Load one segment as a dict of column arrays."""
+        with np.load(os.path.join(self.root_dir, name), allow_pickle=False) as data:
+            return {col: data[col] for col in data.files}
+
+
+class IngestState:
+    """Tracks which feedback segments have been merged into the training cache."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ingested_segments = []
+        self.history = []
+        # Rows in the training cache as of the last completed ingest; a cache
+        # written by a run that died before saving this state is cut back to it
+        self.training_rows = None
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.ingested_segments = state.get('ingested_segments', [])
+            self.history = state.get('history', [])
+            self.training_rows = state.get('training_rows')
+
+    def new_segments(self, store):
+        seen = set(self.ingested_segments)
+        return [name for name in store.segments() if name not in seen]
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'ingested_segments': self.ingested_segments,
+                'training_rows': self.training_rows,
+                'history': self.history
+            }, f, indent=2)
+        os.replace(tmp_path, self.path)
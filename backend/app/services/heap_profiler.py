@@ -0,0 +1,134 @@
+import os
+import hmac
+import threading
+import tracemalloc
+
+from ..config import Config
+from .model_registry import estimate_nbytes
+
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def admin_enabled():
+    """Admin endpoints are only mounted when ADMIN_TOKEN is configured."""
+    return bool(Config.ADMIN_TOKEN)
+
+
+def verify_admin_token(token):
+    if not Config.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(str(token), Config.ADMIN_TOKEN)
+
+
+def process_memory():
+    """Return current and peak resident set size in bytes, where available."""
+    usage = {'rss_bytes': None, 'peak_rss_bytes': None}
+    try:
+        with open('/proc/self/statm') as f:
+            usage['rss_bytes'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is KiB on Linux
+        usage['peak_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        pass
+    return usage
+
+
+def object_memory(objects):
+    """Estimate the bytes held by each named object (e.g. loaded models)."""
+    return {name: estimate_nbytes(obj) for name, obj in objects.items()}
+
+
+class HeapProfiler:
+    """
+    On-demand ``tracemalloc`` sampling. Nothing is traced until ``start`` is
+    called, so an idle profiler adds no allocation overhead.
+    """
+
+    def __init__(self, max_snapshots=2):
+        self.max_snapshots = max_snapshots
+        self._snapshots = []
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, nframes=1):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(nframes)
+            self._snapshots = []
+        return self.status()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._snapshots = []
+        return self.status()
+
+    def status(self):
+        status = {'tracing': tracemalloc.is_tracing(), 'snapshots': len(self._snapshots)}
+        if status['tracing']:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update({
+                'traced_bytes': current,
+                'traced_peak_bytes': peak,
+                'tracemalloc_overhead_bytes': tracemalloc.get_tracemalloc_memory()
+            })
+        status.update(process_memory())
+        return status
+
+    def snapshot(self):
+        """Take a snapshot, keeping only the most recent ones for diffing."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Heap profiling is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        with self._lock:
+            self._snapshots.append(snapshot)
+            self._snapshots = self._snapshots[-self.max_snapshots:]
+        return snapshot
+
+    def top(self, limit=20, key_type='lineno'):
+        """Largest allocation sites in the latest snapshot (taken now if none)."""
+        with self._lock:
+            snapshot = self._snapshots[-1] if self._snapshots else None
+        if snapshot is None:
+            snapshot = self.snapshot()
+        return [
+            {
+                'location': self._location(stat.traceback),
+                'size_bytes': stat.size,
+                'count': stat.count
+            }
+            for stat in snapshot.statistics(key_type)[:limit]
+        ]
+
+    def diff(self, limit=20, key_type='lineno'):
+        """Allocation growth between the two most recent snapshots."""
+        with self._lock:
+            if len(self._snapshots) < 2:
+                raise RuntimeError("Need two snapshots to compute a diff")
+            previous, latest = self._snapshots[-2], self._snapshots[-1]
+        return [
+            {
+                'location': self._location(stat.traceback),
+                'size_bytes': stat.size,
+                'size_diff_bytes': stat.size_diff,
+                'count': stat.count,
+                'count_diff': stat.count_diff
+            }
+            for stat in latest.compare_to(previous, key_type)[:limit]
+        ]
+
+    @staticmethod
+    def _location(traceback):
+        frame = traceback[0]
+        return f"{frame.filename}:{frame.lineno}"
@@ -2,8 +2,31 @@ import numpy as np
 import pandas as pd
 import joblib
 import os
+import time
 from .prediction_service import BasePredictionService
 
+# Representative profile used to exercise the models before real traffic
+SYNTHETIC_PROFILE = {
+    'age': 35,
+    'gender': 'male',
+    'bmi': 24.0,
+    'blood_pressure': 120,
+    'cholesterol': 190,
+    'smoker': 'no',
+    'exercise_frequency': 'medium',
+    'family_history': 'none',
+    'previous_conditions': 'none'
+}
+
+# Encoded columns and the user_data keys that feed them
+CATEGORICAL_INPUTS = {
+    'Gender': 'gender',
+    'Smoker': 'smoker',
+    'Exercise Frequency': 'exercise_frequency',
+    'Family History': 'family_history',
+    'Previous Conditions': 'previous_conditions'
+}
+
 class MLService(BasePredictionService):
     def __init__(self):
         super().__init__()
@@ -14,6 +37,7 @@ class MLService(BasePredictionService):
         self.scaler = None
         self.features = None
         self.models_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
+        self.load_seconds = None
         self.load_models()
 
     def load_models(self):
@@ -24,7 +48,9 @@ class MLService(BasePredictionService):
                 raise FileNotFoundError(f"Model file not found. Please run train_models.py first.")
             
             print("Loading ML models...")
+            start = time.perf_counter()
             models = joblib.load(model_file)
+            self.load_seconds = time.perf_counter() - start
             self.risk_model = models['risk_model']
             self.plan_model = models['plan_model']
             self.score_model = models['score_model']
@@ -37,6 +63,21 @@ class MLService(BasePredictionService):
             print(f"Error loading models: {str(e)}")
             raise
 
+    def synthetic_profile(self):
+        """Build a profile whose categorical values the label encoders accept."""
+        profile = dict(SYNTHETIC_PROFILE)
+        for col, key in CATEGORICAL_INPUTS.items():
+            le = self.label_encoders.get(col)
+            if le is not None and profile[key] not in le.classes_:
+                profile[key] = le.classes_[0]
+        return profile
+
+    def warm_up(self):
+        """Run synthetic predictions through every model; returns elapsed seconds."""
+        start = time.perf_counter()
+        self.predict(self.synthetic_profile())
+        return time.perf_counter() - start
+
     def predict(self, user_data):
         """Make predictions using trained models."""
         try:
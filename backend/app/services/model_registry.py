@@ -0,0 +1,285 @@
+import os
+import re
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from .explainer import TreeExplainer
+from .feedback_store import FEATURE_COLUMNS
+
+DEFAULT_MODEL_KEY = 'default'
+MODEL_FILE_PREFIX = 'crop_model'
+_KEY_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+def estimate_nbytes(obj, _seen=None):
+    """Estimate the memory held by an object graph (numpy buffers included)."""
+    if _seen is None:
+        _seen = {}
+    if id(obj) in _seen:
+        return 0
+    # Keep a reference so temporaries (e.g. __getstate__ dicts) don't recycle ids
+    _seen[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        # getsizeof includes the buffer for arrays that own it; views count their
+        # base array, or the raw buffer when it belongs to a non-numpy owner
+        size = sys.getsizeof(obj)
+        if isinstance(obj.base, np.ndarray):
+            size += estimate_nbytes(obj.base, _seen)
+        elif obj.base is not None:
+            size += obj.nbytes
+        if obj.dtype == object:
+            size += sum(estimate_nbytes(item, _seen) for item in obj.ravel())
+        return size
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(estimate_nbytes(k, _seen) + estimate_nbytes(v, _seen)
+                          for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(estimate_nbytes(item, _seen) for item in obj)
+
+    # Extension types (e.g. sklearn's Tree) expose their buffers via __getstate__
+    state = None
+    if hasattr(obj, '__dict__'):
+        state = vars(obj)
+    elif hasattr(obj, '__getstate__'):
+        try:
+            state = obj.__getstate__()
+        except Exception:
+            state = None
+    if state is not None:
+        size += estimate_nbytes(state, _seen)
+    return size
+
+
+def validate_model_key(key):
+    if not _KEY_PATTERN.match(key):
+        raise ValueError(f"Invalid model key: {key!r}")
+    return key
+
+
+def parse_model_ref(ref):
+    """Split ``key`` or ``key@version`` into ``(key, version or None)``."""
+    key, _, version = ref.partition('@')
+    validate_model_key(key)
+    if version:
+        validate_model_key(version)
+    return key, version or None
+
+
+def model_filename(key, default_key=DEFAULT_MODEL_KEY):
+    """Return the artifact filename for a model key."""
+    validate_model_key(key)
+    if key == default_key:
+        return f"{MODEL_FILE_PREFIX}.joblib"
+    return f"{MODEL_FILE_PREFIX}_{key}.joblib"
+
+
+class LoadedModel:
+    """A crop model together with its scaler and label set."""
+
+    def __init__(self, key, path, model, scaler, labels, load_seconds, version=None):
+        self.key = key
+        self.path = path
+        # Artifact store version, when the model was published from (or pinned to) one
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.labels = labels
+        self.load_seconds = load_seconds
+        self.warmup_seconds = None
+        # Attribution tables are built once per load so explanations stay cheap
+        self.explainer = TreeExplainer(model, FEATURE_COLUMNS) if TreeExplainer.supports(model) else None
+        self.nbytes = estimate_nbytes({
+            'model': model,
+            'scaler': scaler,
+            'labels': labels,
+            'explainer': self.explainer
+        })
+
+    def predict(self, input_data):
+        """Scale raw feature rows and predict crops."""
+        return self.model.predict(self.scaler.transform(input_data))
+
+    def explain(self, input_data):
+        """Per-feature contributions behind each prediction for raw feature rows."""
+        if self.explainer is None:
+            raise ValueError(f"Model '{self.key}' does not support explanations")
+        return self.explainer.explain(self.scaler.transform(input_data))
+
+    def warm_up(self, n_rows=64):
+        """Run synthetic inference so the first real request skips cold code paths."""
+        start = time.perf_counter()
+        rng = np.random.default_rng(0)
+        mean = self.scaler.mean_
+        rows = mean + rng.standard_normal((n_rows, len(mean))) * self.scaler.scale_
+
+        # Single-row and batch paths fault in every tree's node arrays
+        self.predict(rows[:1])
+        self.predict(rows)
+        if hasattr(self.model, 'predict_proba'):
+            self.model.predict_proba(self.scaler.transform(rows))
+        if self.explainer is not None:
+            self.explain(rows[:1])
+
+        self.warmup_seconds = time.perf_counter() - start
+        return self.warmup_seconds
+
+
+class ModelRegistry:
+    """
+    Loads crop models by key on first use and keeps them in memory up to a
+    byte budget, evicting the least recently used models when it is exceeded.
+
+    The default key maps to ``crop_model.joblib``; any other key (a region)
+    maps to ``crop_model_<key>.joblib`` in the models directory. With an
+    ``artifact_store``, ``<key>@<version>`` loads that stored version instead.
+
+    Pinned keys (see ``pin``) are never evicted and don't count against the
+    budget, so e.g. a shadow candidate can't push out a serving model.
+    """
+
+    def __init__(self, models_dir, memory_budget_bytes, default_key=DEFAULT_MODEL_KEY, on_load=None,
+                 artifact_store=None):
+        self.models_dir = models_dir
+        self.artifact_store = artifact_store
+        self.memory_budget_bytes = memory_budget_bytes
+        self.default_key = default_key
+        # Called with each freshly loaded model before it is served
+        self.on_load = on_load
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._pinned = set()
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0}
+
+    def resolve_path(self, key):
+        """Map a model key (or ``key@version``) to its artifact path."""
+        key, version = parse_model_ref(key)
+        if version is not None:
+            if self.artifact_store is None:
+                raise ValueError("Model versions require an artifact store")
+            return self.artifact_store.artifact_path(key, version)
+        return os.path.join(self.models_dir, model_filename(key, self.default_key))
+
+    def available(self):
+        """List the keys of every model artifact on disk."""
+        keys = []
+        if not os.path.isdir(self.models_dir):
+            return keys
+        for filename in sorted(os.listdir(self.models_dir)):
+            if filename == f"{MODEL_FILE_PREFIX}.joblib":
+                keys.append(self.default_key)
+            elif filename.startswith(f"{MODEL_FILE_PREFIX}_") and filename.endswith('.joblib'):
+                keys.append(filename[len(MODEL_FILE_PREFIX) + 1:-len('.joblib')])
+        return keys
+
+    def pin(self, key):
+        """Keep ``key`` loaded outside the memory budget once it is loaded."""
+        parse_model_ref(key)
+        with self._lock:
+            self._pinned.add(key)
+
+    def pinned(self):
+        with self._lock:
+            return sorted(self._pinned)
+
+    def loaded(self):
+        """Return the currently loaded models, least recently used first."""
+        with self._lock:
+            return list(self._models.values())
+
+    def memory_usage(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._models.values())
+
+    def get(self, key=None):
+        """Return the model for ``key``, loading it if needed."""
+        key = key or self.default_key
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry
+
+        # Unknown keys fail here, before any per-key state is created
+        path = self.resolve_path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model '{key}' not found at {path}")
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given key; the others wait and reuse its result
+        try:
+            with load_lock:
+                with self._lock:
+                    entry = self._models.get(key)
+                    if entry is not None:
+                        self._models.move_to_end(key)
+                        self.stats['hits'] += 1
+                        return entry
+
+                entry = self._load(key)
+                if self.on_load is not None:
+                    self.on_load(entry)
+
+                with self._lock:
+                    self._models[key] = entry
+                    self.stats['loads'] += 1
+                    self._evict(keep=key)
+                return entry
+        finally:
+            # Drop the lock whether or not the load succeeded (unless a newer one replaced it)
+            with self._lock:
+                if self._load_locks.get(key) is load_lock:
+                    del self._load_locks[key]
+
+    def unload(self, key):
+        with self._lock:
+            return self._models.pop(key, None) is not None
+
+    def _load(self, key):
+        path = self.resolve_path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model '{key}' not found at {path}")
+
+        base_key, version = parse_model_ref(key)
+        if version is None and self.artifact_store is not None:
+            version = self.artifact_store.current(base_key)
+
+        start = time.perf_counter()
+        components = joblib.load(path)
+        elapsed = time.perf_counter() - start
+        print(f"Loaded model '{key}' from {path} in {elapsed:.3f}s")
+        return LoadedModel(
+            key,
+            path,
+            components['model'],
+            components['scaler'],
+            components['labels'],
+            elapsed,
+            version
+        )
+
+    def _evict(self, keep):
+        """Drop least recently used models until the budget is met. Caller holds the lock."""
+        total = sum(entry.nbytes for key, entry in self._models.items() if key not in self._pinned)
+        for key in list(self._models.keys()):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep or key in self._pinned:
+                continue
+            evicted = self._models.pop(key)
+            total -= evicted.nbytes
+            self.stats['evictions'] += 1
+            print(f"Evicted model '{key}' ({evicted.nbytes / 1e6:.1f} MB) from memory")
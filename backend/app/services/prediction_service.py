@@ -1,61 +1,13 @@
 """Base class for prediction services."""
+from .risk_rules import rule_engine
 
 class BasePredictionService:
+    # Named ruleset in ``risk_rules`` used for ``calculate_risk_score``
+    RISK_RULESET = 'prediction'
+
     def calculate_risk_score(self, user_data):
         """Calculate risk score based on user health data."""
-        risk_score = 0.0
-        
-        # Age factor
-        age = int(user_data.get('age', 0))
-        if age >= 60:
-            risk_score += 0.8
-        elif age >= 45:
-            risk_score += 0.6
-        elif age >= 30:
-            risk_score += 0.4
-        else:
-            risk_score += 0.2
-            
-        # BMI factor
-        bmi = float(user_data.get('bmi', 0))
-        if bmi >= 35:
-            risk_score += 0.8
-        elif bmi >= 30:
-            risk_score += 0.6
-        elif bmi >= 25:
-            risk_score += 0.4
-        else:
-            risk_score += 0.2
-            
-        # Blood pressure factor
-        bp = float(user_data.get('blood_pressure', 0))
-        if bp >= 160:
-            risk_score += 0.8
-        elif bp >= 140:
-            risk_score += 0.6
-        elif bp >= 120:
-            risk_score += 0.4
-        else:
-            risk_score += 0.2
-            
-        # Smoking factor
-        if str(user_data.get('smoker', '')).lower() == 'yes':
-            risk_score += 0.6
-            
-        # Exercise factor
-        exercise = str(user_data.get('exercise_frequency', '')).lower()
-        if exercise == 'low':
-            risk_score += 0.6
-        elif exercise == 'medium':
-            risk_score += 0.3
-            
-        # Family history factor
-        if user_data.get('family_history', 'none') != 'none':
-            risk_score += 0.4
-            
-        # Normalize risk score
-        risk_score = risk_score / 4.0  # Maximum possible score
-        return min(risk_score, 1.0)
+        return rule_engine.score_one(self.RISK_RULESET, user_data)
 
     def get_health_factors(self, user_data):
         """Extract health risk factors from user data."""
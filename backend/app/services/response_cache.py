@@ -0,0 +1,75 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Rough per-entry bookkeeping (dict slot, tuple, key) on top of the body
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized JSON response bodies with their ETags.
+
+    Entries are stored as the exact bytes sent to clients, so the memory cap
+    counts what is actually held; the least recently used entries are evicted
+    once ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'rejected': 0}
+
+    @staticmethod
+    def etag(body):
+        return hashlib.sha1(body).hexdigest()
+
+    def get(self, key):
+        """Return ``(body, etag)`` for ``key``, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry
+
+    def put(self, key, body):
+        """Cache ``body`` (bytes) under ``key`` and return its ETag."""
+        etag = self.etag(body)
+        size = len(body) + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if size > self.max_bytes:
+                self._counters['rejected'] += 1
+                return etag
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0]) + ENTRY_OVERHEAD_BYTES
+            self._entries[key] = (body, etag)
+            self._bytes += size
+            self._counters['stores'] += 1
+            while self._bytes > self.max_bytes:
+                _, (old_body, _) = self._entries.popitem(last=False)
+                self._bytes -= len(old_body) + ENTRY_OVERHEAD_BYTES
+                self._counters['evictions'] += 1
+        return etag
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry[0]) + ENTRY_OVERHEAD_BYTES
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_rate': self._counters['hits'] / lookups if lookups else None,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
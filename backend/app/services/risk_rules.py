@@ -0,0 +1,255 @@
+"""
+Declarative risk scoring.
+
+A ruleset is plain data: a list of rules, each turning one profile field into
+points, plus how the summed points are normalized, capped and mapped to risk
+levels. ``RuleEngine`` compiles each ruleset once into NumPy operations
+(``searchsorted`` for numeric bands, table lookups for categories) that
+score any number of profiles per call, plus an equivalent scalar path for
+single-profile requests.
+
+Rule types:
+
+``bands``       numeric thresholds. ``edges`` ascending, ``points`` has one
+                more entry than ``edges``. ``inclusive`` says whether a value
+                equal to an edge falls in the band above it (``x >= edge``)
+                or below it (``x > edge``).
+``linear``      ``min((x - start) / per * step, cap)`` above ``start``, else 0.
+``categories``  points per value, ``default`` for anything else; values are
+                compared as strings, lowercased first if ``lowercase`` is set.
+
+A rule's ``missing`` value is used when a profile lacks the field; without
+one, a missing field is an error.
+"""
+import bisect
+from typing import Dict, Any, List
+
+import numpy as np
+
+from ..config import Config
+
+_WEIGHTS = Config.RISK_WEIGHTS
+
+# Distinct values matched by direct comparison before falling back to np.unique
+MAX_SCANNED_CATEGORIES = 16
+
+HIGH_RISK_CONDITIONS = {'heart_disease', 'cancer', 'stroke'}
+MODERATE_RISK_CONDITIONS = {'diabetes', 'hypertension', 'fatty_liver', 'thyroid',
+                            'arthritis', 'obesity', 'asthma'}
+
+# RiskAssessmentService: the score behind /api/analyze's risk_score and level.
+# Where Config.RISK_WEIGHTS and the applied points agree they are taken from it;
+# the smoker weight (0.4) never matched the 0.2 actually applied, which is kept.
+RISK_ASSESSMENT_RULES = {
+    'rules': [
+        {'name': 'age', 'field': 'age', 'type': 'linear',
+         'start': 20, 'per': 10, 'step': _WEIGHTS['age'] * 10, 'cap': 0.3},
+        {'name': 'underweight', 'field': 'bmi', 'type': 'bands', 'inclusive': True,
+         'edges': [18.5], 'points': [0.1, 0.0]},
+        {'name': 'overweight', 'field': 'bmi', 'type': 'bands', 'inclusive': False,
+         'edges': [25, 30], 'points': [0.0, 0.1, _WEIGHTS['bmi_abnormal']]},
+        {'name': 'blood_pressure', 'field': 'blood_pressure', 'type': 'bands', 'inclusive': True,
+         'edges': [120, 140, 160], 'points': [0.0, 0.1, 0.2, _WEIGHTS['high_blood_pressure']]},
+        {'name': 'cholesterol', 'field': 'cholesterol', 'type': 'bands', 'inclusive': True,
+         'edges': [200, 240], 'points': [0.0, 0.1, 0.2]},
+        {'name': 'smoker', 'field': 'smoker', 'type': 'categories', 'lowercase': True,
+         'points': {'yes': 0.2, 'occasional': 0.1}},
+        {'name': 'exercise', 'field': 'exercise_frequency', 'type': 'categories', 'lowercase': True,
+         'points': {'sedentary': 0.2, 'low': 0.1}},
+        {'name': 'family_history', 'field': 'family_history', 'type': 'categories',
+         'points': {
+             **{condition: 0.3 for condition in sorted(HIGH_RISK_CONDITIONS)},
+             **{condition: _WEIGHTS['family_history'] for condition in sorted(MODERATE_RISK_CONDITIONS)}
+         }}
+    ],
+    'normalize': None,
+    'cap': 1.0,
+    'levels': [(0.7, 'high'), (0.4, 'moderate')],
+    'default_level': 'low'
+}
+
+# BasePredictionService: each factor scored 0.2-0.8, sum divided by 4
+PREDICTION_RULES = {
+    'rules': [
+        {'name': 'age', 'field': 'age', 'type': 'bands', 'inclusive': True, 'missing': 0,
+         'edges': [30, 45, 60], 'points': [0.2, 0.4, 0.6, 0.8]},
+        {'name': 'bmi', 'field': 'bmi', 'type': 'bands', 'inclusive': True, 'missing': 0,
+         'edges': [25, 30, 35], 'points': [0.2, 0.4, 0.6, 0.8]},
+        {'name': 'blood_pressure', 'field': 'blood_pressure', 'type': 'bands', 'inclusive': True, 'missing': 0,
+         'edges': [120, 140, 160], 'points': [0.2, 0.4, 0.6, 0.8]},
+        {'name': 'smoker', 'field': 'smoker', 'type': 'categories', 'lowercase': True, 'missing': '',
+         'points': {'yes': 0.6}},
+        {'name': 'exercise', 'field': 'exercise_frequency', 'type': 'categories', 'lowercase': True,
+         'missing': '', 'points': {'low': 0.6, 'medium': 0.3}},
+        {'name': 'family_history', 'field': 'family_history', 'type': 'categories', 'missing': 'none',
+         'points': {'none': 0.0}, 'default': 0.4}
+    ],
+    'normalize': 4.0,
+    'cap': 1.0,
+    'levels': [(0.7, 'high'), (0.4, 'moderate')],
+    'default_level': 'low'
+}
+
+RULESETS = {
+    'risk_assessment': RISK_ASSESSMENT_RULES,
+    'prediction': PREDICTION_RULES,
+    # Same rules as 'prediction' today; named separately so plan matching can diverge
+    'search': PREDICTION_RULES
+}
+
+
+class CompiledRuleset:
+    """
+    One ruleset compiled twice from the same data: to array operations for
+    batches, and to plain Python (``bisect``/dict lookups) for a single
+    profile, where NumPy's per-call overhead would dominate.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.spec = spec
+        self.rules = [(rule,) + self._compile(rule) for rule in spec['rules']]
+        self.fields = list(dict.fromkeys(rule['field'] for rule in spec['rules']))
+        self.numeric_fields = {rule['field'] for rule in spec['rules'] if rule['type'] != 'categories'}
+        levels = sorted(spec.get('levels', []))
+        self._level_edges = [threshold for threshold, _ in levels]
+        self._level_names = [spec.get('default_level', '')] + [level for _, level in levels]
+        self._level_edges_array = np.array(self._level_edges, dtype=np.float64)
+        self._level_names_array = np.array(self._level_names)
+
+    @staticmethod
+    def _compile(rule):
+        """Return ``(vector_fn, scalar_fn)`` for one rule."""
+        kind = rule['type']
+        if kind == 'bands':
+            edges = [float(edge) for edge in rule['edges']]
+            points = [float(value) for value in rule['points']]
+            if len(points) != len(edges) + 1:
+                raise ValueError(f"Rule {rule['name']}: need len(edges) + 1 points")
+            edges_array, points_array = np.array(edges), np.array(points)
+            inclusive = rule.get('inclusive', True)
+            side = 'right' if inclusive else 'left'
+            find = bisect.bisect_right if inclusive else bisect.bisect_left
+            return (lambda x: points_array[np.searchsorted(edges_array, x, side=side)],
+                    lambda x: points[find(edges, x)])
+        if kind == 'linear':
+            start, per, step, cap = rule['start'], rule['per'], rule['step'], rule.get('cap', np.inf)
+            return (lambda x: np.where(x > start, np.minimum((x - start) / per * step, cap), 0.0),
+                    lambda x: min((x - start) / per * step, cap) if x > start else 0.0)
+        if kind == 'categories':
+            table = rule['points']
+            default = rule.get('default', 0.0)
+            lowercase = rule.get('lowercase', False)
+
+            def points_for(value):
+                return table.get(value.lower() if lowercase else value, default)
+
+            def lookup(values):
+                values = np.asarray(values).astype(str)
+                points = np.empty(len(values), dtype=np.float64)
+                # Categorical fields have few distinct values: one vectorized
+                # comparison per value is much cheaper than sorting for np.unique
+                pending = np.ones(len(values), dtype=bool)
+                for _ in range(MAX_SCANNED_CATEGORIES):
+                    if not pending.any():
+                        return points
+                    value = values[pending.argmax()]
+                    hit = values == value
+                    points[hit] = points_for(value)
+                    pending &= ~hit
+                distinct, inverse = np.unique(values[pending], return_inverse=True)
+                points[pending] = np.array([points_for(value) for value in distinct])[inverse]
+                return points
+            return lookup, points_for
+        raise ValueError(f"Rule {rule['name']}: unknown type {kind!r}")
+
+    def _value(self, rule, profile):
+        field = rule['field']
+        if field in profile:
+            value = profile[field]
+        elif 'missing' in rule:
+            value = rule['missing']
+        else:
+            raise ValueError(f"Missing field: {field}")
+        return float(value) if field in self.numeric_fields else str(value)
+
+    def columns_from_profiles(self, profiles: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Gather this ruleset's fields from profile dicts into typed columns."""
+        columns = {}
+        for rule in self.spec['rules']:
+            if rule['field'] not in columns:
+                values = [self._value(rule, profile) for profile in profiles]
+                dtype = np.float64 if rule['field'] in self.numeric_fields else str
+                columns[rule['field']] = np.array(values, dtype=dtype)
+        return columns
+
+    def _finish(self, score, minimum):
+        if self.spec.get('normalize'):
+            score = score / self.spec['normalize']
+        if self.spec.get('cap') is not None:
+            score = minimum(score, self.spec['cap'])
+        return score
+
+    def score_columns(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Score profiles given as field -> array columns."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        # Rules are added in order, matching the original sequential sums exactly
+        score = np.zeros(n, dtype=np.float64)
+        for rule, vector_fn, _ in self.rules:
+            score = score + vector_fn(columns[rule['field']])
+        return self._finish(score, np.minimum)
+
+    def score(self, profiles: List[Dict[str, Any]]) -> np.ndarray:
+        return self.score_columns(self.columns_from_profiles(profiles))
+
+    def score_one(self, profile: Dict[str, Any]) -> float:
+        score = 0.0
+        for rule, _, scalar_fn in self.rules:
+            score += scalar_fn(self._value(rule, profile))
+        return self._finish(score, min)
+
+    def levels(self, scores) -> np.ndarray:
+        """Risk level names for an array of scores (thresholds are inclusive)."""
+        return self._level_names_array[np.searchsorted(self._level_edges_array, scores, side='right')]
+
+    def level(self, score) -> str:
+        return self._level_names[bisect.bisect_right(self._level_edges, score)]
+
+    def explain(self, profile: Dict[str, Any]) -> Dict[str, float]:
+        """Points contributed by each rule for one profile."""
+        return {rule['name']: scalar_fn(self._value(rule, profile)) for rule, _, scalar_fn in self.rules}
+
+
+class RuleEngine:
+    """Named, compiled rulesets; compiled lazily and reused."""
+
+    def __init__(self, rulesets=None):
+        self.specs = dict(RULESETS if rulesets is None else rulesets)
+        self._compiled = {}
+
+    def ruleset(self, name) -> CompiledRuleset:
+        if name not in self._compiled:
+            if name not in self.specs:
+                raise KeyError(f"Unknown ruleset: {name}")
+            self._compiled[name] = CompiledRuleset(name, self.specs[name])
+        return self._compiled[name]
+
+    def score(self, name, profiles) -> np.ndarray:
+        """Score a list of profile dicts."""
+        return self.ruleset(name).score(profiles)
+
+    def score_one(self, name, profile) -> float:
+        return self.ruleset(name).score_one(profile)
+
+    def score_columns(self, name, columns) -> np.ndarray:
+        return self.ruleset(name).score_columns(columns)
+
+    def levels(self, name, scores) -> np.ndarray:
+        return self.ruleset(name).levels(scores)
+
+    def level(self, name, score) -> str:
+        return self.ruleset(name).level(score)
+
+
+# Shared instance used by the services
+rule_engine = RuleEngine()
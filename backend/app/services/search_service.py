@@ -1,9 +1,13 @@
 import requests
+import numpy as np
 from typing import List, Dict, Any
 from ..config import Config
 from .prediction_service import BasePredictionService
+from .risk_rules import rule_engine
 
 class SearchService(BasePredictionService):
+    RISK_RULESET = 'search'
+
     def __init__(self):
         super().__init__()
         self.api_key = Config.TAVILY_API_KEY
@@ -99,62 +103,6 @@ class SearchService(BasePredictionService):
             }
         }
 
-    def calculate_risk_score(self, user_data):
-        """Calculate risk score based on user health data."""
-        risk_score = 0.0
-        
-        # Age factor
-        age = int(user_data.get('age', 0))
-        if age >= 60:
-            risk_score += 0.8
-        elif age >= 45:
-            risk_score += 0.6
-        elif age >= 30:
-            risk_score += 0.4
-        else:
-            risk_score += 0.2
-            
-        # BMI factor
-        bmi = float(user_data.get('bmi', 0))
-        if bmi >= 35:
-            risk_score += 0.8
-        elif bmi >= 30:
-            risk_score += 0.6
-        elif bmi >= 25:
-            risk_score += 0.4
-        else:
-            risk_score += 0.2
-            
-        # Blood pressure factor
-        bp = float(user_data.get('blood_pressure', 0))
-        if bp >= 160:
-            risk_score += 0.8
-        elif bp >= 140:
-            risk_score += 0.6
-        elif bp >= 120:
-            risk_score += 0.4
-        else:
-            risk_score += 0.2
-            
-        # Smoking factor
-        if str(user_data.get('smoker', '')).lower() == 'yes':
-            risk_score += 0.6
-            
-        # Exercise factor
-        exercise = str(user_data.get('exercise_frequency', '')).lower()
-        if exercise == 'low':
-            risk_score += 0.6
-        elif exercise == 'medium':
-            risk_score += 0.3
-            
-        # Family history factor
-        if user_data.get('family_history', 'none') != 'none':
-            risk_score += 0.4
-            
-        # Normalize risk score
-        risk_score = risk_score / 4.0  # Maximum possible score
-        return min(risk_score, 1.0)
-
     def generate_health_analysis(self, user_data, health_factors, positive_factors, risk_level):
         """Generate a comprehensive health analysis based on user data."""
         age = int(user_data.get('age', 0))
@@ -290,10 +238,11 @@ class SearchService(BasePredictionService):
             print(f"Error processing positive factors: {str(e)}")
         return positive_factors
 
-    def calculate_premium(self, user_data, base_premium_range):
+    def calculate_premium(self, user_data, base_premium_range, risk_score=None):
         """Calculate personalized premium based on user health data."""
         min_premium, max_premium = base_premium_range
-        risk_score = self.calculate_risk_score(user_data)
+        if risk_score is None:
+            risk_score = self.calculate_risk_score(user_data)
         age = int(user_data.get('age', 0))
         
         # Age factor
@@ -315,7 +264,7 @@ class SearchService(BasePredictionService):
         
         return (adjusted_min, adjusted_max)
 
-    def calculate_match_score(self, user_data, plan):
+    def calculate_match_score(self, user_data, plan, risk_score=None):
         """Calculate how well a plan matches user needs."""
         score = 0
         age = int(user_data.get('age', 0))
@@ -329,7 +278,8 @@ class SearchService(BasePredictionService):
             score += 30
         
         # Risk level matching (30%)
-        risk_score = self.calculate_risk_score(user_data)
+        if risk_score is None:
+            risk_score = self.calculate_risk_score(user_data)
         if risk_score >= 0.7 and any(tag in ['chronic_conditions', 'high_risk_patients'] for tag in plan['best_for']):
             score += 30
         elif 0.4 <= risk_score < 0.7 and 'families' in plan['best_for']:
@@ -356,11 +306,111 @@ class SearchService(BasePredictionService):
         score += coverage_score
         return score  # Already capped at 100 by the components
 
+    # Column order of the ``health_factors`` matrix from ``match_plans_batch``;
+    # previous conditions are reported by their own value
+    HEALTH_FACTORS = ['high_bmi', 'high_bp', 'smoker', 'high_cholesterol', 'sedentary_lifestyle',
+                      'previous_conditions', 'family_history', 'senior', 'middle_age']
+    POSITIVE_FACTORS = ['Regular exercise routine', 'Non-smoker', 'Healthy BMI',
+                        'Normal blood pressure', 'Healthy cholesterol levels']
+
+    def match_plans_batch(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Vectorized risk scoring and plan matching for many profiles at once.
+
+        Takes validated profile columns (see ``bulk_assessment.validate_profiles``)
+        and returns arrays equivalent to running ``calculate_risk_score``
+        (the ``search`` ruleset), ``determine_recommended_plan``, ``calculate_premium`` and
+        ``calculate_match_score`` per profile. Plan axes follow ``insurance_plans``.
+        """
+        age = columns['age']
+        bmi = columns['bmi']
+        bp = columns['blood_pressure']
+        cholesterol = columns['cholesterol']
+        smoker = columns['smoker']
+        exercise = columns['exercise_frequency']
+        family_history = columns['family_history']
+        previous_conditions = columns['previous_conditions']
+        
+        risk_score = rule_engine.score_columns(self.RISK_RULESET, columns)
+        risk_level = rule_engine.levels(self.RISK_RULESET, risk_score)
+        
+        health_factors = np.column_stack([
+            bmi > 30,
+            bp > 140,
+            smoker == 'yes',
+            cholesterol > 200,
+            exercise == 'low',
+            previous_conditions != 'none',
+            family_history != 'none',
+            age >= 60,
+            (age >= 45) & (age < 60)
+        ])
+        positive_factors = np.column_stack([
+            np.isin(exercise, ['high', 'medium']),
+            smoker == 'no',
+            (bmi >= 18.5) & (bmi <= 24.9),
+            bp < 120,
+            cholesterol < 200
+        ])
+        
+        plan_keys = list(self.insurance_plans)
+        plan_index = {key: i for i, key in enumerate(plan_keys)}
+        recommended = np.select(
+            [(risk_score >= 0.7) & (age >= 60), risk_score >= 0.7,
+             (risk_score >= 0.4) & (age >= 45), risk_score >= 0.4, age < 30],
+            [plan_index['chronic_care_plus'], plan_index['premium_health'],
+             plan_index['chronic_care_plus'], plan_index['family_first'], plan_index['essential_care']],
+            plan_index['family_first']
+        )
+        
+        # Premiums: (profiles, plans), truncated like calculate_premium
+        plans = list(self.insurance_plans.values())
+        base = np.array([plan['monthly_premium_range'] for plan in plans], dtype=np.float64)
+        age_multiplier = np.select([age >= 60, age >= 45, age >= 30], [1.4, 1.2, 1.1], 1.0)
+        risk_multiplier = 1.0 + (risk_score * 0.5)
+        premium_min = (base[:, 0] * age_multiplier[:, None] * risk_multiplier[:, None]).astype(np.int64)
+        premium_max = (base[:, 1] * age_multiplier[:, None] * risk_multiplier[:, None]).astype(np.int64)
+        
+        # Match scores: (profiles, plans), same components as calculate_match_score
+        high_risk_plan = np.array([any(tag in ['chronic_conditions', 'high_risk_patients'] for tag in plan['best_for'])
+                                   for plan in plans])
+        family_plan = np.array(['families' in plan['best_for'] for plan in plans])
+        young_plan = np.array(['young_healthy' in plan['best_for'] for plan in plans])
+        coverage_points = sum(
+            np.array([plan['coverage'][area] >= 85 for plan in plans]) * 10
+            for area in ['specialist_visits', 'emergency_care', 'hospitalization', 'prescription_drugs']
+        )
+        
+        def tiered(senior, middle, young):
+            return np.where(senior[:, None] & high_risk_plan
+                            | middle[:, None] & family_plan
+                            | young[:, None] & young_plan, 30, 0)
+        
+        match_scores = (
+            tiered(age >= 60, (age >= 30) & (age < 60), age < 30)
+            + tiered(risk_score >= 0.7, (risk_score >= 0.4) & (risk_score < 0.7), risk_score < 0.4)
+            + np.where(health_factors.any(axis=1)[:, None], coverage_points, 40)
+        )
+        
+        return {
+            'plan_keys': np.array(plan_keys),
+            'risk_score': risk_score,
+            'risk_level': risk_level,
+            'health_factors': health_factors,
+            'positive_factors': positive_factors,
+            'recommended_plan': recommended,
+            'premium_min': premium_min,
+            'premium_max': premium_max,
+            'match_scores': match_scores,
+            # Best match first; stable so ties keep plan order like list.sort
+            'plan_ranking': np.argsort(-match_scores, axis=1, kind='stable')
+        }
+
     def search_insurance_info(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # Calculate risk score and determine factors
             risk_score = self.calculate_risk_score(user_data)
-            risk_level = "high" if risk_score >= 0.7 else "moderate" if risk_score >= 0.4 else "low"
+            risk_level = rule_engine.level(self.RISK_RULESET, risk_score)
             
             # Process health factors and get recommended plan
             health_factors = self.get_health_factors(user_data)
@@ -369,8 +419,8 @@ class SearchService(BasePredictionService):
             recommended_plan = self.insurance_plans[recommended_plan_key]
             
             # Calculate personalized premium and match score
-            adjusted_premium_range = self.calculate_premium(user_data, recommended_plan['monthly_premium_range'])
-            match_score = self.calculate_match_score(user_data, recommended_plan)
+            adjusted_premium_range = self.calculate_premium(user_data, recommended_plan['monthly_premium_range'], risk_score)
+            match_score = self.calculate_match_score(user_data, recommended_plan, risk_score)
             
             # Generate health analysis
             analysis = self.generate_health_analysis(user_data, health_factors, positive_factors, risk_level)
@@ -378,8 +428,8 @@ class SearchService(BasePredictionService):
             # Prepare matched providers with insurance links and match scores
             matched_providers = []
             for plan_key, plan in self.insurance_plans.items():
-                plan_match_score = self.calculate_match_score(user_data, plan)
-                premium_range = self.calculate_premium(user_data, plan['monthly_premium_range'])
+                plan_match_score = self.calculate_match_score(user_data, plan, risk_score)
+                premium_range = self.calculate_premium(user_data, plan['monthly_premium_range'], risk_score)
                 matched_providers.append({
                     'name': plan['provider'],
                     'website': plan['website'],
@@ -387,6 +437,7 @@ class SearchService(BasePredictionService):
                     'plans': [plan['name']],
                     'features': plan['features'],
                     'match_score': plan_match_score,
+                    'monthly_premium_range': premium_range,
                     'recommended_plan': plan['name'],
                     'insurance_links': {
                         'website': plan['website'],
@@ -1,3 +1,4 @@
+import time
 from .ml_service import MLService
 from .search_service import SearchService
 
@@ -6,6 +7,15 @@ class ServiceManager:
         self.ml_service = MLService()
         self.search_service = SearchService()
     
+    def warm_up(self, state):
+        """Exercise the ML and search paths once, recording timings on ``state``."""
+        state.record('ml_service', load_seconds=self.ml_service.load_seconds,
+                     warmup_seconds=self.ml_service.warm_up())
+        
+        start = time.perf_counter()
+        self.search_service.search_insurance_info(self.ml_service.synthetic_profile())
+        state.record('search_service', warmup_seconds=time.perf_counter() - start)
+    
     def analyze_health_data(self, user_data):
         """Analyze health data using both ML and search services."""
         try:
@@ -0,0 +1,137 @@
+import time
+import queue
+import random
+import threading
+from collections import deque
+
+import numpy as np
+
+from .model_registry import parse_model_ref
+
+
+class ShadowScorer:
+    """
+    Replays a sampled fraction of live predictions against a candidate model
+    on a background thread and tracks how often it agrees with the served
+    model, plus latency for each version.
+
+    The request path only pays for a random draw and a non-blocking queue
+    put; when the queue is full the sample is dropped and counted.
+    """
+
+    def __init__(self, registry, candidate, sample_rate=0.1, queue_size=1000, latency_window=1000):
+        self.registry = registry
+        self.candidate = candidate
+        # Held outside the registry's budget so shadow traffic never evicts a serving model
+        registry.pin(candidate)
+        # Only requests served by the candidate's own key are comparable
+        self.primary_key = parse_model_ref(candidate)[0]
+        self.sample_rate = sample_rate
+        self.latency_window = latency_window
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._counters = {'sampled': 0, 'dropped': 0, 'scored': 0, 'errors': 0}
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+            self._thread.start()
+            print(f"Shadow scoring {self.candidate} on {self.sample_rate:.0%} of "
+                  f"'{self.primary_key}' requests")
+
+    def stop(self, timeout=5):
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, entry, input_rows, prediction, latency_seconds):
+        """
+        Maybe queue one served request for shadow scoring; never blocks.
+        ``latency_seconds`` must time ``entry.predict(input_rows)`` alone, the
+        same call that is timed for the candidate.
+        """
+        if entry.key != self.primary_key or random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((version_label(entry), input_rows, prediction, latency_seconds))
+        except queue.Full:
+            with self._lock:
+                self._counters['dropped'] += 1
+            return False
+        with self._lock:
+            self._counters['sampled'] += 1
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            primary_label, input_rows, prediction, primary_latency = item
+            try:
+                candidate = self.registry.get(self.candidate)
+                start = time.perf_counter()
+                candidate_prediction = candidate.predict(input_rows)[0]
+                candidate_latency = time.perf_counter() - start
+            except Exception as e:
+                print(f"Shadow scoring failed: {e}")
+                with self._lock:
+                    self._counters['errors'] += 1
+                continue
+
+            with self._lock:
+                self._counters['scored'] += 1
+                self._record(primary_label, primary_latency)
+                stats = self._record(version_label(candidate), candidate_latency)
+                stats['compared_with'] = primary_label
+                stats['agreements'] += int(candidate_prediction == prediction)
+
+    def _record(self, label, latency_seconds):
+        """Caller holds the lock."""
+        stats = self._versions.get(label)
+        if stats is None:
+            stats = self._versions[label] = {
+                'requests': 0,
+                'agreements': 0,
+                'latencies': deque(maxlen=self.latency_window)
+            }
+        stats['requests'] += 1
+        stats['latencies'].append(latency_seconds)
+        return stats
+
+    def report(self):
+        with self._lock:
+            versions = {}
+            for label, stats in self._versions.items():
+                latencies = np.array(stats['latencies']) * 1000
+                summary = {
+                    'requests': stats['requests'],
+                    'latency_ms': {
+                        'p50': float(np.percentile(latencies, 50)),
+                        'p95': float(np.percentile(latencies, 95)),
+                        'max': float(latencies.max())
+                    }
+                }
+                if 'compared_with' in stats:
+                    summary['compared_with'] = stats['compared_with']
+                    summary['agreement_rate'] = stats['agreements'] / stats['requests']
+                versions[label] = summary
+            return {
+                'candidate': self.candidate,
+                'sample_rate': self.sample_rate,
+                'queued': self._queue.qsize(),
+                **self._counters,
+                'versions': versions
+            }
+
+
+def version_label(entry):
+    """``key@version`` for a loaded model (``live`` if it has no store version)."""
+    key = parse_model_ref(entry.key)[0]
+    return f"{key}@{entry.version or 'live'}"
@@ -0,0 +1,56 @@
+import time
+import threading
+
+
+class WarmupState:
+    """Tracks model load/warm-up timings and whether the process may take traffic."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.timings = {}
+        self.error = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def record(self, name, **timings):
+        """Record timings (in seconds) for one model or service."""
+        with self._lock:
+            self.timings.setdefault(name, {}).update(timings)
+
+    def mark_ready(self):
+        with self._lock:
+            self.timings['total'] = {'ready_after_seconds': time.time() - self.started_at}
+        self._ready.set()
+
+    def mark_failed(self, error):
+        with self._lock:
+            self.error = str(error)
+
+    def report(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'uptime_seconds': time.time() - self.started_at,
+                'timings': {name: dict(values) for name, values in self.timings.items()},
+                'error': self.error
+            }
+
+
+def start_warmup(state, warm_fn):
+    """Run ``warm_fn(state)`` in a background thread and mark ``state`` ready when it succeeds."""
+    def _run():
+        try:
+            warm_fn(state)
+            state.mark_ready()
+            print("Warm-up complete; ready for traffic")
+        except Exception as e:
+            print(f"Warm-up failed: {str(e)}")
+            state.mark_failed(e)
+
+    thread = threading.Thread(target=_run, name='warmup', daemon=True)
+    thread.start()
+    return thread
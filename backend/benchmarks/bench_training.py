@@ -0,0 +1,267 @@
+"""
+Training and prediction benchmarks for app.model_classes vs sklearn.
+
+Each case runs in a fresh process so peak memory is measured per case.
+With ``--jobs`` above 1, custom forests fit in worker processes; their
+memory is reported separately as the peak RSS of the largest worker
+(``ru_maxrss`` for children is a maximum, not a sum across workers):
+
+    python benchmarks/bench_training.py --rows 2000,20000 --repeat 3
+    python benchmarks/bench_training.py --compare benchmarks/results/<previous>.json
+
+Results are written to benchmarks/results/ as JSON, tagged with the git
+commit, and ``--compare`` flags cases that got slower than ``--tolerance``.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import multiprocessing
+from queue import Empty
+from datetime import datetime
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+# Seconds a single case may run before its process is killed
+CASE_TIMEOUT = 3600
+
+from app.model_classes import RandomForest
+from app.services.heap_profiler import process_memory
+from sklearn.ensemble import RandomForestClassifier
+
+# Per-feature value ranges of Crop_recommendation.csv
+CROP_FEATURE_RANGES = [
+    ('N', 0, 140),
+    ('P', 5, 145),
+    ('K', 5, 205),
+    ('temperature', 8, 44),
+    ('humidity', 14, 100),
+    ('ph', 3.5, 10),
+    ('rainfall', 20, 300)
+]
+
+ESTIMATORS = {
+    'custom': lambda trees, jobs: RandomForest(n_trees=trees, max_depth=10, min_samples_split=5,
+                                               random_state=42, n_jobs=jobs, oob_score=False),
+    'custom-histogram': lambda trees, jobs: RandomForest(n_trees=trees, max_depth=10,
+                                                         min_samples_split=5, random_state=42,
+                                                         histogram=True, n_jobs=jobs,
+                                                         oob_score=False),
+    'sklearn': lambda trees, jobs: RandomForestClassifier(n_estimators=trees, max_depth=10,
+                                                          min_samples_split=5, random_state=42,
+                                                          n_jobs=jobs)
+}
+
+
+def make_crop_like_data(n_rows, n_features=7, n_classes=22, seed=42):
+    """
+    Synthetic data shaped like the crop dataset: balanced classes, each a
+    Gaussian blob with its own mean and spread inside the real feature
+    ranges. Features beyond the seven real ones reuse those ranges in turn.
+    """
+    rng = np.random.default_rng(seed)
+    ranges = [CROP_FEATURE_RANGES[i % len(CROP_FEATURE_RANGES)] for i in range(n_features)]
+    low = np.array([r[1] for r in ranges], dtype=np.float64)
+    width = np.array([r[2] - r[1] for r in ranges], dtype=np.float64)
+
+    means = low + rng.random((n_classes, n_features)) * width
+    spreads = width * rng.uniform(0.02, 0.1, size=(n_classes, n_features))
+    y = np.arange(n_rows) % n_classes
+    rng.shuffle(y)
+    X = means[y] + rng.standard_normal((n_rows, n_features)) * spreads[y]
+    X = np.clip(X, low, low + width)
+    labels = np.array([f'crop{i:02d}' for i in range(n_classes)], dtype=object)
+    return X, labels[y]
+
+
+def children_peak_rss():
+    """Peak RSS in bytes of the largest finished child process, where available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak * 1024 if peak else None
+
+
+def run_case(case, queue):
+    """Fit and predict one configuration; report timings and memory to ``queue``."""
+    X, y = make_crop_like_data(case['rows'], case['features'], case['classes'])
+    split = int(len(X) * 0.8)
+    X_train, X_test, y_train, y_test = X[:split], X[split:], y[:split], y[split:]
+
+    baseline_rss = process_memory()['rss_bytes']
+    model = ESTIMATORS[case['estimator']](case['trees'], case['jobs'])
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = model.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    memory = process_memory()
+    queue.put({
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+        'accuracy': float(np.mean(predictions == y_test)),
+        'peak_rss_bytes': memory['peak_rss_bytes'],
+        'peak_over_baseline_bytes': (memory['peak_rss_bytes'] - baseline_rss
+                                     if memory['peak_rss_bytes'] and baseline_rss else None),
+        # Worker pools are shut down when fit returns, so their usage is final
+        'worker_peak_rss_bytes': children_peak_rss()
+    })
+
+
+def run_isolated(case, timeout=CASE_TIMEOUT):
+    """
+    Run ``case`` in a fresh process so its peak RSS is its own. A case that
+    crashes or runs past ``timeout`` seconds comes back as ``{'error': ...}``.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=run_case, args=(case, queue))
+    process.start()
+    deadline = time.monotonic() + timeout
+    result, error = None, None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                # The result may have been flushed just before the process exited
+                try:
+                    result = queue.get(timeout=1)
+                except Empty:
+                    error = f"process exited with code {process.exitcode} before reporting"
+                break
+            if time.monotonic() > deadline:
+                process.terminate()
+                error = f"timed out after {timeout}s"
+                break
+    process.join()
+    return result if result is not None else {'error': error}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_id(case):
+    return (f"{case['estimator']}/rows={case['rows']}/features={case['features']}"
+            f"/classes={case['classes']}/trees={case['trees']}/jobs={case['jobs']}")
+
+
+def run_benchmarks(args):
+    cases = [
+        {'estimator': estimator, 'rows': rows, 'features': features, 'classes': classes,
+         'trees': args.trees, 'jobs': args.jobs}
+        for rows in args.rows
+        for features in args.features
+        for classes in args.classes
+        for estimator in args.estimators
+    ]
+    results = []
+    for case in cases:
+        # Best of ``repeat`` runs; memory comes from the fastest run
+        runs = [run_isolated(case, args.timeout) for _ in range(args.repeat)]
+        failed = [run['error'] for run in runs if 'error' in run]
+        if failed:
+            results.append({'id': case_id(case), **case, 'error': failed[0]})
+            print(f"{case_id(case):<70} FAILED: {failed[0]}")
+            continue
+        best = min(runs, key=lambda run: run['fit_seconds'])
+        best['predict_seconds'] = min(run['predict_seconds'] for run in runs)
+        result = {'id': case_id(case), **case, **best}
+        results.append(result)
+        peak = result['peak_over_baseline_bytes']
+        workers = result['worker_peak_rss_bytes']
+        print(f"{result['id']:<70} fit {result['fit_seconds']:8.3f}s  "
+              f"predict {result['predict_seconds']:7.4f}s  acc {result['accuracy']:.3f}  "
+              f"peak +{(peak or 0) / 2**20:7.1f} MiB"
+              + (f"  largest worker {workers / 2**20:7.1f} MiB" if workers else ""))
+    return results
+
+
+def compare(results, baseline_path, tolerance):
+    """Print time ratios against a previous results file; return the regressed case ids."""
+    with open(baseline_path) as f:
+        baseline = {result['id']: result for result in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result['id'])
+        if previous is None or 'error' in result or 'error' in previous:
+            continue
+        for metric in ('fit_seconds', 'predict_seconds'):
+            ratio = result[metric] / max(previous[metric], 1e-9)
+            flag = ''
+            if ratio > tolerance:
+                flag = '  <-- regression'
+                regressions.append(f"{result['id']} {metric}")
+            print(f"{result['id']:<70} {metric:<16} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark forest training and prediction")
+    int_list = lambda value: [int(v) for v in value.split(',')]
+    parser.add_argument('--rows', type=int_list, default=[2200, 22000],
+                        help="Comma-separated dataset sizes")
+    parser.add_argument('--features', type=int_list, default=[7])
+    parser.add_argument('--classes', type=int_list, default=[22])
+    parser.add_argument('--trees', type=int, default=20)
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--estimators', type=lambda value: value.split(','),
+                        default=list(ESTIMATORS), help="Any of: " + ', '.join(ESTIMATORS))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=CASE_TIMEOUT,
+                        help="Seconds before a case is killed and reported as failed")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', help="Previous results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=1.2,
+                        help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+    unknown = set(args.estimators) - set(ESTIMATORS)
+    if unknown:
+        parser.error(f"Unknown estimators: {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(args)
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{commit or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': commit,
+            'cpu_count': os.cpu_count(),
+            'results': results
+        }, f, indent=2)
+    print("Results saved to:", output)
+
+    failures = [result['id'] for result in results if 'error' in result]
+    if failures:
+        print(f"{len(failures)} case(s) failed")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance}x")
+            sys.exit(1)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (BASE_DIR, TESTS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Config reads these when app.config is first imported; validate_config requires them
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017')
+os.environ.setdefault('TAVILY_API_KEY', 'test')
+
+
+@pytest.fixture(scope='session')
+def insurance_app():
+    """The Flask app module, backed by the in-memory Mongo fake."""
+    import pymongo
+    from memory_mongo import MemoryMongoClient
+    original = pymongo.MongoClient
+    pymongo.MongoClient = MemoryMongoClient
+    try:
+        module = importlib.import_module('app.app')
+    finally:
+        pymongo.MongoClient = original
+    yield module
+    module.assessment_writer.stop()
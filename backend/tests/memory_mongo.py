@@ -0,0 +1,206 @@
+"""Test doubles for code that talks to MongoDB."""
+
+import copy
+import threading
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+def _get_path(document, path):
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _compare(value, op, operand):
+    if op == '$in':
+        return value in operand
+    if op == '$ne':
+        return value != operand
+    if op == '$exists':
+        return (value is not None) == bool(operand)
+    if value is None:
+        return False
+    if op == '$lt':
+        return value < operand
+    if op == '$lte':
+        return value <= operand
+    if op == '$gt':
+        return value > operand
+    if op == '$gte':
+        return value >= operand
+    raise ValueError(f"Unsupported query operator: {op}")
+
+
+def matches(document, query):
+    """Evaluate the subset of Mongo query syntax the app uses."""
+    for field, condition in (query or {}).items():
+        if field == '$or':
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif field == '$and':
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+            value = _get_path(document, field)
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif _get_path(document, field) != condition:
+            return False
+    return True
+
+
+def project(document, projection):
+    """Apply an inclusion projection (dotted paths allowed; ``_id`` kept unless excluded)."""
+    if not projection:
+        return copy.deepcopy(document)
+    include_id = projection.get('_id', 1)
+    result = {}
+    for path, flag in projection.items():
+        if path == '_id' or not flag:
+            continue
+        value = _get_path(document, path)
+        if value is None:
+            continue
+        target = result
+        parts = path.split('.')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = copy.deepcopy(value)
+    if include_id and '_id' in document:
+        result['_id'] = document['_id']
+    return result
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class MemoryCursor:
+    def __init__(self, documents, projection=None):
+        self._documents = documents
+        self._projection = projection
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        keys = key_or_list if isinstance(key_or_list, list) else [(key_or_list, direction)]
+        # Stable sorts applied last key first give a multi-key ordering
+        for key, key_direction in reversed(keys):
+            self._documents.sort(key=lambda doc: _get_path(doc, key), reverse=key_direction < 0)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def __iter__(self):
+        documents = self._documents[:self._limit] if self._limit else self._documents
+        return (project(doc, self._projection) for doc in documents)
+
+
+class MemoryCollection:
+    """A thread-safe, in-process stand-in for a pymongo ``Collection``."""
+
+    def __init__(self, name):
+        self.name = name
+        self._documents = {}
+        self._indexes = {'_id_': [('_id', 1)]}
+        self._lock = threading.Lock()
+
+    def _insert(self, document):
+        document.setdefault('_id', ObjectId())
+        if document['_id'] in self._documents:
+            raise DuplicateKeyError(f"Duplicate key: {document['_id']}", 11000)
+        self._documents[document['_id']] = copy.deepcopy(document)
+        return document['_id']
+
+    def insert_one(self, document):
+        with self._lock:
+            return InsertOneResult(self._insert(document))
+
+    def insert_many(self, documents, ordered=True):
+        inserted, errors = [], []
+        with self._lock:
+            for index, document in enumerate(documents):
+                try:
+                    inserted.append(self._insert(document))
+                except DuplicateKeyError as e:
+                    errors.append({'index': index, 'code': e.code, 'errmsg': str(e)})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted)})
+        return InsertManyResult(inserted)
+
+    def find(self, query=None, projection=None):
+        with self._lock:
+            documents = [doc for doc in self._documents.values() if matches(doc, query)]
+        return MemoryCursor(documents, projection)
+
+    def find_one(self, query=None, projection=None):
+        for document in self.find(query, projection).limit(1):
+            return document
+        return None
+
+    def count_documents(self, query):
+        with self._lock:
+            return sum(1 for doc in self._documents.values() if matches(doc, query))
+
+    def create_index(self, keys, name=None, **kwargs):
+        keys = keys if isinstance(keys, list) else [(keys, 1)]
+        name = name or '_'.join(f"{key}_{direction}" for key, direction in keys)
+        with self._lock:
+            self._indexes[name] = list(keys)
+        return name
+
+    def index_information(self):
+        with self._lock:
+            return {name: {'key': list(keys)} for name, keys in self._indexes.items()}
+
+
+class MemoryDatabase:
+    def __init__(self, name):
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name)
+            return self._collections[name]
+
+
+class MemoryMongoClient:
+    """
+    In-memory replacement for ``MongoClient`` for tests that need a
+    collection without a database server. Data lives only as long as the
+    process.
+    """
+
+    def __init__(self, uri=None):
+        self.uri = uri
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def server_info(self):
+        return {'version': 'memory'}
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(name)
+            return self._databases[name]
+
+    def close(self):
+        pass
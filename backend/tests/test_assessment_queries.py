@@ -0,0 +1,116 @@
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from bson.objectid import ObjectId
+
+from app.services.assessment_queries import encode_cursor, find_history
+from memory_mongo import MemoryCollection
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def seed(collection, count, user_ids=('member-1', 'member-2')):
+    # Three timestamps only, so most pages break in the middle of a tie
+    for i in range(count):
+        collection.insert_one({
+            '_id': ObjectId(),
+            'timestamp': START + timedelta(minutes=i % 3),
+            'user_id': user_ids[i % len(user_ids)],
+            'risk_score': i / count,
+            'risk_assessment': {'risk_level': 'low', 'risk_factors': ['bmi']},
+            'user_data': {'age': 40 + i, 'bmi': 24.0, 'blood_pressure': 120, 'gender': 'male'}
+        })
+
+
+def newest_first(collection, **query):
+    documents = collection.find(query).sort([('timestamp', -1), ('_id', -1)])
+    return [document['_id'] for document in documents]
+
+
+def all_pages(collection, limit, user_id=None):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = find_history(collection, user_id=user_id, cursor=cursor, limit=limit)
+        pages.append(rows)
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('limit', [1, 4, 7, 25])
+def test_pages_cover_ties_once_in_order(limit):
+    collection = MemoryCollection('assessments')
+    seed(collection, 23)
+    pages = all_pages(collection, limit)
+
+    ids = [row['_id'] for page in pages for row in page]
+    assert ids == newest_first(collection)
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+
+
+def test_user_pages_only_list_that_user():
+    collection = MemoryCollection('assessments')
+    seed(collection, 23)
+    pages = all_pages(collection, 4, user_id='member-2')
+    assert [row['_id'] for page in pages for row in page] == newest_first(collection, user_id='member-2')
+
+
+def test_last_full_page_has_no_next_cursor():
+    collection = MemoryCollection('assessments')
+    seed(collection, 8)
+    first, cursor = find_history(collection, limit=4)
+    assert cursor == encode_cursor(first[-1])
+    second, cursor = find_history(collection, cursor=cursor, limit=4)
+    assert len(second) == 4
+    assert cursor is None
+
+    assert find_history(MemoryCollection('assessments'), limit=4) == ([], None)
+
+
+def test_rows_carry_only_history_fields():
+    collection = MemoryCollection('assessments')
+    seed(collection, 3)
+    rows, _ = find_history(collection)
+    assert set(rows[0]) == {'_id', 'timestamp', 'risk_score', 'risk_assessment', 'user_data'}
+    assert set(rows[0]['user_data']) == {'age', 'bmi', 'blood_pressure'}
+    assert set(rows[0]['risk_assessment']) == {'risk_level'}
+
+
+def b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+MALFORMED_CURSORS = [
+    'not-a-cursor!',
+    b64(b'no separator'),
+    b64(b'2024-05-01T12:00:00|not-an-object-id'),
+    b64(b'yesterday|' + str(ObjectId()).encode()),
+    b64(b'\xff\xfe|\x00'),
+]
+
+
+@pytest.mark.parametrize('cursor', MALFORMED_CURSORS)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        find_history(MemoryCollection('assessments'), cursor=cursor)
+
+
+def test_history_endpoint_pages_with_header(insurance_app):
+    client = insurance_app.app.test_client()
+    seed(insurance_app.assessments_collection, 5, user_ids=('history-user',))
+
+    first = client.get('/api/assessments', query_string={'user_id': 'history-user', 'limit': 3})
+    assert first.status_code == 200
+    assert len(first.json) == 3
+    cursor = first.headers['X-Next-Cursor']
+
+    second = client.get('/api/assessments',
+                        query_string={'user_id': 'history-user', 'limit': 3, 'cursor': cursor})
+    assert len(second.json) == 2
+    assert 'X-Next-Cursor' not in second.headers
+    assert {row['_id'] for row in first.json}.isdisjoint(row['_id'] for row in second.json)
+
+    bad = client.get('/api/assessments', query_string={'cursor': MALFORMED_CURSORS[0]})
+    assert bad.status_code == 400
+    assert bad.json == {'error': 'Invalid cursor'}
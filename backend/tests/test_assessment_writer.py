@@ -0,0 +1,193 @@
+import time
+import queue
+import threading
+
+import pytest
+
+from app.services.assessment_writer import AssessmentWriter
+from memory_mongo import MemoryCollection
+
+
+class RecordingCollection(MemoryCollection):
+    """Records each insert_many batch; can fail a set number of calls or block."""
+
+    def __init__(self, failures=0):
+        super().__init__('assessments')
+        self.batches = []
+        self.failures = failures
+        self.release = threading.Event()
+        self.release.set()
+
+    def insert_many(self, documents, ordered=True):
+        self.release.wait()
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("network")
+        self.batches.append(len(documents))
+        return super().insert_many(documents, ordered=ordered)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def make_writer():
+    writers = []
+
+    def make(collection, **kwargs):
+        writer = AssessmentWriter(collection, **kwargs)
+        writers.append(writer)
+        return writer
+
+    yield make
+    for writer in writers:
+        writer.stop(timeout=5)
+
+
+def test_flushes_full_batches(make_writer):
+    collection = RecordingCollection()
+    writer = make_writer(collection, batch_size=5, flush_interval=30)
+    writer.start()
+    for i in range(10):
+        writer.submit({'n': i})
+    # Full batches go out without waiting for the 30s interval
+    wait_for(lambda: writer.metrics()['written'] == 10)
+    assert collection.batches == [5, 5]
+    assert collection.count_documents({}) == 10
+
+
+def test_flushes_partial_batch_after_interval(make_writer):
+    collection = RecordingCollection()
+    writer = make_writer(collection, batch_size=100, flush_interval=0.2)
+    writer.start()
+    document_id = writer.submit({'n': 1})
+    writer.submit({'n': 2})
+    assert writer.get(document_id)['n'] == 1
+
+    wait_for(lambda: writer.metrics()['written'] == 2)
+    assert collection.batches == [2]
+    assert writer.get(document_id) is None
+    assert collection.find_one({'_id': document_id})['n'] == 1
+
+
+def test_full_queue_writes_synchronously(make_writer):
+    collection = RecordingCollection()
+    writer = make_writer(collection, batch_size=1, flush_interval=0.01, queue_size=2,
+                         put_timeout=0.01)
+    collection.release.clear()
+    writer.start()
+    # The thread takes one document and blocks on the database; two more fill the queue
+    writer.submit({'n': 0})
+    wait_for(lambda: writer.metrics()['queued'] == 0)
+    writer.submit({'n': 1})
+    writer.submit({'n': 2})
+    assert writer.metrics()['queued'] == 2
+
+    submitted = threading.Thread(target=writer.submit, args=({'n': 3},))
+    submitted.start()
+    time.sleep(0.1)
+    # The overflow document is written in the caller once the database recovers
+    assert submitted.is_alive()
+    collection.release.set()
+    submitted.join(5)
+
+    wait_for(lambda: writer.metrics()['written'] == 4)
+    assert writer.metrics()['sync_writes'] == 1
+
+
+def test_retries_then_drops(make_writer, capsys):
+    collection = RecordingCollection(failures=2)
+    writer = make_writer(collection, batch_size=10, flush_interval=0.01, max_retries=2)
+    writer.start()
+    writer.submit({'n': 1})
+    wait_for(lambda: writer.metrics()['written'] == 1)
+    assert writer.metrics()['retries'] == 2
+    assert writer.metrics()['failed'] == 0
+
+    collection.failures = 3
+    document_id = writer.submit({'n': 2})
+    wait_for(lambda: writer.metrics()['failed'] == 1)
+    metrics = writer.metrics()
+    assert metrics['written'] == 1
+    assert metrics['pending'] == 0
+    assert writer.get(document_id) is None
+    assert f"Dropping 1 assessments after 3 attempts: {document_id}" in capsys.readouterr().out
+
+
+def test_stop_flushes_queued_documents(make_writer):
+    collection = RecordingCollection()
+    writer = make_writer(collection, batch_size=4, flush_interval=30)
+    collection.release.clear()
+    writer.start()
+    for i in range(10):
+        writer.submit({'n': i})
+
+    stopping = threading.Thread(target=writer.stop)
+    stopping.start()
+    collection.release.set()
+    stopping.join(10)
+
+    assert not stopping.is_alive()
+    assert collection.count_documents({}) == 10
+    assert max(collection.batches) <= 4
+    assert writer.metrics()['pending'] == 0
+
+
+def test_stop_does_not_block_on_full_queue(make_writer):
+    collection = RecordingCollection()
+    writer = make_writer(collection, batch_size=1, flush_interval=0.01, queue_size=1,
+                         put_timeout=0.01)
+    collection.release.clear()
+    writer.start()
+    writer.submit({'n': 0})
+    wait_for(lambda: writer.metrics()['queued'] == 0)
+    writer.submit({'n': 1})
+    assert writer.metrics()['queued'] == 1
+
+    started = time.monotonic()
+    writer.stop(timeout=0.2)
+    assert time.monotonic() - started < 2
+    collection.release.set()
+
+
+def test_submit_without_thread_writes_synchronously(make_writer):
+    collection = RecordingCollection()
+    writer = make_writer(collection)
+    document_id = writer.submit({'n': 1})
+    assert collection.find_one({'_id': document_id})['n'] == 1
+    assert writer.metrics()['sync_writes'] == 1
+
+
+def test_stop_wakes_idle_writer(make_writer):
+    writer = make_writer(RecordingCollection(), flush_interval=30)
+    writer.start()
+    started = time.monotonic()
+    writer.stop()
+    assert time.monotonic() - started < 2
+
+
+def test_submit_racing_stop_is_still_written(make_writer):
+    collection = RecordingCollection()
+    writer = make_writer(collection, batch_size=10, flush_interval=30)
+
+    class LateQueue(queue.Queue):
+        # The document lands only after stop() has drained and joined the thread
+        def put(self, item, block=True, timeout=None):
+            if item is not None:
+                stopping = threading.Thread(target=writer.stop)
+                stopping.start()
+                wait_for(lambda: not stopping.is_alive())
+            super().put(item, block, timeout)
+
+    writer._queue = LateQueue(maxsize=writer.queue_size)
+    writer.start()
+    document_id = writer.submit({'n': 1})
+
+    assert collection.find_one({'_id': document_id})['n'] == 1
+    assert writer.metrics()['queued'] == 0
+    assert writer.metrics()['pending'] == 0
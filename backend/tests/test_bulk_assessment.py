@@ -0,0 +1,46 @@
+PROFILE = {
+    'age': 52,
+    'gender': 'female',
+    'bmi': 31.5,
+    'blood_pressure': 145,
+    'cholesterol': 210,
+    'smoker': 'No',
+    'exercise_frequency': 'low',
+    'family_history': 'diabetes',
+    'previous_conditions': 'asthma',
+    'user_id': 'member-1'
+}
+
+# Set per request rather than derived from the profile
+REQUEST_FIELDS = {'_id', 'timestamp', 'group_id'}
+
+
+def stored(module, assessment_id):
+    from bson.objectid import ObjectId
+    object_id = ObjectId(assessment_id)
+    return (module.assessment_writer.get(object_id)
+            or module.assessments_collection.find_one({'_id': object_id}))
+
+
+def test_bulk_member_stored_like_single_assessment(insurance_app):
+    client = insurance_app.app.test_client()
+
+    single = client.post('/api/analyze', json=dict(PROFILE))
+    assert single.status_code == 200
+    bulk = client.post('/api/analyze/bulk', json={'profiles': [dict(PROFILE)]})
+    assert bulk.status_code == 200
+
+    single_document = stored(insurance_app, single.json['assessment_id'])
+    bulk_document = stored(insurance_app, bulk.json['members'][0]['assessment_id'])
+    strip = lambda document: {k: v for k, v in document.items() if k not in REQUEST_FIELDS}
+    assert strip(bulk_document) == strip(single_document)
+    assert single_document['risk_assessment']['positive_factors'] == \
+        bulk.json['members'][0]['positive_factors']
+
+
+def test_bulk_rejects_malformed_payloads(insurance_app):
+    client = insurance_app.app.test_client()
+    assert client.post('/api/analyze/bulk', data='not json',
+                       content_type='application/json').status_code == 400
+    assert client.post('/api/analyze/bulk', json=[PROFILE]).status_code == 400
+    assert client.post('/api/analyze/bulk', json={'profiles': []}).status_code == 400
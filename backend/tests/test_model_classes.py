@@ -0,0 +1,75 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.model_classes import DecisionTree, RandomForest
+
+
+def entropy(y):
+    _, counts = np.unique(y, return_counts=True)
+    probabilities = counts / len(y)
+    return -np.sum(probabilities * np.log2(probabilities))
+
+
+def reference_tree(X, y, max_depth=None, min_samples_split=2, depth=0):
+    """The original split search: every unique threshold of every feature, first best gain wins."""
+    if (max_depth is not None and depth >= max_depth) or \
+       len(y) < min_samples_split or \
+       len(np.unique(y)) == 1:
+        return {'type': 'leaf', 'prediction': Counter(y).most_common(1)[0][0]}
+
+    best_gain, best_feature, best_threshold = -1, None, None
+    parent_entropy = entropy(y)
+    for feature_idx in range(X.shape[1]):
+        for threshold in np.unique(X[:, feature_idx]):
+            left_mask = X[:, feature_idx] <= threshold
+            if left_mask.all():
+                gain = 0
+            else:
+                gain = parent_entropy - (left_mask.mean() * entropy(y[left_mask]) +
+                                         (~left_mask).mean() * entropy(y[~left_mask]))
+            if gain > best_gain:
+                best_gain, best_feature, best_threshold = gain, feature_idx, threshold
+
+    left_mask = X[:, best_feature] <= best_threshold
+    return {
+        'type': 'node',
+        'feature_idx': best_feature,
+        'threshold': best_threshold,
+        'left': reference_tree(X[left_mask], y[left_mask], max_depth, min_samples_split, depth + 1),
+        'right': reference_tree(X[~left_mask], y[~left_mask], max_depth, min_samples_split, depth + 1)
+    }
+
+
+@pytest.fixture
+def fixture_data():
+    # Rounded features so thresholds repeat, and overlapping classes so trees get deep
+    rng = np.random.default_rng(7)
+    X = np.round(rng.normal(size=(120, 4)) * 3) / 2
+    scores = X[:, 0] + 0.5 * X[:, 1] - X[:, 2] + rng.normal(size=120)
+    y = np.array(['maize', 'rice', 'cotton', 'jute'])[np.digitize(scores, [-2, 0, 2])]
+    return X, y
+
+
+@pytest.mark.parametrize('params', [{}, {'max_depth': 3}, {'min_samples_split': 10}])
+def test_tree_matches_reference_split_search(fixture_data, params):
+    X, y = fixture_data
+    tree = DecisionTree(**params).fit(X, y)
+    assert tree.tree == reference_tree(X, y, **params)
+
+
+def test_forest_trees_match_reference_on_their_bootstraps(fixture_data):
+    X, y = fixture_data
+    forest = RandomForest(n_trees=4, sample_ratio=0.8, random_state=0).fit(X, y)
+    predictions = forest.predict(X)
+
+    # Tree k is grown on a bootstrap drawn from the k-th spawned seed
+    sample_size = int(len(X) * 0.8)
+    for tree, seed in zip(forest.trees, np.random.SeedSequence(0).spawn(4)):
+        indices = np.random.default_rng(seed).integers(0, len(X), size=sample_size)
+        assert tree.tree == reference_tree(X[indices], y[indices])
+
+    refit = RandomForest(n_trees=4, sample_ratio=0.8, random_state=0).fit(X, y)
+    assert [tree.tree for tree in refit.trees] == [tree.tree for tree in forest.trees]
+    assert (refit.predict(X) == predictions).all()
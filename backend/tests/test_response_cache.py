@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+from app.services.response_cache import ENTRY_OVERHEAD_BYTES, ResponseCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    body = b'x' * 100
+    cache = ResponseCache(max_bytes=3 * (len(body) + ENTRY_OVERHEAD_BYTES))
+    for key in 'abc':
+        cache.put(key, body)
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get('a') == (body, ResponseCache.etag(body))
+    cache.put('d', body)
+
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd')
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 3
+    assert stats['bytes'] == 3 * (len(body) + ENTRY_OVERHEAD_BYTES)
+
+
+def test_replacing_and_oversized_entries_keep_byte_count():
+    cache = ResponseCache(max_bytes=1000)
+    cache.put('a', b'x' * 100)
+    cache.put('a', b'y' * 300)
+    assert cache.stats()['bytes'] == 300 + ENTRY_OVERHEAD_BYTES
+
+    etag = cache.put('big', b'z' * 1000)
+    assert etag == ResponseCache.etag(b'z' * 1000)
+    assert cache.get('big') is None
+    stats = cache.stats()
+    assert stats['rejected'] == 1
+    assert stats['entries'] == 1
+
+    cache.invalidate('a')
+    assert cache.stats()['bytes'] == 0
+
+
+def test_repeated_etag_gets_304(insurance_app):
+    client = insurance_app.app.test_client()
+    assessment_id = ObjectId()
+    insurance_app.assessments_collection.insert_one({
+        '_id': assessment_id,
+        'timestamp': datetime(2024, 5, 1, 12, 0, 0),
+        'user_data': {'age': 40},
+        'risk_score': 0.3,
+        'providers': [{'name': 'Acme', 'website': 'https://example.com'}]
+    })
+    url = f'/api/assessment/{assessment_id}'
+    stats = insurance_app.assessment_cache.stats
+
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    # Older documents come back normalized
+    assert first.json['risk_assessment']['risk_level'] == 'unknown'
+    assert first.json['providers'][0]['links']['quote'] == 'https://example.com'
+
+    hits = stats()['hits']
+    repeat = client.get(url, headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+    assert stats()['hits'] == hits + 1
+
+    changed = client.get(url, headers={'If-None-Match': '"stale"'})
+    assert changed.status_code == 200
+    assert changed.data == first.data
+
+    assert client.get(f'/api/assessment/{ObjectId()}').status_code == 404
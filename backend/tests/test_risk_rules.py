@@ -0,0 +1,132 @@
+from itertools import product
+
+import numpy as np
+import pytest
+
+from app.services.risk_assessment import RiskAssessmentService
+from app.services.risk_rules import rule_engine
+
+# Values on, just below and just above every band edge
+AGES = [15, 20, 20.5, 25, 30, 50, 70]
+BMIS = [18.4, 18.5, 18.6, 25, 25.1, 30, 30.1]
+BLOOD_PRESSURES = [119, 120, 139, 140, 159, 160, 161]
+CHOLESTEROLS = [199, 200, 239, 240, 241]
+# Known values in several cases, plus categories no rule lists
+SMOKERS = ['yes', 'YES', 'occasional', 'no', 'sometimes']
+EXERCISE = ['sedentary', 'Low', 'medium', 'high', 'daily']
+FAMILY_HISTORY = ['none', 'cancer', 'Cancer', 'asthma', 'other', '']
+
+
+def legacy_risk_score(user_data):
+    """RiskAssessmentService.analyze_health_risk as it was before the rule engine."""
+    risk_score = 0.0
+    age = float(user_data['age'])
+    risk_score += min((age - 20) / 10 * 0.1, 0.3) if age > 20 else 0
+
+    bmi = float(user_data['bmi'])
+    if bmi > 30:
+        risk_score += 0.2
+    elif bmi > 25:
+        risk_score += 0.1
+    elif bmi < 18.5:
+        risk_score += 0.1
+
+    bp = float(user_data['blood_pressure'])
+    if bp >= 160:
+        risk_score += 0.3
+    elif bp >= 140:
+        risk_score += 0.2
+    elif bp >= 120:
+        risk_score += 0.1
+
+    cholesterol = float(user_data['cholesterol'])
+    if cholesterol >= 240:
+        risk_score += 0.2
+    elif cholesterol >= 200:
+        risk_score += 0.1
+
+    if user_data['smoker'].lower() == 'yes':
+        risk_score += 0.2
+    elif user_data['smoker'].lower() == 'occasional':
+        risk_score += 0.1
+
+    exercise = user_data['exercise_frequency'].lower()
+    if exercise == 'sedentary':
+        risk_score += 0.2
+    elif exercise == 'low':
+        risk_score += 0.1
+
+    family_history = user_data['family_history']
+    if family_history in {'heart_disease', 'cancer', 'stroke'}:
+        risk_score += 0.3
+    elif family_history in {'diabetes', 'hypertension', 'fatty_liver', 'thyroid',
+                            'arthritis', 'obesity', 'asthma'}:
+        risk_score += 0.2
+    return min(risk_score, 1.0)
+
+
+def legacy_risk_level(risk_score):
+    if risk_score >= 0.7:
+        return 'high'
+    elif risk_score >= 0.4:
+        return 'moderate'
+    return 'low'
+
+
+@pytest.fixture
+def edge_profiles():
+    profiles = []
+    numeric = product(AGES, BMIS, BLOOD_PRESSURES, CHOLESTEROLS)
+    for i, (age, bmi, blood_pressure, cholesterol) in enumerate(numeric):
+        # Cycle the categories so every combination of them appears
+        profiles.append({
+            'age': str(age),
+            'bmi': bmi,
+            'blood_pressure': blood_pressure,
+            'cholesterol': cholesterol,
+            'smoker': SMOKERS[i % 5],
+            'exercise_frequency': EXERCISE[i // 5 % 5],
+            'family_history': FAMILY_HISTORY[i // 25 % 6]
+        })
+    return profiles
+
+
+def test_risk_assessment_matches_legacy_scores(edge_profiles):
+    expected = [legacy_risk_score(profile) for profile in edge_profiles]
+    ruleset = rule_engine.ruleset(RiskAssessmentService.RULESET)
+
+    scalar = [RiskAssessmentService.analyze_health_risk(profile) for profile in edge_profiles]
+    vector = RiskAssessmentService.analyze_health_risk_batch(ruleset.columns_from_profiles(edge_profiles))
+    assert scalar == expected
+    assert vector.tolist() == expected
+
+    levels = [legacy_risk_level(score) for score in expected]
+    assert [RiskAssessmentService.get_risk_level(score) for score in scalar] == levels
+    assert RiskAssessmentService.get_risk_levels(vector).tolist() == levels
+
+
+@pytest.mark.parametrize('name', ['prediction', 'search'])
+def test_vector_and_scalar_paths_agree(edge_profiles, name):
+    # These rulesets fill in missing fields, so drop some
+    profiles = [dict(profile) for profile in edge_profiles]
+    for i, profile in enumerate(profiles):
+        if i % 7 == 0:
+            del profile[['bmi', 'smoker', 'exercise_frequency', 'family_history'][i // 7 % 4]]
+
+    ruleset = rule_engine.ruleset(name)
+    scalar = [ruleset.score_one(profile) for profile in profiles]
+    vector = ruleset.score(profiles)
+    assert vector.tolist() == scalar
+    assert ruleset.levels(vector).tolist() == [ruleset.level(score) for score in scalar]
+
+
+def test_unknown_categories_score_the_default():
+    ruleset = rule_engine.ruleset(RiskAssessmentService.RULESET)
+    profile = {'age': '20', 'bmi': 22, 'blood_pressure': 110, 'cholesterol': 150,
+               'smoker': 'sometimes', 'exercise_frequency': 'daily', 'family_history': 'other'}
+    assert ruleset.score_one(profile) == 0.0
+    assert ruleset.score([profile]).tolist() == [0.0]
+    assert ruleset.explain(profile) == dict.fromkeys(ruleset.explain(profile), 0.0)
+
+    with pytest.raises(ValueError):
+        ruleset.score_one({'age': '40'})
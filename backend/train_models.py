@@ -8,13 +8,34 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import joblib
 import os
-from collections import Counter
-from app.model_classes import RandomForest
+import json
+import math
+import time
+import tempfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, ParameterGrid, ParameterSampler
+from app.config import Config
+from app.model_classes import RandomForest, FeatureBinner, format_training_profile
+from app.services.model_registry import DEFAULT_MODEL_KEY, model_filename
+from app.services.feedback_store import FeedbackStore, IngestState, FEATURE_COLUMNS
+from app.services.dataset_cache import DatasetCache, file_digest
+from app.services.artifact_store import ArtifactStore
 
 # Get the absolute path to the backend directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(BASE_DIR, 'app', 'models')
 
+# Hyperparameters explored by --search when no --search-space file is given
+DEFAULT_SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [None, 10, 20],
+    'min_samples_split': [2, 5, 10],
+    'max_features': ['sqrt', 'log2', None]
+}
+
 def create_feature_plots(df, output_dir):
     """Create and save feature distribution plots."""
     os.makedirs(output_dir, exist_ok=True)
@@ -37,190 +58,338 @@ def create_feature_plots(df, output_dir):
     plt.savefig(os.path.join(output_dir, 'feature_distributions.png'))
     plt.close()
 
-class DecisionTree:
-    def __init__(self, max_depth=None, min_samples_split=2):
-        self.max_depth = max_depth
-        self.min_samples_split = min_samples_split
-        self.tree = None
-
-    def _entropy(self, y):
-        """Calculate entropy of the target variable."""
-        classes, counts = np.unique(y, return_counts=True)
-        probabilities = counts / len(y)
-        return -np.sum(probabilities * np.log2(probabilities))
-
-    def _information_gain(self, X, y, feature_idx, threshold):
-        """Calculate information gain for a split."""
-        parent_entropy = self._entropy(y)
-        
-        # Split the data
-        left_mask = X[:, feature_idx] <= threshold
-        right_mask = ~left_mask
-        
-        if np.sum(left_mask) == 0 or np.sum(right_mask) == 0:
-            return 0
-        
-        # Calculate weighted entropy of children
-        left_entropy = self._entropy(y[left_mask])
-        right_entropy = self._entropy(y[right_mask])
-        
-        left_weight = np.sum(left_mask) / len(y)
-        right_weight = np.sum(right_mask) / len(y)
-        
-        weighted_child_entropy = (left_weight * left_entropy + 
-                                right_weight * right_entropy)
-        
-        return parent_entropy - weighted_child_entropy
-
-    def _best_split(self, X, y):
-        """Find the best split for a node."""
-        best_gain = -1
-        best_feature = None
-        best_threshold = None
-        
-        n_features = X.shape[1]
-        
-        for feature_idx in range(n_features):
-            thresholds = np.unique(X[:, feature_idx])
-            for threshold in thresholds:
-                gain = self._information_gain(X, y, feature_idx, threshold)
-                if gain > best_gain:
-                    best_gain = gain
-                    best_feature = feature_idx
-                    best_threshold = threshold
-                    
-        return best_feature, best_threshold
-
-    def _build_tree(self, X, y, depth=0):
-        n_samples = len(y)
-        n_classes = len(np.unique(y))
-        
-        # Check stopping criteria
-        if (self.max_depth is not None and depth >= self.max_depth) or \
-           n_samples < self.min_samples_split or \
-           n_classes == 1:
-            return {'type': 'leaf', 'prediction': Counter(y).most_common(1)[0][0]}
-        
-        # Find best split
-        feature_idx, threshold = self._best_split(X, y)
-        
-        if feature_idx is None:
-            return {'type': 'leaf', 'prediction': Counter(y).most_common(1)[0][0]}
-        
-        # Split the data
-        left_mask = X[:, feature_idx] <= threshold
-        right_mask = ~left_mask
-        
-        # Build child trees
-        left_tree = self._build_tree(X[left_mask], y[left_mask], depth + 1)
-        right_tree = self._build_tree(X[right_mask], y[right_mask], depth + 1)
-        
-        return {
-            'type': 'node',
-            'feature_idx': feature_idx,
-            'threshold': threshold,
-            'left': left_tree,
-            'right': right_tree
-        }
+def normalize_labels(y):
+    """
+    Labels as an object array of str, whatever dtype pandas parsed them
+    with, so cached and freshly parsed datasets train identical models.
+    """
+    return np.asarray(y).astype(str).astype(object)
 
-    def fit(self, X, y):
-        """Build the decision tree."""
-        self.tree = self._build_tree(X, y)
-        return self
-
-    def _predict_single(self, x, tree):
-        """Make prediction for a single sample."""
-        if tree['type'] == 'leaf':
-            return tree['prediction']
-        
-        if x[tree['feature_idx']] <= tree['threshold']:
-            return self._predict_single(x, tree['left'])
-        return self._predict_single(x, tree['right'])
-
-    def predict(self, X):
-        """Make predictions for multiple samples."""
-        return np.array([self._predict_single(x, self.tree) for x in X])
-
-class RandomForest:
-    def __init__(self, n_trees=10, max_depth=None, min_samples_split=2, sample_ratio=0.8):
-        self.n_trees = n_trees
-        self.max_depth = max_depth
-        self.min_samples_split = min_samples_split
-        self.sample_ratio = sample_ratio
-        self.trees = []
-
-    def _bootstrap_sample(self, X, y):
-        """Create a bootstrap sample of the data."""
-        n_samples = int(len(X) * self.sample_ratio)
-        indices = np.random.choice(len(X), size=n_samples, replace=True)
-        return X[indices], y[indices]
-
-    def fit(self, X, y):
-        """Build the random forest."""
-        self.trees = []
-        for _ in range(self.n_trees):
-            # Create bootstrap sample
-            X_sample, y_sample = self._bootstrap_sample(X, y)
-            
-            # Train decision tree
-            tree = DecisionTree(
-                max_depth=self.max_depth,
-                min_samples_split=self.min_samples_split
-            )
-            tree.fit(X_sample, y_sample)
-            self.trees.append(tree)
-        return self
-
-    def predict(self, X):
-        """Make predictions using majority voting."""
-        predictions = np.array([tree.predict(X) for tree in self.trees])
-        return np.array([Counter(pred).most_common(1)[0][0] 
-                        for pred in predictions.T])
-
-def prepare_data():
-    """Prepare the crop recommendation dataset."""
+def load_dataset(data_path='Crop_recommendation.csv'):
+    """Read the raw feature matrix and labels from a CSV file."""
+    df = pd.read_csv(data_path)
+    X = df.drop('label', axis=1).values
+    y = normalize_labels(df['label'].values)
+    return X, y
+
+def pack_dataset(X_train, X_test, y_train, y_test, scaler):
+    """Flatten a prepared split into plain arrays for the dataset cache."""
+    # Labels seen only in the test split still need a code of their own
+    labels = y_train if y_test is None else np.concatenate([y_train, y_test])
+    classes = np.unique(labels).astype(str)
+    arrays = {
+        'X_train': X_train,
+        'y_train': np.searchsorted(classes, y_train).astype(np.int32),
+        'classes': classes,
+        'scaler_mean': scaler.mean_,
+        'scaler_scale': scaler.scale_,
+        'scaler_var': scaler.var_,
+        'scaler_n_samples_seen': np.asarray(scaler.n_samples_seen_)
+    }
+    if X_test is not None:
+        arrays['X_test'] = X_test
+        arrays['y_test'] = np.searchsorted(classes, y_test).astype(np.int32)
+    return arrays
+
+def unpack_dataset(arrays):
+    """Rebuild ``prepare_data`` outputs from cached (memory-mapped) arrays."""
+    scaler = StandardScaler()
+    scaler.mean_ = np.array(arrays['scaler_mean'])
+    scaler.scale_ = np.array(arrays['scaler_scale'])
+    scaler.var_ = np.array(arrays['scaler_var'])
+    scaler.n_samples_seen_ = np.array(arrays['scaler_n_samples_seen'])
+    scaler.n_features_in_ = len(scaler.mean_)
+    
+    # Labels come back as the same object arrays load_dataset produces
+    classes = normalize_labels(arrays['classes'])
+    y_train = classes[arrays['y_train']]
+    if 'X_test' not in arrays:
+        return arrays['X_train'], None, y_train, None, scaler
+    return arrays['X_train'], arrays['X_test'], y_train, classes[arrays['y_test']], scaler
+
+def prepare_data(data_path='Crop_recommendation.csv', test_size=0.2, use_cache=True):
+    """
+    Prepare the crop recommendation dataset.
+    
+    With ``test_size=0`` everything is used for training (validation then
+    comes from out-of-bag estimates) and the test outputs are None.
+    
+    Results are cached under ``Config.DATASET_CACHE_DIR``, keyed by the CSV's
+    content hash and the split parameters, so repeat runs skip parsing and
+    scaling until the file changes.
+    """
     try:
-        # Load data
-        df = pd.read_csv('Crop_recommendation.csv')
+        cache = DatasetCache(Config.DATASET_CACHE_DIR) if use_cache else None
+        if cache is not None:
+            source_sha256 = file_digest(data_path)
+            key = cache.key(source_sha256, test_size=test_size, random_state=42)
+            cached = cache.load(key)
+            if cached is not None:
+                print(f"Loaded cached dataset {key}")
+                return unpack_dataset(cached[0])
         
-        # Separate features and target
-        X = df.drop('label', axis=1).values
-        y = df['label'].values
-        
-        # Split the data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        # Load data
+        X, y = load_dataset(data_path)
         
-        # Scale the features
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
+        if not test_size:
+            scaler = StandardScaler()
+            prepared = (scaler.fit_transform(X), None, y, None, scaler)
+        else:
+            # Split the data
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=42
+            )
+            
+            # Scale the features
+            scaler = StandardScaler()
+            X_train_scaled = scaler.fit_transform(X_train)
+            X_test_scaled = scaler.transform(X_test)
+            prepared = (X_train_scaled, X_test_scaled, y_train, y_test, scaler)
         
-        return X_train_scaled, X_test_scaled, y_train, y_test, scaler
+        if cache is not None:
+            cache.save(key, pack_dataset(*prepared), source_path=data_path,
+                       source_sha256=source_sha256, test_size=test_size)
+            print(f"Cached prepared dataset as {key}")
+        return prepared
     except Exception as e:
         print(f"Error in prepare_data: {str(e)}")
         raise
 
-def train_model():
-    """Train the random forest model."""
+def build_model(estimator='sklearn', oob_score=False, params=None):
+    """Create the production random forest configuration, with optional overrides."""
+    config = {
+        'n_estimators': 100,
+        'max_depth': 10,
+        'min_samples_split': 5
+    }
+    config.update(params or {})
+    if estimator == 'custom':
+        n_trees = config.pop('n_estimators')
+        return RandomForest(
+            n_trees=n_trees,
+            random_state=42,
+            oob_score=oob_score,
+            **config
+        )
+    return RandomForestClassifier(
+        random_state=42,
+        oob_score=oob_score,
+        **config
+    )
+
+def cache_folds(X, y, n_folds, cache_dir):
+    """
+    Split ``X`` into stratified folds and save each fold's scaled train and
+    validation matrices once, as .npy files the search workers memory-map.
+    """
+    y = np.asarray(y).astype(str)
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+    for fold, (train_idx, val_idx) in enumerate(splitter.split(X, y)):
+        scaler = StandardScaler()
+        np.save(os.path.join(cache_dir, f'fold{fold}_X_train.npy'), scaler.fit_transform(X[train_idx]))
+        np.save(os.path.join(cache_dir, f'fold{fold}_X_val.npy'), scaler.transform(X[val_idx]))
+        np.save(os.path.join(cache_dir, f'fold{fold}_y_train.npy'), y[train_idx])
+        np.save(os.path.join(cache_dir, f'fold{fold}_y_val.npy'), y[val_idx])
+
+def score_fold(cache_dir, fold, estimator, params):
+    """Fit one candidate on one cached fold; return (accuracy, fit seconds)."""
+    X_train, X_val, y_train, y_val = (
+        np.load(os.path.join(cache_dir, f'fold{fold}_{name}.npy'), mmap_mode='r')
+        for name in ('X_train', 'X_val', 'y_train', 'y_val')
+    )
+    start = time.perf_counter()
+    model = build_model(estimator, params=params)
+    model.fit(X_train, y_train)
+    seconds = time.perf_counter() - start
+    return float(accuracy_score(y_val, model.predict(X_val))), seconds
+
+def halving_schedule(n_folds, factor):
+    """Folds scored at each rung, e.g. 5 folds with factor 3 -> [1, 2, 5]."""
+    if factor is None or factor <= 1:
+        return [n_folds]
+    schedule = [n_folds]
+    while schedule[-1] > 1:
+        schedule.append(math.ceil(schedule[-1] / factor))
+    return schedule[::-1]
+
+def search_hyperparameters(X, y, estimator='sklearn', space=None, search='grid', n_iter=20,
+                           n_folds=5, halving_factor=3, n_jobs=-1):
+    """
+    Rank hyperparameter candidates by stratified k-fold accuracy.
+    
+    Successive halving scores every candidate on the first fold(s) only and
+    keeps the best ``1 / halving_factor`` for each following rung, so weak
+    configurations never pay for a full cross-validation.
+    """
+    space = space or DEFAULT_SEARCH_SPACE
+    if search == 'grid':
+        candidates = list(ParameterGrid(space))
+    else:
+        candidates = list(ParameterSampler(space, n_iter=n_iter, random_state=42))
+    schedule = halving_schedule(n_folds, halving_factor)
+    print(f"Searching {len(candidates)} candidates with {n_folds}-fold CV "
+          f"(folds per rung: {schedule})")
+    
+    scores = [{} for _ in candidates]
+    fit_seconds = [0.0] * len(candidates)
+    eliminated_at = [None] * len(candidates)
+    mean_score = lambda c: float(np.mean(list(scores[c].values())))
+    alive = list(range(len(candidates)))
+    
+    n_workers = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    n_workers = max(1, min(n_workers, len(candidates) * n_folds))
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='search-') as cache_dir:
+        cache_folds(X, y, n_folds, cache_dir)
+        executor = ProcessPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+        try:
+            for rung, rung_folds in enumerate(schedule):
+                # Survivors only pay for the folds they have not been scored on yet
+                tasks = [(c, fold) for c in alive for fold in range(rung_folds)
+                         if fold not in scores[c]]
+                if executor is None:
+                    results = ((task, score_fold(cache_dir, task[1], estimator, candidates[task[0]]))
+                               for task in tasks)
+                else:
+                    futures = {
+                        executor.submit(score_fold, cache_dir, fold, estimator, candidates[c]): (c, fold)
+                        for c, fold in tasks
+                    }
+                    results = ((futures[future], future.result()) for future in as_completed(futures))
+                for (c, fold), (accuracy, seconds) in results:
+                    scores[c][fold] = accuracy
+                    fit_seconds[c] += seconds
+                
+                alive.sort(key=mean_score, reverse=True)
+                print(f"Rung {rung}: {len(alive)} candidates on {rung_folds} folds, "
+                      f"best {mean_score(alive[0]):.4f}")
+                if rung < len(schedule) - 1:
+                    keep = max(1, math.ceil(len(alive) / halving_factor))
+                    for c in alive[keep:]:
+                        eliminated_at[c] = rung
+                    alive = alive[:keep]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    
+    # Candidates that survived longer rank above ones pruned earlier
+    order = sorted(
+        range(len(candidates)),
+        key=lambda c: (len(scores[c]), mean_score(c)),
+        reverse=True
+    )
+    ranking = []
+    for rank, c in enumerate(order, start=1):
+        fold_scores = list(scores[c].values())
+        ranking.append({
+            'rank': rank,
+            'params': candidates[c],
+            'mean_accuracy': float(np.mean(fold_scores)),
+            'std_accuracy': float(np.std(fold_scores)),
+            'folds_scored': len(fold_scores),
+            'eliminated_at_rung': eliminated_at[c],
+            'mean_fit_seconds': fit_seconds[c] / len(fold_scores)
+        })
+    return {
+        'estimator': estimator,
+        'search': search,
+        'n_candidates': len(candidates),
+        'n_folds': n_folds,
+        'halving_factor': halving_factor,
+        'folds_per_rung': schedule,
+        'search_seconds': time.perf_counter() - start,
+        'best_params': ranking[0]['params'],
+        'ranking': ranking
+    }
+
+def model_params(model):
+    """Constructor parameters of an sklearn or custom forest, for the version manifest."""
+    if hasattr(model, 'get_params'):
+        return model.get_params()
+    return {name: value for name, value in vars(model).items()
+            if not name.startswith('_') and not name.endswith('_') and name != 'trees'}
+
+def save_version(model_key, components, metrics, data, publish=True, **extra):
+    """Store the trained components as a new version and, by default, publish it."""
+    store = ArtifactStore(MODELS_DIR)
+    manifest = store.save(model_key, components, metrics=metrics,
+                          params=model_params(components['model']), data=data, **extra)
+    if publish:
+        store.publish(model_key, manifest['version'])
+    else:
+        print(f"Version {manifest['version']} saved as a candidate; serve it as "
+              f"{model_key}@{manifest['version']} or publish it with --publish")
+    return manifest
+
+def data_summary(data_path, n_rows):
+    return {'path': os.path.abspath(data_path), 'sha256': file_digest(data_path), 'rows': int(n_rows)}
+
+def report_training_profile(profile, output_path=None):
+    """Print a forest's training profile and optionally save it as JSON."""
+    print("\nTraining profile:")
+    print(format_training_profile(profile))
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(profile, f, indent=2)
+        print("Profile saved to:", output_path)
+    print()
+
+def train_model(data_path='Crop_recommendation.csv', model_key=DEFAULT_MODEL_KEY,
+                estimator='sklearn', validation='holdout', search=None, search_options=None,
+                use_cache=True, publish=True, profile=False, profile_output=None):
+    """
+    Train the random forest model for one region (or the default model).
+    
+    ``validation='oob'`` trains on every row and reports the out-of-bag
+    accuracy instead of holding out 20% of the data. With ``search`` set to
+    'grid' or 'random' the hyperparameters are tuned by cross-validation on
+    the training rows first, and the ranked report is saved next to the model.
+    
+    The model is stored as a new version in the artifact store and published
+    unless ``publish`` is False. ``profile`` prints per-depth training timings
+    for the custom estimator (and writes them to ``profile_output`` if given).
+    """
     try:
         # Create models directory if it doesn't exist
         os.makedirs(MODELS_DIR, exist_ok=True)
         
         # Prepare data
         print("Preparing data...")
-        X_train, X_test, y_train, y_test, scaler = prepare_data()
+        use_oob = validation == 'oob'
+        X_train, X_test, y_train, y_test, scaler = prepare_data(
+            data_path, test_size=0 if use_oob else 0.2, use_cache=use_cache
+        )
+        
+        report = None
+        params = None
+        if search:
+            # Folds are scaled separately, so search on the unscaled training rows
+            # (the same split prepare_data made)
+            X_raw, y_raw = load_dataset(data_path)
+            if not use_oob:
+                X_raw, _, y_raw, _ = train_test_split(X_raw, y_raw, test_size=0.2, random_state=42)
+            report = search_hyperparameters(X_raw, y_raw, estimator, search=search,
+                                            **(search_options or {}))
+            params = report['best_params']
+            print(f"Best parameters: {params}")
         
         # Initialize and train the model
-        print("Training Random Forest model...")
-        rf_model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            min_samples_split=5,
-            random_state=42
-        )
+        print(f"Training Random Forest model ({estimator})...")
+        rf_model = build_model(estimator, oob_score=use_oob, params=params)
+        if profile:
+            if isinstance(rf_model, RandomForest):
+                rf_model.profile = True
+            else:
+                print("Training profile is only available with --estimator custom")
         rf_model.fit(X_train, y_train)
+        if getattr(rf_model, 'profile_', None) is not None:
+            report_training_profile(rf_model.profile_, profile_output)
+        if use_oob:
+            accuracy = rf_model.oob_score_
+            print(f"Out-of-bag accuracy: {accuracy:.4f}")
+        else:
+            accuracy = accuracy_score(y_test, rf_model.predict(X_test))
+            print(f"Held-out accuracy: {accuracy:.4f}")
         
         # Save all components in a single file
         print("\nSaving model components...")
@@ -230,13 +399,331 @@ def train_model():
             'labels': np.unique(y_train)
         }
         
-        model_path = os.path.join(MODELS_DIR, 'crop_model.joblib')
-        joblib.dump(model_components, model_path)
-        print("File saved to:", model_path)
+        n_rows = len(y_train) + (0 if y_test is None else len(y_test))
+        manifest = save_version(
+            model_key,
+            model_components,
+            metrics={'accuracy': float(accuracy), 'validation': validation},
+            data=data_summary(data_path, n_rows),
+            publish=publish,
+            estimator=estimator,
+            search=None if report is None else {
+                'best_params': report['best_params'],
+                'best_cv_accuracy': report['ranking'][0]['mean_accuracy']
+            }
+        )
+        
+        if report is not None:
+            report.update({
+                'timestamp': datetime.utcnow().isoformat(),
+                'model_key': model_key,
+                'version': manifest['version'],
+                'validation': validation,
+                'final_accuracy': float(accuracy)
+            })
+            report_path = os.path.join(MODELS_DIR, model_filename(model_key))[:-len('.joblib')] + '.search.json'
+            with open(report_path, 'w') as f:
+                json.dump(report, f, indent=2)
+            print("Search report saved to:", report_path)
         
     except Exception as e:
         print(f"Error in train_model: {str(e)}")
         raise
 
+def stream_csv(data_path, chunk_rows):
+    """Yield ``(X, y)`` blocks of at most ``chunk_rows`` rows from a CSV file."""
+    for chunk in pd.read_csv(data_path, usecols=FEATURE_COLUMNS + ['label'], chunksize=chunk_rows):
+        yield chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float64), chunk['label'].to_numpy().astype(str)
+
+def scan_dataset(data_path, chunk_rows, bin_sample_rows=200000, seed=42):
+    """
+    First streaming pass: fit the scaler incrementally, collect the labels and
+    keep a uniform random sample of rows for choosing bin edges.
+    """
+    scaler = StandardScaler()
+    labels = set()
+    n_rows = 0
+    rng = np.random.default_rng(seed)
+    sample, sample_keys = None, None
+    for X, y in stream_csv(data_path, chunk_rows):
+        scaler.partial_fit(X)
+        labels.update(np.unique(y))
+        n_rows += len(y)
+        # Reservoir sample: keep the rows with the smallest random keys seen so far
+        keys = rng.random(len(X))
+        if sample is not None:
+            X = np.vstack([sample, X])
+            keys = np.concatenate([sample_keys, keys])
+        if len(keys) > bin_sample_rows:
+            keep = np.argpartition(keys, bin_sample_rows)[:bin_sample_rows]
+            X, keys = X[keep], keys[keep]
+        sample, sample_keys = X, keys
+    return scaler, np.array(sorted(labels)), n_rows, sample
+
+def build_binned_dataset(data_path, work_dir, chunk_rows, max_bins=256):
+    """
+    Stream ``data_path`` twice to build an on-disk uint8 feature matrix and
+    label codes, so no more than one chunk of raw rows is in memory.
+    """
+    print("Scanning dataset...")
+    scaler, classes, n_rows, sample = scan_dataset(data_path, chunk_rows)
+    binner = FeatureBinner(max_bins).fit(scaler.transform(sample))
+    del sample
+    
+    print(f"Binning {n_rows} rows into {work_dir}...")
+    X_binned = np.lib.format.open_memmap(os.path.join(work_dir, 'X_binned.npy'), mode='w+',
+                                         dtype=np.uint8, shape=(n_rows, len(FEATURE_COLUMNS)))
+    y_encoded = np.lib.format.open_memmap(os.path.join(work_dir, 'y_encoded.npy'), mode='w+',
+                                          dtype=np.int32, shape=(n_rows,))
+    start = 0
+    for X, y in stream_csv(data_path, chunk_rows):
+        stop = start + len(y)
+        X_binned[start:stop] = binner.transform(scaler.transform(X))
+        y_encoded[start:stop] = np.searchsorted(classes, y)
+        start = stop
+    X_binned.flush()
+    y_encoded.flush()
+    return X_binned, y_encoded, binner.bin_edges_, classes, scaler
+
+def train_model_out_of_core(data_path, model_key=DEFAULT_MODEL_KEY, chunk_rows=100000,
+                            memory_budget_mb=Config.TRAINING_MEMORY_BUDGET_MB, publish=True,
+                            profile=False, profile_output=None):
+    """
+    Train the custom forest on a CSV too large to load at once.
+    
+    The data is scaled and binned into a memory-mapped file under
+    ``Config.DATA_DIR``, and trees are grown from histograms accumulated chunk
+    by chunk within ``memory_budget_mb``. Accuracy is reported out-of-bag.
+    """
+    try:
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        os.makedirs(Config.DATA_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix='out-of-core-', dir=Config.DATA_DIR) as work_dir:
+            X_binned, y_encoded, bin_edges, classes, scaler = build_binned_dataset(
+                data_path, work_dir, chunk_rows
+            )
+            
+            print("Training Random Forest model (custom, out of core)...")
+            rf_model = build_model('custom', oob_score=True)
+            rf_model.profile = profile
+            rf_model.fit_out_of_core(X_binned, y_encoded, bin_edges, classes.astype(object),
+                                     memory_budget_bytes=memory_budget_mb * 1024 * 1024,
+                                     work_dir=work_dir)
+            passes = rf_model.out_of_core_passes_
+            print(f"Grew {rf_model.n_trees} trees out of core in {passes['passes']} passes over "
+                  f"{passes['chunks']} chunks of {passes['chunk_rows']} rows")
+            if profile:
+                report_training_profile(rf_model.profile_, profile_output)
+            print(f"Out-of-bag accuracy: {rf_model.oob_score_:.4f}")
+            n_rows = len(y_encoded)
+            del X_binned, y_encoded
+        
+        save_version(
+            model_key,
+            {
+                'model': rf_model,
+                'scaler': scaler,
+                'labels': rf_model.classes_
+            },
+            metrics={'accuracy': rf_model.oob_score_, 'validation': 'oob'},
+            data=data_summary(data_path, n_rows),
+            publish=publish,
+            estimator='custom-out-of-core',
+            memory_budget_mb=memory_budget_mb
+        )
+        
+    except Exception as e:
+        print(f"Error in train_model_out_of_core: {str(e)}")
+        raise
+
+def load_training_cache(data_path, cache_path):
+    """Load the merged training rows, parsing the source CSV only on first use."""
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as data:
+            return data['X'], data['y']
+    
+    print(f"Building training cache from {data_path}...")
+    df = pd.read_csv(data_path)
+    X = df[FEATURE_COLUMNS].values.astype(np.float64)
+    y = df['label'].values.astype(str)
+    save_training_cache(cache_path, X, y)
+    return X, y
+
+def save_training_cache(cache_path, X, y):
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, X=X, y=y)
+    os.replace(tmp_path, cache_path)
+
+def retrain_from_feedback(data_path='Crop_recommendation.csv', model_key=DEFAULT_MODEL_KEY,
+                          feedback_dir=Config.FEEDBACK_DIR):
+    """
+    Merge newly flushed feedback into the cached training set, refit, and
+    publish the new model only if its accuracy does not regress.
+    """
+    try:
+        store = FeedbackStore(feedback_dir)
+        # Each model key keeps its own merged dataset and ingest log
+        state = IngestState(os.path.join(feedback_dir, f'ingest_{model_key}.json'))
+        cache_path = os.path.join(feedback_dir, f'training_{model_key}.npz')
+        
+        new_segments = state.new_segments(store)
+        if not new_segments:
+            print("No new feedback to ingest.")
+            return None
+        
+        if state.training_rows is None and not state.ingested_segments and os.path.exists(cache_path):
+            # Left by a first ingest that never completed; rebuild from the CSV
+            os.remove(cache_path)
+        X_base, y_base = load_training_cache(data_path, cache_path)
+        if state.training_rows is not None:
+            X_base, y_base = X_base[:state.training_rows], y_base[:state.training_rows]
+        
+        # Only successful harvests are trustworthy labels for the conditions
+        new_X, new_y = [], []
+        for name in new_segments:
+            columns = store.read_segment(name)
+            keep = (columns['outcome'] == 'success') & (columns['model'] == model_key)
+            new_X.append(np.column_stack([columns[col] for col in FEATURE_COLUMNS])[keep])
+            new_y.append(columns['label'][keep])
+        X_new = np.vstack(new_X)
+        y_new = np.concatenate(new_y)
+        
+        X = np.vstack([X_base, X_new])
+        y = np.concatenate([y_base, y_new])
+        print(f"Merged {len(y_new)} new rows from {len(new_segments)} segments "
+              f"({len(y)} rows total)")
+        
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42
+        )
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        
+        rf_model = build_model()
+        rf_model.fit(X_train_scaled, y_train)
+        new_accuracy = accuracy_score(y_test, rf_model.predict(scaler.transform(X_test)))
+        
+        # Score the currently published model on the same held-out rows
+        model_path = os.path.join(MODELS_DIR, model_filename(model_key))
+        current_accuracy = None
+        if os.path.exists(model_path):
+            current = joblib.load(model_path)
+            current_accuracy = accuracy_score(
+                y_test, current['model'].predict(current['scaler'].transform(X_test))
+            )
+        
+        # Every retrain is kept as a version; regressions stay unpublished candidates
+        published = current_accuracy is None or new_accuracy >= current_accuracy
+        manifest = save_version(
+            model_key,
+            {
+                'model': rf_model,
+                'scaler': scaler,
+                'labels': np.unique(y_train)
+            },
+            metrics={
+                'accuracy': float(new_accuracy),
+                'validation': 'holdout',
+                'previous_accuracy': current_accuracy
+            },
+            data={'path': cache_path, 'rows': int(len(y)), 'feedback_segments': new_segments},
+            publish=published,
+            estimator='sklearn'
+        )
+        if not published:
+            print("Retrained model regressed; keeping the current model.")
+        
+        state.ingested_segments.extend(new_segments)
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'model_key': model_key,
+            'segments': new_segments,
+            'rows_added': int(len(y_new)),
+            'rows_total': int(len(y)),
+            'previous_accuracy': current_accuracy,
+            'new_accuracy': new_accuracy,
+            'version': manifest['version'],
+            'published': published
+        }
+        state.history.append(entry)
+        # Only now that the version exists do the cache and ingest log move
+        # forward; the log's row count makes a crash between the two harmless
+        save_training_cache(cache_path, X, y)
+        state.training_rows = int(len(y))
+        state.save()
+        print(f"Ingested {len(new_segments)} segments into {cache_path}")
+        print(f"Accuracy: previous={current_accuracy}, new={new_accuracy:.4f}")
+        return entry
+        
+    except Exception as e:
+        print(f"Error in retrain_from_feedback: {str(e)}")
+        raise
+
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train a crop recommendation model")
+    parser.add_argument('--data', default='Crop_recommendation.csv',
+                        help="CSV file to train on (e.g. a regional dataset)")
+    parser.add_argument('--region', default=DEFAULT_MODEL_KEY,
+                        help="Model key to save under; served via /predict?model=<region>")
+    parser.add_argument('--retrain', action='store_true',
+                        help="Incrementally retrain from newly collected feedback")
+    parser.add_argument('--estimator', choices=['sklearn', 'custom'], default='sklearn',
+                        help="sklearn's RandomForestClassifier or app.model_classes.RandomForest")
+    parser.add_argument('--validation', choices=['holdout', 'oob'], default='holdout',
+                        help="Evaluate on a 20%% held-out split or on out-of-bag rows")
+    parser.add_argument('--no-publish', action='store_true',
+                        help="Store the new version without making it the live model")
+    parser.add_argument('--publish', metavar='VERSION',
+                        help="Make a stored version (e.g. v0003) the live model and exit")
+    parser.add_argument('--rollback', action='store_true',
+                        help="Re-publish the previously live version and exit")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print per-tree and per-depth training timings (custom estimator)")
+    parser.add_argument('--profile-output', metavar='PATH',
+                        help="Also write the training profile to a JSON file")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Re-parse the CSV instead of using the prepared dataset cache")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="Stream the CSV in chunks and train the custom forest from disk")
+    parser.add_argument('--chunk-rows', type=int, default=100000,
+                        help="Rows read per CSV chunk with --out-of-core")
+    parser.add_argument('--memory-budget-mb', type=int, default=Config.TRAINING_MEMORY_BUDGET_MB,
+                        help="Working memory for histograms and chunks with --out-of-core")
+    parser.add_argument('--search', choices=['grid', 'random'],
+                        help="Tune hyperparameters with cross-validation before training")
+    parser.add_argument('--search-space',
+                        help="JSON file mapping parameter names to lists of values")
+    parser.add_argument('--n-iter', type=int, default=20,
+                        help="Candidates sampled by --search random")
+    parser.add_argument('--folds', type=int, default=5,
+                        help="Number of stratified cross-validation folds")
+    parser.add_argument('--halving-factor', type=int, default=3,
+                        help="Keep 1/factor of the candidates per rung (1 disables halving)")
+    parser.add_argument('--jobs', type=int, default=-1,
+                        help="Worker processes for the search (-1 uses every core)")
+    args = parser.parse_args()
+    if args.publish:
+        ArtifactStore(MODELS_DIR).publish(args.region, args.publish)
+    elif args.rollback:
+        ArtifactStore(MODELS_DIR).rollback(args.region)
+    elif args.retrain:
+        retrain_from_feedback(args.data, args.region)
+    elif args.out_of_core:
+        train_model_out_of_core(args.data, args.region, args.chunk_rows, args.memory_budget_mb,
+                                publish=not args.no_publish, profile=args.profile,
+                                profile_output=args.profile_output)
+    else:
+        search_options = {
+            'n_iter': args.n_iter,
+            'n_folds': args.folds,
+            'halving_factor': args.halving_factor,
+            'n_jobs': args.jobs
+        }
+        if args.search_space:
+            with open(args.search_space) as f:
+                search_options['space'] = json.load(f)
+        train_model(args.data, args.region, args.estimator, args.validation,
+                    args.search, search_options, use_cache=not args.no_cache,
+                    publish=not args.no_publish, profile=args.profile,
+                    profile_output=args.profile_output)